@@ -0,0 +1,149 @@
+import pandas as pd
+import numpy as np
+import backtestKernels as kernels
+from backtestDriver import columnIndices
+from backtestStrategy import Strategy, PriceColumns, vectorizedStateCodes
+
+
+def alignedColumn(allAssetTimeSeries: list[np.ndarray],
+                  column: int = 4) -> tuple[np.ndarray, np.ndarray]:
+
+    '''
+    Stacks one column of several series into a float64 array of shape (tickers, bars). Shorter series are padded with NaN at the front, so
+    that every row ends on its most recent bar. Returns the stacked array and the amount of padding added to each row. The rows are only
+    stacked so that the strategy and the state machine can run on every ticker at once, each on its own consecutive bars. Columns of
+    different rows need not share a date, so results across tickers are combined on their dates, as in portfolioSeries(). The padding is
+    not a start of series to a strategy, so batchBacktest() evaluates rows of different lengths apart.
+    '''
+
+    numberOfBars = max(len(i) for i in allAssetTimeSeries)
+    values = np.full((len(allAssetTimeSeries), numberOfBars), np.nan, dtype = np.float64)
+    padding = np.empty(len(allAssetTimeSeries), dtype = np.int64)
+    for i, j in enumerate(allAssetTimeSeries):
+        padding[i] = numberOfBars - len(j)
+        values[i, padding[i]:] = j[:, column] if (j.ndim == 2) else j
+
+    return (values, padding)
+
+
+def batchTrades(closes: np.ndarray,
+                stateCodes: np.ndarray,
+                padding: np.ndarray,
+                tickerSymbols: list[str],
+                warmUpLength: int) -> pd.DataFrame:
+
+    '''
+    Pairs up the opening and closing orders of every ticker at once, following the same rules as BacktestDriver.computeReturnSeries().
+    Returns one row per trade, sorted by ticker, with the order indices counted from the start of that ticker's own series.
+    '''
+
+    rows, columns = np.nonzero((stateCodes == kernels.OPENED) | (stateCodes == kernels.CLOSED))
+    ordersPerTicker = np.bincount(rows, minlength = len(closes))
+    keptOrders = np.ones(len(rows), dtype = bool)
+    keptOrders[(np.cumsum(ordersPerTicker) - 1)[(ordersPerTicker % 2) == 1]] = False # An unmatched final order is dropped, as in computeReturnSeries()
+    rows = rows[keptOrders]
+    orderIndices = columns[keptOrders] + warmUpLength
+
+    tradeRows = rows[0::2]
+    openingIndices = orderIndices[0::2]
+    closingIndices = orderIndices[1::2]
+    openingPrices = closes[tradeRows, openingIndices]
+    closingPrices = closes[tradeRows, closingIndices]
+
+    return (pd.DataFrame({'ticker': np.asarray(tickerSymbols, dtype = object)[tradeRows],
+                          'tickerIndex': tradeRows,
+                          'openIndex': openingIndices - padding[tradeRows],
+                          'closeIndex': closingIndices - padding[tradeRows],
+                          'openPrice': openingPrices,
+                          'closePrice': closingPrices,
+                          'return': (closingPrices - openingPrices) / openingPrices,
+                          'holdingPeriod': closingIndices - openingIndices}))
+
+
+def portfolioSeries(allAssetTimeSeries: list[np.ndarray],
+                    trades: pd.DataFrame) -> pd.DataFrame:
+
+    '''
+    Combines the trades of every ticker into one equally weighted portfolio. Each ticker is allotted the same share of capital, which earns the
+    ticker's bar-to-bar return while one of its trades is open and nothing otherwise. Bars are aligned on their dates, over every date that any
+    ticker has a bar on, and the result is indexed by those dates. Where a ticker has no bar, it earns nothing until its next bar, whose return
+    covers the gap.
+    '''
+
+    numberOfTickers = len(allAssetTimeSeries)
+    barsPerTicker = np.array([len(i) for i in allAssetTimeSeries], dtype = np.int64)
+    firstBars = np.concatenate(([0], np.cumsum(barsPerTicker)[:-1]))
+    barDates = np.concatenate([np.asarray(i[:, 0], dtype = np.float64) for i in allAssetTimeSeries])
+    barCloses = np.concatenate([np.asarray(i[:, 4], dtype = np.float64) for i in allAssetTimeSeries])
+    dates = np.unique(barDates)
+    datePositions = np.searchsorted(dates, barDates)
+
+    barReturns = np.zeros((numberOfTickers, len(dates)), dtype = np.float64)
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        returnsSincePreviousBar = np.concatenate(([0.0], np.diff(barCloses) / barCloses[:-1]))
+    returnsSincePreviousBar[firstBars[barsPerTicker > 0]] = 0.0 # The first bar of a ticker has no previous bar of its own
+    barReturns[np.repeat(np.arange(numberOfTickers), barsPerTicker), datePositions] = np.nan_to_num(returnsSincePreviousBar)
+
+    tickerIndices = trades['tickerIndex'].to_numpy()
+    positionChanges = np.zeros((numberOfTickers, len(dates) + 1), dtype = np.int64)
+    np.add.at(positionChanges, (tickerIndices, datePositions[firstBars[tickerIndices] + trades['openIndex'].to_numpy()] + 1), 1)
+    np.add.at(positionChanges, (tickerIndices, datePositions[firstBars[tickerIndices] + trades['closeIndex'].to_numpy()] + 1), -1)
+    positionHeld = np.cumsum(positionChanges, axis = 1)[:, :len(dates)] > 0
+
+    portfolioReturns = (barReturns * positionHeld).sum(axis = 0) / numberOfTickers
+    equityCurve = np.cumprod(1 + portfolioReturns)
+
+    return (pd.DataFrame({'portfolioReturn': portfolioReturns,
+                          'equity': equityCurve,
+                          'drawdown': (equityCurve - np.maximum.accumulate(equityCurve)) / np.maximum.accumulate(equityCurve),
+                          'exposure': positionHeld.mean(axis = 0)},
+                         index = pd.DatetimeIndex(pd.to_datetime(dates.astype(np.int64), unit = 's'), name = 'date')))
+
+
+def batchBacktest(allAssetTimeSeries: list[np.ndarray],
+                  tickerSymbols: list[str],
+                  strategy: Strategy) -> dict:
+
+    '''
+    Runs the strategy over every ticker in one pass, with the signals and the state machine evaluated on a single (ticker x time) array.
+    Tickers with series of different lengths are evaluated in one pass per length, each from the first bar of its own series, so that
+    every ticker gets the same states and trades as a BacktestDriver over that ticker alone.
+
+    Returns a dictionary with:
+        'stateCodes' : np.ndarray of shape (tickers, bars - warm-up length), aligned on the most recent bar. Bars before the end of a
+                       ticker's own warm-up hold NO_POSITION.
+        'trades' : pd.DataFrame with one row per trade across all tickers.
+        'tradeSeries' : dict mapping each ticker symbol to its trade returns indexed by closing bar, as in BacktestDriver.tradeSeriesWithPositionIndices().
+        'portfolio' : pd.DataFrame with the per-bar return, equity, drawdown and exposure of the combined, equally weighted portfolio,
+                      indexed by date across the dates of every ticker.
+
+    Parameters
+    ----------
+    allAssetTimeSeries : list[np.ndarray]
+        one array of bars per ticker symbol, laid out as [Date, Open, High, Low, Close, Volume].
+    tickerSymbols : list[str]
+        the ticker symbols, in the same order as allAssetTimeSeries.
+    strategy : Strategy
+        the strategy to evaluate. Its signals are computed for every ticker at once, on columns of shape (tickers, bars).
+    '''
+
+    closes, padding = alignedColumn(allAssetTimeSeries, 4)
+    warmUpLength = strategy.warmUpLength()
+    stateCodes = np.full((len(closes), max(closes.shape[-1] - warmUpLength, 0)), kernels.NO_POSITION, dtype = np.uint8)
+    for rowPadding in np.unique(padding):
+        rows = np.flatnonzero(padding == rowPadding)
+        rowSeries = [allAssetTimeSeries[i] for i in rows]
+        prices = PriceColumns(lambda name, rowSeries = rowSeries: alignedColumn(rowSeries, columnIndices[name])[0], {'close': closes[rows, rowPadding:]})
+        stateCodes[rows, rowPadding:] = vectorizedStateCodes(strategy, prices)
+    trades = batchTrades(closes, stateCodes, padding, tickerSymbols, warmUpLength)
+
+    tradesPerTicker = np.bincount(trades['tickerIndex'].to_numpy(), minlength = len(tickerSymbols))
+    tickerBoundaries = np.cumsum(tradesPerTicker)[:-1]
+    tradeReturns = np.split(trades['return'].to_numpy(), tickerBoundaries)
+    closingIndices = np.split(trades['closeIndex'].to_numpy(), tickerBoundaries)
+    tradeSeries = {j: pd.DataFrame(tradeReturns[i], index = closingIndices[i]) for i, j in enumerate(tickerSymbols)}
+
+    return ({'stateCodes': stateCodes,
+             'trades': trades.drop(columns = ['tickerIndex']),
+             'tradeSeries': tradeSeries,
+             'portfolio': portfolioSeries(allAssetTimeSeries, trades)})
@@ -0,0 +1,557 @@
+import json
+import platform
+import sys
+import time
+import os
+import numpy as np
+import pandas as pd
+from backtestDriver import BacktestDriver, columnIndices, slidingWindows
+from backtestStrategy import Strategy, RollingMinimumStrategy, PriceColumns, vectorizedStateCodes, referenceStateCodes
+
+
+def syntheticAssetTimeSeries(numberOfBars: int,
+                             seed: int = 0) -> np.ndarray:
+
+    '''
+    Generates a random walk of OHLCV bars laid out the same way as the arrays returned by claydates, [Date, Open, High, Low, Close, Volume].
+    The date column holds epoch seconds spaced one minute apart so that the whole array can stay float64.
+
+    Parameters
+    ----------
+    numberOfBars : int
+        the number of bars to generate.
+    seed : int
+        the seed for the random number generator.
+    '''
+
+    generator = np.random.default_rng(seed)
+    closes = 100.0 * np.exp(np.cumsum(generator.normal(0.0, 0.001, numberOfBars)))
+    opens = np.empty(numberOfBars)
+    opens[0] = 100.0
+    opens[1:] = closes[:-1]
+    spreads = np.abs(generator.normal(0.0, 0.0005, numberOfBars)) * closes
+
+    assetTimeSeries = np.empty((numberOfBars, 6), dtype = np.float64)
+    assetTimeSeries[:, 0] = 1672531200 + 60 * np.arange(numberOfBars)
+    assetTimeSeries[:, 1] = opens
+    assetTimeSeries[:, 2] = np.maximum(opens, closes) + spreads
+    assetTimeSeries[:, 3] = np.minimum(opens, closes) - spreads
+    assetTimeSeries[:, 4] = closes
+    assetTimeSeries[:, 5] = generator.integers(100, 10000, numberOfBars)
+
+    return (assetTimeSeries)
+
+
+def timeCall(function,
+             repeats: int = 3) -> float:
+
+    '''Returns the best wall-clock time, in seconds, out of a number of calls to function.'''
+
+    bestTime = float('inf')
+    for _ in range(repeats):
+        startTime = time.perf_counter()
+        function()
+        bestTime = min(bestTime, time.perf_counter() - startTime)
+
+    return (bestTime)
+
+
+def benchmarkWindowing(barCounts: tuple[int] = (100_000, 1_000_000, 10_000_000),
+                       subframeLength: int = 60,
+                       gapToNextFrame: int = 1,
+                       listPathLimit: int = 100_000) -> list[tuple]:
+
+    '''
+    Compares batcher() against windowView() over synthetic series. batcher() is only timed up to listPathLimit bars, since it needs one
+    Python object per value in every window and quickly runs out of memory on longer series.
+    '''
+
+    results = []
+    for numberOfBars in barCounts:
+        closes = syntheticAssetTimeSeries(numberOfBars)[:, 4]
+        viewTime = timeCall(lambda: slidingWindows(closes, subframeLength, gapToNextFrame).min(axis = -1))
+        listTime = float('nan')
+        if (numberOfBars <= listPathLimit):
+            backtest = BacktestDriver.__new__(BacktestDriver)
+            backtest._assetTimeSeries = closes
+            listTime = timeCall(lambda: [min(i) for i in backtest.batcher(subframeLength, gapToNextFrame)], repeats = 1)
+        results.append(('windowing', numberOfBars, listTime, viewTime))
+        print('{:>10} bars | batcher: {:>9.4f} s | windowView: {:>9.4f} s'.format(numberOfBars, listTime, viewTime))
+
+    return (results)
+
+
+def benchmarkStreaming(numberOfBars: int = 1_000_000) -> float:
+
+    '''Reports the average latency of StreamingBacktest.onBar(), in microseconds per bar.'''
+
+    from backtestStream import StreamingBacktest
+
+    closes = syntheticAssetTimeSeries(numberOfBars)[:, 4].tolist()
+    stream = StreamingBacktest()
+    startTime = time.perf_counter()
+    for i in closes:
+        stream.onBar(i)
+    latency = (time.perf_counter() - startTime) / numberOfBars * 1e6
+    print('{:>10} bars | onBar: {:>7.2f} us/bar'.format(numberOfBars, latency))
+
+    return (latency)
+
+
+def benchmarkStatistics(numberOfSeries: int = 10_000,
+                        numberOfPeriods: int = 100_000,
+                        seriesPerBlock: int = 100) -> float:
+
+    '''
+    Reports the time taken by backtestStatistics.returnStatistics() to evaluate numberOfSeries return series of numberOfPeriods each.
+    The series are evaluated in blocks of seriesPerBlock rows, so that memory stays bounded, and one random block is reused for every block.
+    '''
+
+    from backtestStatistics import returnStatistics
+
+    returnBlock = np.random.default_rng(0).normal(0.0, 0.001, (seriesPerBlock, numberOfPeriods))
+    returnStatistics(returnBlock[:1, :10], 1.0)
+    startTime = time.perf_counter()
+    for _ in range(numberOfSeries // seriesPerBlock):
+        returnStatistics(returnBlock, 1.0, 0.04)
+    totalTime = time.perf_counter() - startTime
+    print('{:>6} series x {:>8} periods | returnStatistics: {:>8.2f} s ({:.0f} series/s)'.format(numberOfSeries, numberOfPeriods, totalTime, numberOfSeries / totalTime))
+
+    return (totalTime)
+
+
+def benchmarkStrategy(strategy: Strategy = None,
+                      barCounts: tuple[int] = (10_000, 100_000, 1_000_000, 10_000_000),
+                      referenceLimit: int = 100_000) -> list[tuple]:
+
+    '''
+    Compares the time taken by the per-bar reference path of a strategy, backtestStrategy.referenceStateCodes(), with that of its vectorized
+    signals run through vectorizedStateCodes(). The reference path is only timed up to referenceLimit bars. Defaults to RollingMinimumStrategy.
+    tests/test_strategy.py checks that the two paths agree.
+    '''
+
+    strategy = strategy if (strategy is not None) else RollingMinimumStrategy()
+    results = []
+    for numberOfBars in barCounts:
+        assetTimeSeries = syntheticAssetTimeSeries(numberOfBars)
+        prices = PriceColumns(lambda name: assetTimeSeries[:, columnIndices[name]])
+        vectorizedTime = timeCall(lambda: vectorizedStateCodes(strategy, PriceColumns(lambda name: assetTimeSeries[:, columnIndices[name]]))) # Fresh columns, so that derived values are not reused between calls
+        referenceTime = float('nan')
+        if (numberOfBars <= referenceLimit):
+            referenceTime = timeCall(lambda: referenceStateCodes(strategy, prices), repeats = 1)
+        results.append(('strategy', numberOfBars, referenceTime, vectorizedTime))
+        print('{:>10} bars | per bar: {:>9.4f} s | vectorized: {:>9.4f} s'.format(numberOfBars, referenceTime, vectorizedTime))
+
+    return (results)
+
+
+def benchmarkParameterSweep(numberOfBars: int = 100_000,
+                            workerCounts: tuple[int] = None) -> list[tuple]:
+
+    '''Reports the throughput of backtestSweep.parameterSweep(), in backtests per second, for increasing numbers of worker processes.'''
+
+    from backtestSweep import parameterSweep
+
+    assetTimeSeries = syntheticAssetTimeSeries(numberOfBars)
+    strategyParameterGrid = {'subframeLength': [5, 8, 12, 20], 'entryCount': [2, 3, 4], 'exitIndex': [1, 2, 3]}
+    numberOfBacktests = len(strategyParameterGrid['subframeLength']) * len(strategyParameterGrid['entryCount']) * len(strategyParameterGrid['exitIndex'])
+    workerCounts = workerCounts if (workerCounts is not None) else sorted({1, 2, 4, os.cpu_count() or 1})
+
+    results = []
+    for maxWorkers in workerCounts:
+        sweepTime = timeCall(lambda: parameterSweep(assetTimeSeries, strategyParameterGrid, maxWorkers = maxWorkers), repeats = 1)
+        results.append(('parameterSweep', maxWorkers, numberOfBacktests / sweepTime))
+        print('{:>3} worker(s) | {:>9.1f} backtests/s over {} bars'.format(maxWorkers, numberOfBacktests / sweepTime, numberOfBars))
+
+    return (results)
+
+
+def benchmarkExecution(numberOfBars: int = 1_000_000) -> tuple[float, float]:
+
+    '''
+    Reports the time taken by backtestExecution.ExecutionModel.execute() over the order pairs of one backtest, next to the time taken to
+    build the trade results of the same backtest without a model, so that the cost of the model inside a parameter sweep can be judged.
+    '''
+
+    from backtestExecution import ExecutionModel
+
+    backtest = BacktestDriver(['BENCH'], '1min', numberOfBars, assetTimeSeries = syntheticAssetTimeSeries(numberOfBars))
+    orderIndices = backtest.tradeResults()['orderIndices']
+    executionModel = ExecutionModel(commissionRate = 0.0005, commissionPerOrder = 1.0, spreadBps = 2.0, impactCoefficient = 0.1,
+                                    fillAt = 'nextOpen', positionSize = 0.5)
+    prices = backtest.priceColumns()
+    for i in ('open', 'volume'):
+        prices[i] # Load the columns before timing
+    executionTime = timeCall(lambda: executionModel.execute(prices, orderIndices))
+    tradeResultsTime = timeCall(lambda: backtest.buildTradeResults())
+    print('{:>9} bars, {:>7} trades | execute: {:>8.2f} ms | trade results without a model: {:>8.2f} ms'.format(
+        numberOfBars, len(orderIndices) // 2, executionTime * 1_000, tradeResultsTime * 1_000))
+
+    return (executionTime, tradeResultsTime)
+
+
+def benchmarkInstrumentation(numberOfBars: int = 1_000_000) -> dict[str, float]:
+
+    '''
+    Reports the time taken by a backtest, from the strategy through to the cumulative and drawdown series, without instrumentation, with
+    timers only, and with memory tracking, so that the overhead of each can be judged. Each backtest is built from scratch.
+    '''
+
+    from backtestInstrumentation import Instrumentation
+
+    assetTimeSeries = syntheticAssetTimeSeries(numberOfBars)
+
+    def runBacktest(instrumentation: Instrumentation) -> None:
+        backtest = BacktestDriver(['BENCH'], '1min', numberOfBars, assetTimeSeries = assetTimeSeries, instrumentation = instrumentation)
+        backtest.computeReturnSeries()
+        backtest.cumulativeSeries()
+        backtest.drawdownSeries()
+
+    runTimes = {'disabled': timeCall(lambda: runBacktest(None)),
+                'timers': timeCall(lambda: runBacktest(Instrumentation())),
+                'timers and memory': timeCall(lambda: runBacktest(Instrumentation(trackMemory = True)))}
+    for i, j in runTimes.items():
+        print('{:>9} bars | instrumentation {:<17}: {:>8.2f} ms ({:+.1%})'.format(numberOfBars, i, j * 1_000, j / runTimes['disabled'] - 1))
+
+    return (runTimes)
+
+
+def benchmarkMemoryLayout(numberOfBars: int = 1_000_000) -> dict[str, int]:
+
+    '''
+    Reports the memory held by the same bars as an object array of datetimes and floats, as claydates returns them, as the float64 array the
+    platform uses, and as a BarSeries with float32 prices, and by the same trades as a list of (index, price) tuples and as trade records.
+    '''
+
+    import tracemalloc
+    from backtestData import BarSeries
+
+    assetTimeSeries = syntheticAssetTimeSeries(numberOfBars)
+    backtest = BacktestDriver(['BENCH'], '1min', numberOfBars, assetTimeSeries = assetTimeSeries)
+    backtest.tradeRecords()
+    backtest.barDates()
+
+    def allocatedBytes(function) -> int:
+        tracemalloc.start()
+        result = function()
+        allocated = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del result
+        return (allocated)
+
+    memoryUsed = {'object array': allocatedBytes(lambda: np.column_stack((backtest.barDates().astype('datetime64[us]').astype(object), assetTimeSeries[:, 1:].astype(object)))),
+                  'float64 array': allocatedBytes(lambda: assetTimeSeries.copy()),
+                  'BarSeries (float32)': allocatedBytes(lambda: BarSeries.fromArray(assetTimeSeries, np.float32)),
+                  'order tuples': allocatedBytes(backtest.buildOpeningAndClosingOrders),
+                  'trade records': allocatedBytes(lambda: backtest.tradeRecords().copy())}
+    for i, j in memoryUsed.items():
+        print('{:>9} bars | {:<20}: {:>14,} bytes'.format(numberOfBars, i, j))
+
+    return (memoryUsed)
+
+
+def benchmarkChunked(barCounts: tuple[int] = (1_000_000, 4_000_000),
+                     blockLength: int = 250_000) -> list[tuple]:
+
+    '''
+    Reports the time and the peak memory allocated by backtestChunked.chunkedBacktest() over a memory-mapped series of each length, next
+    to an in-memory backtest of the same series. Beyond one block, the chunked peak grows with the number of orders rather than of bars.
+    '''
+
+    import tempfile
+    import tracemalloc
+    from backtestChunked import chunkedBacktest, barSeriesBlocks
+    from backtestData import BarSeries
+
+    def peakAllocated(function) -> tuple[float, int]:
+        tracemalloc.start()
+        startTime = time.perf_counter()
+        function()
+        runTime = time.perf_counter() - startTime
+        peakMemory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return (runTime, peakMemory)
+
+    results = []
+    for numberOfBars in barCounts:
+        with tempfile.TemporaryDirectory() as directory:
+            BarSeries.fromArray(syntheticAssetTimeSeries(numberOfBars)).save(directory)
+            chunkedTime, chunkedPeak = peakAllocated(lambda: chunkedBacktest(barSeriesBlocks(BarSeries.load(directory), blockLength)))
+            inMemoryTime, inMemoryPeak = peakAllocated(lambda: BacktestDriver(['BENCH'], '1min', numberOfBars, assetTimeSeries = BarSeries.load(directory, mmapMode = None).toArray()).tradeResults())
+        results.append(('chunked', numberOfBars, chunkedTime, chunkedPeak, inMemoryTime, inMemoryPeak))
+        print('{:>9} bars | chunked ({} bar blocks): {:>7.2f} s, {:>13,} bytes | in memory: {:>7.2f} s, {:>13,} bytes'.format(
+            numberOfBars, blockLength, chunkedTime, chunkedPeak, inMemoryTime, inMemoryPeak))
+
+    return (results)
+
+
+def benchmarkWalkForward(numberOfBars: int = 200_000,
+                         trainLength: int = 50_000,
+                         testLength: int = 10_000,
+                         workerCounts: tuple[int] = None) -> list[tuple]:
+
+    '''Reports the time taken by backtestWalkForward.walkForward(), with folds that overlap by half a train slice, for increasing numbers of worker processes.'''
+
+    from backtestWalkForward import walkForward
+
+    assetTimeSeries = syntheticAssetTimeSeries(numberOfBars)
+    strategyParameterGrid = {'subframeLength': [5, 8, 12, 20], 'entryCount': [2, 3], 'exitIndex': [1, 2]}
+    workerCounts = workerCounts if (workerCounts is not None) else sorted({1, 2, 4, os.cpu_count() or 1})
+
+    results = []
+    for maxWorkers in workerCounts:
+        walkForwardTime = timeCall(lambda: walkForward(assetTimeSeries, strategyParameterGrid, trainLength, testLength, step = trainLength // 2, maxWorkers = maxWorkers), repeats = 1)
+        results.append(('walkForward', maxWorkers, walkForwardTime))
+        print('{:>3} worker(s) | walk-forward: {:>9.4f} s over {} bars'.format(maxWorkers, walkForwardTime, numberOfBars))
+
+    return (results)
+
+
+def benchmarkPlotting(barCounts: tuple[int] = (10_000, 100_000, 1_000_000),
+                      downsamplings: tuple[str] = (None, 'envelope', 'lttb'),
+                      fileFormats: tuple[str] = ('png', 'svg')) -> list[tuple]:
+
+    '''
+    Reports the time taken to render and write the three plots headlessly, and the total size of the files, for each downsampling mode and
+    file format. The backtest itself is computed before timing, so only the plotting is measured.
+    '''
+
+    import tempfile
+    from backtestPlotter import BacktestPlotter, exportPlots
+
+    results = []
+    for numberOfBars in barCounts:
+        backtest = BacktestPlotter(['SYNTHETIC'], '1min', numberOfBars, assetTimeSeries = syntheticAssetTimeSeries(numberOfBars))
+        backtest.cumulativeSeries()
+        backtest.drawdownSeries()
+        for downsampling in downsamplings:
+            for fileFormat in fileFormats:
+                with tempfile.TemporaryDirectory() as directory:
+                    startTime = time.perf_counter()
+                    paths = exportPlots(backtest, directory, downsampling = downsampling, fileFormat = fileFormat)
+                    renderTime = time.perf_counter() - startTime
+                    fileSize = sum(os.path.getsize(i) for i in paths)
+                results.append(('plotting', numberOfBars, str(downsampling), fileFormat, renderTime, fileSize))
+                print('{:>10} bars | {:>8} | {:>3} | {:>9.4f} s | {:>12,} bytes'.format(numberOfBars, str(downsampling), fileFormat, renderTime, fileSize))
+
+    return (results)
+
+
+class BenchmarkRegression(AssertionError):
+
+    '''Raised by compareWithBaseline() when a benchmark of the suite is slower, or uses more memory, than its stored baseline allows.'''
+
+
+defaultBaselinePath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarkBaseline.json')
+
+
+def suiteCases() -> dict[str, tuple]:
+
+    '''
+    Returns the cases of benchmarkSuite() as name: (prepare, run, maximumBars). prepare computes, untimed, the results that run depends on,
+    so that each case measures only its own stage. Cases whose cost grows too quickly to run on every size stop at maximumBars.
+    '''
+
+    from backtestPlotter import individualTradesData, cumulativeSeriesData, drawdownData
+
+    return ({'batcher': (lambda backtest: backtest.seriesColumn(), lambda backtest: backtest.batcher(5, 1), 1_000_000),
+             'positionStates': (lambda backtest: backtest.seriesColumn(), lambda backtest: backtest.positionStates(), None),
+             'computeReturnSeries': (lambda backtest: backtest.positionStateCodes(), lambda backtest: backtest.computeReturnSeries(), None),
+             'percentageChangeSeries': (lambda backtest: backtest.tradeResults(),
+                                        lambda backtest: (backtest.percentageChangeSeries(1), backtest.percentageChangeSeries(2)), None),
+             'tradeSeriesWithPositionIndices': (lambda backtest: backtest.percentageChangeSeries(1), lambda backtest: backtest.tradeSeriesWithPositionIndices(), None),
+             'individualTradesData': (lambda backtest: backtest.tradeResults(), individualTradesData, None),
+             'cumulativeSeriesData': (lambda backtest: backtest.tradeResults(), cumulativeSeriesData, None),
+             'drawdownData': (lambda backtest: backtest.tradeResults(), drawdownData, None)})
+
+
+def benchmarkEnvironment() -> dict[str, str | int]:
+
+    '''Describes the machine and library versions that a benchmark ran with, so that baselines from different setups are not compared by mistake.'''
+
+    try:
+        import numba
+        numbaVersion = numba.__version__
+    except ImportError:
+        numbaVersion = None
+
+    return ({'python': platform.python_version(),
+             'numpy': np.__version__,
+             'pandas': pd.__version__,
+             'numba': numbaVersion,
+             'machine': platform.machine(),
+             'processor': platform.processor(),
+             'system': platform.system(),
+             'cpuCount': os.cpu_count()})
+
+
+def benchmarkSuite(barCounts: tuple[int] = (1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+                   cases: tuple[str] = None,
+                   repeats: int = 3,
+                   seed: int = 0) -> pd.DataFrame:
+
+    '''
+    Times each stage of the backtest core on synthetic bars of every size in barCounts, and measures the peak memory it allocates. Every
+    call runs on a new backtest, so that no cached result is reused, and the series are generated from a fixed seed so that runs are
+    comparable. Returns one row per case and size with the best time over the repeats, the throughput in bars per second, and the peak
+    memory in bytes, measured in a separate run with tracemalloc. tests/test_benchmarks.py runs the same cases under pytest-benchmark.
+
+    Parameters
+    ----------
+    barCounts : tuple[int]
+        the sizes of the series to benchmark.
+    cases : tuple[str], optional
+        the names of the cases to run, from suiteCases(). Defaults to all of them.
+    repeats : int
+        the number of timed calls per case and size. The fastest is kept.
+    seed : int
+        the seed of syntheticAssetTimeSeries().
+    '''
+
+    from backtestInstrumentation import Instrumentation
+
+    allCases = suiteCases()
+    cases = cases if (cases is not None) else tuple(allCases)
+    unknownCases = set(cases) - set(allCases)
+    if unknownCases:
+        raise ValueError('Invalid argument(s). Valid arguments are: ' + ', '.join('\'' + i + '\'' for i in allCases))
+
+    rows = []
+    for numberOfBars in barCounts:
+        assetTimeSeries = syntheticAssetTimeSeries(numberOfBars, seed)
+        for caseName in cases:
+            prepare, run, maximumBars = allCases[caseName]
+            if (maximumBars is not None) and (numberOfBars > maximumBars):
+                continue
+
+            def preparedBacktest() -> BacktestDriver:
+                backtest = BacktestDriver(['BENCH'], '1min', numberOfBars, assetTimeSeries = assetTimeSeries)
+                prepare(backtest)
+                return (backtest)
+
+            bestTime = float('inf')
+            for _ in range(repeats):
+                backtest = preparedBacktest()
+                startTime = time.perf_counter()
+                run(backtest)
+                bestTime = min(bestTime, time.perf_counter() - startTime)
+
+            instrumentation = Instrumentation(trackMemory = True)
+            backtest = preparedBacktest()
+            with instrumentation.stage(caseName):
+                run(backtest)
+            del backtest
+
+            rows.append({'case': caseName,
+                         'numberOfBars': numberOfBars,
+                         'seconds': bestTime,
+                         'barsPerSecond': numberOfBars / bestTime,
+                         'peakMemory': instrumentation.records()[0]['peakMemory']})
+            print('{:<32} {:>10} bars | {:>10.4f} s | {:>14,.0f} bars/s | {:>14,} bytes'.format(caseName, numberOfBars, bestTime, numberOfBars / bestTime, rows[-1]['peakMemory']))
+
+    return (pd.DataFrame(rows, columns = ['case', 'numberOfBars', 'seconds', 'barsPerSecond', 'peakMemory']))
+
+
+def saveBenchmarkBaseline(results: pd.DataFrame,
+                          baselinePath: str = defaultBaselinePath) -> None:
+
+    '''Stores the results of benchmarkSuite(), along with benchmarkEnvironment(), as the baseline that later runs are compared with.'''
+
+    with open(baselinePath, 'w') as baselineFile:
+        json.dump({'createdAt': time.time(), 'environment': benchmarkEnvironment(), 'results': results.to_dict(orient = 'records')}, baselineFile, indent = 1)
+
+
+def compareWithBaseline(results: pd.DataFrame,
+                        baselinePath: str = defaultBaselinePath,
+                        timeTolerance: float = 0.25,
+                        memoryTolerance: float = 0.10,
+                        timeFloor: float = 0.005,
+                        memoryFloor: int = 1_000_000) -> pd.DataFrame:
+
+    '''
+    Compares the results of benchmarkSuite() with a stored baseline, matching rows by case and size. Returns the comparison, with the ratio
+    of each time and peak memory to the baseline, and raises BenchmarkRegression, listing every regression, when any case is slower or
+    uses more memory than the tolerances allow. Baseline rows of the cases and sizes in results must all be matched, and so must every row
+    of results, otherwise BenchmarkRegression is raised listing the unmatched rows.
+
+    Parameters
+    ----------
+    results : pd.DataFrame
+        the output of benchmarkSuite().
+    baselinePath : str
+        the file written by saveBenchmarkBaseline().
+    timeTolerance : float
+        how much slower than the baseline a case may be, e.g. 0.25 for 25%.
+    memoryTolerance : float
+        how much more memory than the baseline a case may allocate.
+    timeFloor : float
+        times below this many seconds are treated as this many, so that the noise of very short calls does not fail the comparison.
+    memoryFloor : int
+        the same as timeFloor, for the peak memory in bytes.
+    '''
+
+    if not os.path.exists(baselinePath):
+        raise FileNotFoundError('No benchmark baseline at ' + baselinePath + '. Store one with saveBenchmarkBaseline(), or run: python backtestBenchmarks.py --suite --save-baseline')
+    with open(baselinePath) as baselineFile:
+        baseline = json.load(baselineFile)
+    if (baseline['environment'] != benchmarkEnvironment()):
+        print('Warning: the baseline was recorded with ' + str(baseline['environment']) + ', and this run uses ' + str(benchmarkEnvironment()))
+
+    # Only the cases and sizes of this run are compared, so that a run of a few cases can be checked against a full baseline. Within them,
+    # a row on either side without a match fails the comparison rather than being dropped.
+    baselineResults = pd.DataFrame(baseline['results'])
+    baselineResults = baselineResults[baselineResults['case'].isin(results['case']) & baselineResults['numberOfBars'].isin(results['numberOfBars'])]
+    comparison = results.merge(baselineResults, how = 'outer', on = ['case', 'numberOfBars'], suffixes = ('', 'Baseline'), indicator = True)
+    unmatched = comparison[comparison['_merge'] != 'both']
+    if (len(unmatched) > 0):
+        problems = unmatched['_merge'].astype(str).map({'left_only': 'missing from the baseline', 'right_only': 'missing from this run'})
+        raise BenchmarkRegression(str(len(unmatched)) + ' benchmark(s) could not be matched with ' + baselinePath + ':\n'
+                                  + unmatched[['case', 'numberOfBars']].assign(problem = problems).to_string(index = False))
+    comparison = comparison.drop(columns = '_merge')
+    comparison['timeRatio'] = np.maximum(comparison['seconds'], timeFloor) / np.maximum(comparison['secondsBaseline'], timeFloor)
+    comparison['memoryRatio'] = np.maximum(comparison['peakMemory'], memoryFloor) / np.maximum(comparison['peakMemoryBaseline'], memoryFloor)
+    regressions = comparison[(comparison['timeRatio'] > 1 + timeTolerance) | (comparison['memoryRatio'] > 1 + memoryTolerance)]
+    if (len(regressions) > 0):
+        raise BenchmarkRegression(str(len(regressions)) + ' benchmark(s) regressed against ' + baselinePath + ':\n'
+                                  + regressions[['case', 'numberOfBars', 'seconds', 'secondsBaseline', 'timeRatio', 'peakMemory', 'peakMemoryBaseline', 'memoryRatio']].to_string(index = False))
+
+    return (comparison)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description = 'Benchmarks the backtesting platform. Without options, runs every benchmark. The correctness checks live in tests/ and run with pytest.')
+    parser.add_argument('--suite', action = 'store_true', help = 'run the benchmark suite and compare it with the stored baseline')
+    parser.add_argument('--save-baseline', action = 'store_true', help = 'store the results of the suite as the new baseline instead of comparing')
+    parser.add_argument('--baseline', default = defaultBaselinePath, help = 'the baseline file')
+    parser.add_argument('--bars', type = int, nargs = '+', default = [1_000, 10_000, 100_000, 1_000_000, 10_000_000], help = 'the series sizes of the suite')
+    parser.add_argument('--cases', nargs = '+', default = None, help = 'the cases of the suite to run')
+    parser.add_argument('--tolerance', type = float, default = 0.25, help = 'the fraction by which a case may be slower than the baseline')
+    arguments = parser.parse_args()
+
+    if arguments.suite:
+        suiteResults = benchmarkSuite(tuple(arguments.bars), tuple(arguments.cases) if arguments.cases else None)
+        if arguments.save_baseline:
+            saveBenchmarkBaseline(suiteResults, arguments.baseline)
+            print('Stored the baseline at ' + arguments.baseline)
+        else:
+            try:
+                compareWithBaseline(suiteResults, arguments.baseline, timeTolerance = arguments.tolerance)
+            except BenchmarkRegression as regression:
+                print(regression, file = sys.stderr)
+                sys.exit(1)
+            print('No regressions against ' + arguments.baseline)
+        sys.exit(0)
+
+    benchmarkWindowing()
+    benchmarkStrategy()
+    benchmarkParameterSweep()
+    benchmarkExecution()
+    benchmarkInstrumentation()
+    benchmarkMemoryLayout()
+    benchmarkChunked()
+    benchmarkWalkForward()
+    benchmarkStreaming()
+    benchmarkPlotting()
+    benchmarkStatistics()
@@ -0,0 +1,168 @@
+import numpy as np
+from typing import Any, Iterable, Iterator
+import backtestKernels as kernels
+from backtestData import BarSeries, columnNames
+from backtestDriver import tradeResultsFromOrders
+from backtestExecution import ExecutionModel
+from backtestStrategy import Strategy, RollingMinimumStrategy, PriceColumns
+
+
+def barSeriesBlocks(bars: BarSeries | np.ndarray,
+                    blockLength: int) -> Iterator[BarSeries]:
+
+    '''
+    Yields consecutive blocks of blockLength bars from a series, as BarSeries. The blocks of a BarSeries are views, so the blocks of a
+    memory-mapped one, from BarSeries.load() or CachedDataSource(memoryMapped = True), are only read from disk as they are backtested.
+    '''
+
+    for start in range(0, len(bars), blockLength):
+        block = bars[start:start + blockLength]
+        yield (block if isinstance(block, BarSeries) else BarSeries.fromArray(block))
+
+
+def parquetBlocks(path: str,
+                  blockLength: int) -> Iterator[BarSeries]:
+
+    '''
+    Yields consecutive blocks of up to blockLength bars from a Parquet file with the columns Date, Open, High, Low, Close and Volume, in
+    any case. Dates may be stored as timestamps or as epoch seconds. Only one block is held in memory at a time. Requires pyarrow.
+    '''
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('pyarrow is not installed. Install it with: pip install pyarrow') from None
+
+    parquetFile = pq.ParquetFile(path)
+    fileColumns = {i.lower(): i for i in parquetFile.schema_arrow.names}
+    for batch in parquetFile.iter_batches(batch_size = blockLength, columns = [fileColumns[i] for i in columnNames]):
+        dates = batch.column(0)
+        if pa.types.is_timestamp(dates.type):
+            dates = dates.cast(pa.timestamp('s'), safe = False).cast(pa.int64())
+        yield (BarSeries({'date': dates.to_numpy(zero_copy_only = False),
+                          **{j: batch.column(i).to_numpy(zero_copy_only = False) for i, j in enumerate(columnNames[1:], start = 1)}}))
+
+
+def joinedBlocks(history: BarSeries,
+                 block: BarSeries) -> BarSeries:
+
+    if (history is None):
+        return (block)
+
+    return (BarSeries({i: np.concatenate((history[i], block[i])) for i in columnNames}))
+
+
+def chunkedBacktest(blocks: Iterable[BarSeries],
+                    strategy: Strategy = None,
+                    executionModel: ExecutionModel = None,
+                    stateCodesPath: str = None) -> dict[str, Any]:
+
+    '''
+    Backtests a series that is read one block at a time, so that memory stays bounded by the block length however long the series is.
+    Returns the same trade results as BacktestDriver.tradeResults() for the whole series in memory, with the bars of the orders numbered
+    from the start of the series, along with 'numberOfBars', the length of the series.
+
+    Each block is joined to the last strategy.lookbackLength() bars of the one before it, so that the strategy's signals match those of
+    the whole series, and the position state machine continues from the state the previous block ended in. Only the bars of the orders
+    are kept from each block, and the trades are built from them, with the execution model, once the last block has been read.
+
+    Parameters
+    ----------
+    blocks : Iterable[BarSeries]
+        the consecutive blocks of the series, e.g. from barSeriesBlocks() or parquetBlocks(). Blocks may be of any length.
+    strategy : Strategy, optional
+        the strategy to backtest. Defaults to backtestStrategy.RollingMinimumStrategy.
+    executionModel : ExecutionModel, optional
+        the costs applied to the trades. See backtestExecution.
+    stateCodesPath : str, optional
+        when given, the state code of every bar after the warm-up, as BacktestDriver.positionStateCodes() returns them, is appended to this
+        file as raw uint8 values as each block is processed. Read it back with np.fromfile(stateCodesPath, dtype = np.uint8).
+    '''
+
+    strategy = strategy if (strategy is not None) else RollingMinimumStrategy()
+    warmUpLength = strategy.warmUpLength()
+    lookbackLength = max(strategy.lookbackLength(), warmUpLength)
+    if (stateCodesPath is not None):
+        open(stateCodesPath, 'wb').close()
+
+    history = None
+    states = None
+    blockStart = 0 # The index, within the whole series, of the first bar of the current block
+    orderIndices = []
+    barsAtOrders = []
+    barsAfterOrders = []
+    for block in blocks:
+        if (len(block) == 0):
+            continue
+        bars = joinedBlocks(history, block)
+        historyLength = len(bars) - len(block)
+        seriesOffset = blockStart - historyLength
+        prices = PriceColumns(lambda name: np.asarray(bars[name], dtype = np.float64))
+
+        # The order of the last bar of the previous block is filled at the first bar of this one with 'nextOpen'.
+        if barsAfterOrders and (len(barsAfterOrders[-1]) > 0) and np.isnan(barsAfterOrders[-1][-1, 0]):
+            barsAfterOrders[-1][-1] = [prices[i][historyLength] for i in columnNames]
+
+        firstStateIndex = max(warmUpLength - seriesOffset, historyLength)
+        if (firstStateIndex < len(bars)):
+            entrySignals, exitSignals = strategy.signals(prices)
+            stateCodes = kernels.stateTransitions(entrySignals[firstStateIndex:], exitSignals[firstStateIndex:], 1, states)
+            states = kernels.finalStates(entrySignals[firstStateIndex:], stateCodes, states)
+            if (stateCodesPath is not None):
+                with open(stateCodesPath, 'ab') as stateCodesFile:
+                    stateCodes.tofile(stateCodesFile)
+
+            blockOrderIndices = np.flatnonzero((stateCodes == kernels.OPENED) | (stateCodes == kernels.CLOSED)) + firstStateIndex
+            barsAfter = np.full((len(blockOrderIndices), len(columnNames)), np.nan)
+            hasNextBar = (blockOrderIndices + 1) < len(bars)
+            for i, j in enumerate(columnNames):
+                barsAfter[hasNextBar, i] = prices[j][blockOrderIndices[hasNextBar] + 1]
+            orderIndices.append(blockOrderIndices + seriesOffset)
+            barsAtOrders.append(np.column_stack([prices[i][blockOrderIndices] for i in columnNames]))
+            barsAfterOrders.append(barsAfter)
+
+        history = BarSeries({i: np.array(bars[i][max(0, len(bars) - lookbackLength):]) for i in columnNames}) # Copied, so that the joined block can be freed
+        blockStart += len(block)
+
+    return (compactTradeResults(np.concatenate(orderIndices) if orderIndices else np.empty(0, dtype = np.int64),
+                                np.concatenate(barsAtOrders) if barsAtOrders else np.empty((0, len(columnNames))),
+                                np.concatenate(barsAfterOrders) if barsAfterOrders else np.empty((0, len(columnNames))),
+                                blockStart,
+                                executionModel))
+
+
+def compactTradeResults(orderIndices: np.ndarray,
+                        barsAtOrders: np.ndarray,
+                        barsAfterOrders: np.ndarray,
+                        numberOfBars: int,
+                        executionModel: ExecutionModel) -> dict[str, Any]:
+
+    '''
+    Builds the trade results of chunkedBacktest() from the bar of each order and the bar after it. The bars are laid out as a short series,
+    at and after each order in turn, so that the execution model reads the same prices it would from the whole series, and the bars of
+    the results are then mapped back to their place in the whole series.
+    '''
+
+    if ((len(orderIndices) % 2) == 1):
+        orderIndices, barsAtOrders, barsAfterOrders = orderIndices[:-1], barsAtOrders[:-1], barsAfterOrders[:-1]
+    compactBars = np.empty((2 * len(orderIndices), len(columnNames)))
+    compactBars[0::2] = barsAtOrders
+    compactBars[1::2] = barsAfterOrders
+    seriesIndices = np.column_stack((orderIndices, orderIndices + 1)).ravel()
+    if (len(orderIndices) > 0) and (orderIndices[-1] == numberOfBars - 1):
+        compactBars, seriesIndices = compactBars[:-1], seriesIndices[:-1] # No bar follows the last one, as in the whole series
+
+    prices = PriceColumns(None, {j: compactBars[:, i] for i, j in enumerate(columnNames)})
+    tradeResults = tradeResultsFromOrders(2 * np.arange(len(orderIndices)), prices, executionModel)
+    tradeResults['orderIndices'] = seriesIndices[tradeResults['orderIndices']]
+    tradeRecords = tradeResults['tradeRecords']
+    tradeRecords['entryIndex'] = seriesIndices[tradeRecords['entryIndex']]
+    tradeRecords['exitIndex'] = seriesIndices[tradeRecords['exitIndex']]
+    tradeRecords['holdingPeriod'] = tradeResults['orderIndices'][1::2] - tradeResults['orderIndices'][0::2]
+    if ('execution' in tradeResults):
+        tradeResults['execution']['entryIndices'] = tradeRecords['entryIndex']
+        tradeResults['execution']['exitIndices'] = tradeRecords['exitIndex']
+    tradeResults['numberOfBars'] = numberOfBars
+
+    return (tradeResults)
@@ -0,0 +1,481 @@
+from claydates import MultiTickerProcessor
+import pandas as pd
+import numpy as np
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+
+columnNames = ('date', 'open', 'high', 'low', 'close', 'volume')
+
+secondsPerInterval = {'1min': 60, '5min': 300, '15min': 900, '30min': 1800, '45min': 2700, '1h': 3600, '2h': 7200, '4h': 14400,
+                      '8h': 28800, '1day': 86400, '1week': 604800, '1month': 2629800}
+
+
+def barsToArray(assetTimeSeries: np.ndarray) -> np.ndarray:
+
+    '''
+    Converts an array of bars as returned by claydates, [Date, Open, High, Low, Close(, Volume)] with datetimes in the first column, into a
+    float64 array of shape (bars, 6) whose first column holds epoch seconds. Series without volume, such as currency pairs, get a NaN volume column.
+    A BarSeries is converted with BarSeries.toArray(), and an array that is already laid out this way is returned as it is.
+    '''
+
+    if isinstance(assetTimeSeries, BarSeries):
+        return (assetTimeSeries.toArray())
+    if (assetTimeSeries.dtype == np.float64) and (assetTimeSeries.ndim == 2) and (assetTimeSeries.shape[1] == 6):
+        return (assetTimeSeries)
+    bars = np.full((len(assetTimeSeries), 6), np.nan, dtype = np.float64)
+    if (len(assetTimeSeries) == 0):
+        return (bars)
+    dates = assetTimeSeries[:, 0]
+    if not np.issubdtype(np.asarray(dates).dtype, np.number):
+        dates = pd.to_datetime(pd.Series(dates)).to_numpy(dtype = 'datetime64[s]').astype(np.int64)
+    bars[:, 0] = dates
+    bars[:, 1:assetTimeSeries.shape[1]] = assetTimeSeries[:, 1:].astype(np.float64)
+
+    return (bars)
+
+
+class BarSeries:
+
+    '''
+    Typed, columnar bars: the date as int64 epoch seconds, and the open, high, low, close and volume as float64, or float32 to halve their
+    size. Columns are read by name, as bars['close'] or bars.close, and each column is a separate contiguous array, so a column can be read
+    without touching the others and the columns can be memory-mapped from disk with load().
+
+    A BarSeries can stand in for the float64 (bars, 6) array that DataSource.fetch() returns: it can be passed to BacktestDriver as
+    assetTimeSeries, len() and shape follow the array, bars[:, i] returns column i as in columnNames, and bars[start:stop] or a boolean
+    mask returns the selected bars as a BarSeries, with views of the columns for a slice. Anything that selects one bar or several columns,
+    such as bars[5], bars[:, 1:5] or bars[5, 4], is read as from toArray(), a float64 copy laid out as [Date, Open, High, Low, Close, Volume].
+
+    Parameters
+    ----------
+    columns : dict[str, np.ndarray]
+        one array per name in columnNames, all of the same length. The date is converted to int64, and the prices and volume are kept
+        in their own float dtype, without a copy where no conversion is needed.
+    '''
+
+    def __init__(self,
+                 columns: dict[str, np.ndarray]) -> None:
+
+        if (set(columns) != set(columnNames)):
+            raise ValueError('Invalid argument(s). Valid arguments are: ' + ', '.join('\'' + i + '\'' for i in columnNames))
+        self._columns = {'date': np.asarray(columns['date'], dtype = np.int64)}
+        for i in columnNames[1:]:
+            column = np.asarray(columns[i])
+            self._columns[i] = column if np.issubdtype(column.dtype, np.floating) else column.astype(np.float64)
+        if (len({len(i) for i in self._columns.values()}) > 1):
+            raise ValueError('Every column of a BarSeries must have the same length')
+
+
+    @classmethod
+    def fromArray(cls,
+                  assetTimeSeries: np.ndarray,
+                  priceType: type = np.float64) -> 'BarSeries':
+
+        '''Builds a BarSeries from bars laid out as [Date, Open, High, Low, Close(, Volume)], converting them with barsToArray() where needed.'''
+
+        bars = barsToArray(assetTimeSeries)
+
+        return (cls({'date': bars[:, 0], **{j: bars[:, i].astype(priceType) for i, j in enumerate(columnNames[1:], start = 1)}}))
+
+
+    @classmethod
+    def load(cls,
+             directory: str,
+             mmapMode: str = 'r') -> 'BarSeries':
+
+        '''
+        Opens the columns written by save(), one <column>.npy file each, memory-mapped by default so that only the bars that are read are
+        loaded from disk. Pass mmapMode = None to read the columns into memory. CachedDataSource entries use the same layout.
+        '''
+
+        return (cls({i: np.load(os.path.join(directory, i + '.npy'), mmap_mode = mmapMode) for i in columnNames}))
+
+
+    def save(self,
+             directory: str) -> None:
+
+        '''
+        Writes each column to <column>.npy in directory, in its own dtype. Each file is written under a temporary name and then renamed over
+        the old one, so that a BarSeries memory-mapped from the old files keeps reading them rather than a file that is being rewritten.
+        '''
+
+        os.makedirs(directory, exist_ok = True)
+        for i, j in self._columns.items():
+            columnPath = os.path.join(directory, i + '.npy')
+            with open(columnPath + '.tmp', 'wb') as columnFile:
+                np.save(columnFile, j)
+            os.replace(columnPath + '.tmp', columnPath)
+
+
+    def __repr__(self) -> str:
+
+        return ('BarSeries(' + str(len(self)) + ' bars, ' + ', '.join(i + ': ' + str(j.dtype) for i, j in self._columns.items()) + ')')
+
+
+    def __len__(self) -> int:
+
+        return (len(self._columns['date']))
+
+
+    def __getattr__(self,
+                    name: str) -> np.ndarray:
+
+        if (name in columnNames):
+            return (self._columns[name])
+
+        raise AttributeError(name)
+
+
+    def __getitem__(self,
+                    key: str | slice | np.ndarray | tuple) -> 'np.ndarray | BarSeries':
+
+        if isinstance(key, str):
+            return (self._columns[key.lower()])
+        if isinstance(key, (int, np.integer)):
+            return (self[key, :])
+        if isinstance(key, tuple):
+            if (len(key) != 2):
+                raise IndexError('A BarSeries is indexed as bars[rows] or bars[rows, columns], not with ' + str(len(key)) + ' indices')
+            rows, columns = key
+            if isinstance(columns, (int, np.integer)):
+                return (self._columns[columnNames[columns]][rows])
+            selectedColumns = np.array(columnNames)[columns] # Raises the usual IndexError for columns outside the six
+            if (len(selectedColumns) == 0):
+                return (np.empty(self._columns['date'][rows].shape + (0,), dtype = np.float64))
+            return (np.stack([self._columns[i][rows].astype(np.float64) for i in selectedColumns], axis = -1))
+
+        return (BarSeries({i: j[key] for i, j in self._columns.items()}))
+
+
+    def __array__(self,
+                  dtype: type = None,
+                  copy: bool = None) -> np.ndarray:
+
+        if (copy is False):
+            raise ValueError('A BarSeries keeps its columns apart, so it can only be converted to an array by copying them')
+
+        return (self.toArray() if (dtype is None) else self.toArray().astype(dtype, copy = False))
+
+
+    @property
+    def shape(self) -> tuple[int, int]:
+
+        return ((len(self), len(columnNames)))
+
+
+    @property
+    def ndim(self) -> int:
+
+        return (2)
+
+
+    @property
+    def nbytes(self) -> int:
+
+        return (sum(i.nbytes for i in self._columns.values()))
+
+
+    def toArray(self) -> np.ndarray:
+
+        '''Returns the bars as a float64 array of shape (bars, 6), laid out as [Date, Open, High, Low, Close, Volume].'''
+
+        bars = np.empty(self.shape, dtype = np.float64)
+        for i, j in enumerate(columnNames):
+            bars[:, i] = self._columns[j]
+
+        return (bars)
+
+
+class DataSource:
+
+    '''
+    Interface for anything that can supply bars to BacktestDriver. fetch() returns one float64 array of shape (bars, 6) per ticker symbol,
+    laid out as [Date, Open, High, Low, Close, Volume] with the date as epoch seconds, holding the most recent numberOfUnits bars.
+    '''
+
+    def fetch(self,
+              tickerSymbols: list[str],
+              tickInterval: str,
+              numberOfUnits: int) -> list[np.ndarray]:
+
+        raise NotImplementedError
+
+
+class TwelveDataSource(DataSource):
+
+    '''Fetches bars from the Twelve Data API through claydates.MultiTickerProcessor.'''
+
+    def fetch(self,
+              tickerSymbols: list[str],
+              tickInterval: str,
+              numberOfUnits: int) -> list[np.ndarray]:
+
+        assetObject = MultiTickerProcessor(tickerSymbols, tickInterval, numberOfUnits)
+
+        return ([barsToArray(i) for i in assetObject.missingUnitsExcluded(dataType = 'numpy')])
+
+
+class FileDataSource(DataSource):
+
+    '''
+    Reads bars from CSV files named <tickerSymbol>_<tickInterval>.csv with the columns Date, Open, High, Low, Close and Volume.
+    Used in place of the API so that the whole pipeline can run without a network connection.
+
+    Parameters
+    ----------
+    directory : str
+        the directory that holds the CSV files.
+    '''
+
+    def __init__(self,
+                 directory: str) -> None:
+
+        self._directory = directory
+        self._fetchCount = 0
+
+
+    def filePath(self,
+                 tickerSymbol: str,
+                 tickInterval: str) -> str:
+
+        return (os.path.join(self._directory, tickerSymbol + '_' + tickInterval + '.csv'))
+
+
+    def writeBars(self,
+                  tickerSymbol: str,
+                  tickInterval: str,
+                  bars: np.ndarray) -> None:
+
+        '''Writes an array of bars, laid out as returned by fetch(), to the CSV file for the ticker symbol and interval.'''
+
+        os.makedirs(self._directory, exist_ok = True)
+        frame = pd.DataFrame(bars, columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume'])
+        frame['Date'] = pd.to_datetime(frame['Date'].astype(np.int64), unit = 's')
+        frame.to_csv(self.filePath(tickerSymbol, tickInterval), index = False)
+
+
+    def fetch(self,
+              tickerSymbols: list[str],
+              tickInterval: str,
+              numberOfUnits: int) -> list[np.ndarray]:
+
+        self._fetchCount += 1
+        assetTimeSeries = []
+        for tickerSymbol in tickerSymbols:
+            frame = pd.read_csv(self.filePath(tickerSymbol, tickInterval), parse_dates = ['Date'], float_precision = 'round_trip') # Reads back exactly the bars that writeBars() wrote
+            assetTimeSeries.append(barsToArray(frame.to_numpy(dtype = object)[-numberOfUnits:]))
+
+        return (assetTimeSeries)
+
+
+class CachedDataSource(DataSource):
+
+    '''
+    Keeps a local, columnar copy of the bars supplied by another data source. Each (tickerSymbol, tickInterval) pair is stored as one
+    memory-mappable .npy file per column, laid out as BarSeries.save() writes them, so any numberOfUnits or date range can be served from
+    the same entry. When an entry is older than timeToLive, only the bars that are missing from its tail are requested from the wrapped source.
+    If they cannot be joined onto the cached bars, the entry is fetched again in full, and an entry never holds fewer bars than before.
+
+    Parameters
+    ----------
+    source : DataSource
+        the data source to fetch missing bars from.
+    cacheDirectory : str
+        the directory that cached entries are stored in.
+    timeToLive : float
+        the number of seconds after which an entry is topped up on its next access.
+    maximumBytes : int, optional
+        when given, the least recently used entries are evicted until the cache fits within this many bytes.
+    maximumAge : float, optional
+        when given, entries that have not been accessed for this many seconds are evicted.
+    offline : bool
+        when True, the wrapped source is never called and requests that cannot be served from the cache raise a LookupError.
+    memoryMapped : bool
+        when True, fetch() returns BarSeries whose columns are memory-mapped from the cache, so that the bars are only read from disk as
+        the backtest uses them. Otherwise the bars are returned as float64 arrays held in memory.
+    '''
+
+    def __init__(self,
+                 source: DataSource,
+                 cacheDirectory: str,
+                 timeToLive: float = 3600.0,
+                 maximumBytes: int = None,
+                 maximumAge: float = None,
+                 offline: bool = False,
+                 memoryMapped: bool = False) -> None:
+
+        self._source = source
+        self._cacheDirectory = cacheDirectory
+        self._timeToLive = timeToLive
+        self._maximumBytes = maximumBytes
+        self._maximumAge = maximumAge
+        self._offline = offline
+        self._memoryMapped = memoryMapped
+        os.makedirs(self._cacheDirectory, exist_ok = True)
+
+
+    def entryPath(self,
+                  tickerSymbol: str,
+                  tickInterval: str) -> str:
+
+        return (os.path.join(self._cacheDirectory, tickerSymbol.replace('/', '-') + '_' + tickInterval))
+
+
+    def readEntry(self,
+                  tickerSymbol: str,
+                  tickInterval: str) -> tuple[BarSeries, dict]:
+
+        '''Returns the cached bars, memory-mapped, and the metadata for an entry, or (None, None) if there is no such entry.'''
+
+        path = self.entryPath(tickerSymbol, tickInterval)
+        if not os.path.exists(os.path.join(path, 'metadata.json')):
+            return (None, None)
+        with open(os.path.join(path, 'metadata.json')) as metadataFile:
+            metadata = json.load(metadataFile)
+
+        return (BarSeries.load(path), metadata)
+
+
+    def writeEntry(self,
+                   tickerSymbol: str,
+                   tickInterval: str,
+                   bars: np.ndarray) -> None:
+
+        '''
+        Writes an entry into a temporary directory next to it and then swaps it in, so that the columns and metadata of an entry always come
+        from the same fetch, and series memory-mapped from the old entry keep the old files rather than reading ones that are being rewritten.
+        '''
+
+        path = self.entryPath(tickerSymbol, tickInterval)
+        temporaryPath = tempfile.mkdtemp(prefix = '.' + os.path.basename(path) + '.', dir = self._cacheDirectory)
+        try:
+            BarSeries.fromArray(bars).save(temporaryPath)
+            self.writeMetadata(temporaryPath, {'numberOfBars': len(bars), 'fetchedAt': time.time(), 'lastAccess': time.time()})
+            if os.path.exists(path):
+                # A directory cannot be renamed over one that has files in it, so the old entry is moved aside first. Its files stay
+                # readable through any existing memory maps until those are closed.
+                oldPath = tempfile.mkdtemp(prefix = '.' + os.path.basename(path) + '.', dir = self._cacheDirectory)
+                os.replace(path, oldPath)
+                os.replace(temporaryPath, path)
+                shutil.rmtree(oldPath)
+            else:
+                os.replace(temporaryPath, path)
+        except BaseException:
+            shutil.rmtree(temporaryPath, ignore_errors = True)
+            raise
+
+
+    @staticmethod
+    def writeMetadata(path: str,
+                      metadata: dict) -> None:
+
+        with open(os.path.join(path, 'metadata.json.tmp'), 'w') as metadataFile:
+            json.dump(metadata, metadataFile)
+        os.replace(os.path.join(path, 'metadata.json.tmp'), os.path.join(path, 'metadata.json'))
+
+
+    @staticmethod
+    def mergeBars(cachedBars: np.ndarray,
+                  newBars: np.ndarray) -> np.ndarray:
+
+        '''
+        Appends the bars in newBars that are more recent than the last cached bar. Raises a ValueError when newBars starts after the last
+        cached bar, since the bars in between would be missing from the merged series without any sign of it.
+        '''
+
+        if (len(cachedBars) == 0):
+            return (newBars)
+        if (len(newBars) == 0):
+            return (cachedBars)
+        if (newBars[0, 0] > cachedBars[-1, 0]):
+            raise ValueError('The new bars start after the last cached bar, so they cannot be merged without leaving a gap')
+
+        return (np.concatenate([cachedBars, newBars[newBars[:, 0] > cachedBars[-1, 0]]]))
+
+
+    def fetchOne(self,
+                 tickerSymbol: str,
+                 tickInterval: str,
+                 numberOfUnits: int) -> np.ndarray | BarSeries:
+
+        bars, metadata = self.readEntry(tickerSymbol, tickInterval)
+        if self._offline:
+            if (bars is None) or (len(bars) < numberOfUnits):
+                raise LookupError('Not enough cached bars for ' + tickerSymbol + ' at ' + tickInterval + ' to serve ' + str(numberOfUnits) + ' units while offline.')
+        elif (bars is None) or (len(bars) < numberOfUnits):
+            bars = self._source.fetch([tickerSymbol], tickInterval, numberOfUnits)[0]
+            self.writeEntry(tickerSymbol, tickInterval, bars)
+            return (bars)
+        elif ((time.time() - metadata['fetchedAt']) > self._timeToLive):
+            missingUnits = math.ceil((time.time() - metadata['fetchedAt']) / secondsPerInterval.get(tickInterval, 60)) + 1
+            newBars = self._source.fetch([tickerSymbol], tickInterval, missingUnits)[0] if (missingUnits < len(bars)) else None
+            if (newBars is not None) and ((len(newBars) == 0) or (newBars[0, 0] <= bars[-1, 0])):
+                bars = self.mergeBars(bars.toArray(), newBars)
+            else:
+                # Too much is missing to join onto the cached bars, so the entry is replaced, with at least as many bars as it held
+                bars = self._source.fetch([tickerSymbol], tickInterval, max(len(bars), numberOfUnits))[0]
+            self.writeEntry(tickerSymbol, tickInterval, bars)
+            return (bars[-numberOfUnits:])
+
+        metadata['lastAccess'] = time.time()
+        self.writeMetadata(self.entryPath(tickerSymbol, tickInterval), metadata)
+
+        return (bars[-numberOfUnits:])
+
+
+    def fetch(self,
+              tickerSymbols: list[str],
+              tickInterval: str,
+              numberOfUnits: int,
+              dateRange: tuple[float, float] = None) -> list[np.ndarray | BarSeries]:
+
+        '''
+        Returns the most recent numberOfUnits bars for each ticker symbol, topping up the cache first where needed.
+        If dateRange is given as (start, end) epoch seconds, only the bars within it are returned.
+        '''
+
+        assetTimeSeries = [self.fetchOne(i, tickInterval, numberOfUnits) for i in tickerSymbols]
+        if self._memoryMapped:
+            assetTimeSeries = [j if isinstance(j, BarSeries) else BarSeries.load(self.entryPath(i, tickInterval))[-len(j):] for i, j in zip(tickerSymbols, assetTimeSeries)]
+        else:
+            assetTimeSeries = [barsToArray(i) for i in assetTimeSeries]
+        if (dateRange is not None):
+            assetTimeSeries = [i[(i[:, 0] >= dateRange[0]) & (i[:, 0] <= dateRange[1])] for i in assetTimeSeries]
+        self.evict()
+
+        return (assetTimeSeries)
+
+
+    def evict(self) -> None:
+
+        '''Deletes entries that have not been accessed within maximumAge, then the least recently used entries until the cache fits within maximumBytes.'''
+
+        if (self._maximumBytes is None) and (self._maximumAge is None):
+            return
+        entries = []
+        for i in os.listdir(self._cacheDirectory):
+            if i.startswith('.'):
+                continue # An entry that writeEntry() is still writing or swapping out
+            path = os.path.join(self._cacheDirectory, i)
+            if not os.path.exists(os.path.join(path, 'metadata.json')):
+                continue
+            with open(os.path.join(path, 'metadata.json')) as metadataFile:
+                lastAccess = json.load(metadataFile)['lastAccess']
+            if (self._maximumAge is not None) and ((time.time() - lastAccess) > self._maximumAge):
+                shutil.rmtree(path)
+                continue
+            size = sum(os.path.getsize(os.path.join(path, j)) for j in os.listdir(path))
+            entries.append((lastAccess, size, path))
+
+        if (self._maximumBytes is None):
+            return
+        totalBytes = sum(i[1] for i in entries)
+        for lastAccess, size, path in sorted(entries):
+            if (totalBytes <= self._maximumBytes):
+                break
+            shutil.rmtree(path)
+            totalBytes -= size
@@ -1,11 +1,65 @@
-from claydates import MultiTickerProcessor
 from itertools import chain
 import pandas as pd
 import numpy as np
+from typing import Any, Callable
 import uuid
 import warnings
+import backtestKernels as kernels
+from backtestData import DataSource, TwelveDataSource
+from backtestExecution import ExecutionModel
+from backtestInstrumentation import Instrumentation, instrumented, instrumentedStage
+from backtestStrategy import Strategy, RollingMinimumStrategy, PriceColumns, slidingWindows, vectorizedStateCodes, referenceStateCodes
 warnings.simplefilter(action = 'ignore', category = UserWarning)
 
+columnIndices = {'date': 0, 'open': 1, 'high': 2, 'low': 3, 'close': 4, 'volume': 5}
+
+tradeRecordType = np.dtype([('entryIndex', np.int64),
+                            ('exitIndex', np.int64),
+                            ('entryPrice', np.float64),
+                            ('exitPrice', np.float64),
+                            ('tradeReturn', np.float64),
+                            ('holdingPeriod', np.int64)])
+
+
+def tradeResultsFromOrders(orderIndices: np.ndarray,
+                           prices: PriceColumns,
+                           executionModel: ExecutionModel = None) -> dict[str, Any]:
+
+    '''
+    Builds the trade results that BacktestDriver.tradeResults() returns from the bars of the opening and closing orders, alternating, and
+    the columns of the series. Without an execution model, trades are filled at the close of their order bars.
+    '''
+
+    execution = None
+    if (executionModel is not None):
+        execution = executionModel.execute(prices, orderIndices)
+        orderIndices = orderIndices[np.repeat(execution['kept'], 2)]
+
+    tradeRecords = np.empty(len(orderIndices) // 2, dtype = tradeRecordType)
+    tradeRecords['holdingPeriod'] = orderIndices[1::2] - orderIndices[0::2]
+    if (execution is not None):
+        tradeRecords['entryIndex'] = execution['entryIndices']
+        tradeRecords['exitIndex'] = execution['exitIndices']
+        tradeRecords['entryPrice'] = execution['entryPrices']
+        tradeRecords['exitPrice'] = execution['exitPrices']
+        tradeRecords['tradeReturn'] = execution['netReturns']
+    else:
+        tradeRecords['entryIndex'] = orderIndices[0::2]
+        tradeRecords['exitIndex'] = orderIndices[1::2]
+        tradeRecords['entryPrice'] = prices['close'][orderIndices[0::2]]
+        tradeRecords['exitPrice'] = prices['close'][orderIndices[1::2]]
+        tradeRecords['tradeReturn'] = (tradeRecords['exitPrice'] - tradeRecords['entryPrice']) / tradeRecords['entryPrice']
+    
+    tradeResults = {'orderIndices': orderIndices,
+                    'tradeRecords': tradeRecords,
+                    'profitLossForTrades': tradeRecords['tradeReturn'],
+                    'equityReturns': execution['equityReturns'] if (execution is not None) else tradeRecords['tradeReturn'],
+                    'holdingPeriods': tradeRecords['holdingPeriod']}
+    if (execution is not None):
+        tradeResults['execution'] = execution
+
+    return (tradeResults)
+
 
 class BacktestDriver:
     
@@ -21,30 +75,184 @@ class BacktestDriver:
         the interval of time between each data point. Options are: '1min', '5min', '15min', '30min', '45min', '1h', '2h', '4h', '8h', '1day', '1week', and '1month'
     numberOfUnits : int
         the number of units of data to request from the API.
+    assetTimeSeries : np.ndarray | BarSeries | list, optional
+        an array of bars laid out as [Date, Open, High, Low, Close, Volume], or one such array per ticker symbol. When given, the API is not called and these series are backtested instead.
+        A backtestData.BarSeries, for example memory-mapped from disk, can be given in place of any of the arrays.
+    executionMode : str
+        how the position states are computed. 'compiled' evaluates the strategy's signals for the whole series at once and runs the state machine in backtestKernels,
+        'python' asks the strategy for its signals one bar at a time. See backtestStrategy.referenceStateCodes().
+    dataSource : DataSource, optional
+        where the bars are fetched from when assetTimeSeries is not given. Defaults to the Twelve Data API. See backtestData for a local cache and a file-backed source, and backtestPrefetch to load many series concurrently.
+    strategy : Strategy, optional
+        the strategy to backtest. Defaults to backtestStrategy.RollingMinimumStrategy with its default parameters.
+    executionModel : ExecutionModel, optional
+        the commissions, slippage, fill prices and position size applied to the trades. See backtestExecution. Defaults to frictionless
+        fills at the close with all of the equity in each trade.
+    instrumentation : Instrumentation, optional
+        records the time, CPU time, call count and, optionally, peak memory of each stage of the backtest, from the data fetch through to
+        plotting. See backtestInstrumentation. Off by default, which adds next to nothing to the run.
     '''
 
     def __init__(self, 
                  tickerSymbols: list[str],
                  tickInterval: int,
-                 numberOfUnits: int) -> None:
+                 numberOfUnits: int,
+                 assetTimeSeries: np.ndarray = None,
+                 executionMode: str = 'compiled',
+                 dataSource: DataSource = None,
+                 strategy: Strategy = None,
+                 executionModel: ExecutionModel = None,
+                 instrumentation: Instrumentation = None) -> None:
     
+        if (executionMode not in ('compiled', 'python')):
+            raise ValueError('Invalid argument(s). Valid arguments are: \'compiled\' or \'python\'')
+
         self._tickerSymbols = tickerSymbols
         self._tickInterval = tickInterval
         self._numberOfUnits = numberOfUnits
+        self._executionMode = executionMode
+        self._instrumentation = instrumentation
         
-        self._assetObject = MultiTickerProcessor(self._tickerSymbols,
-                                                 self._tickInterval,
-                                                 self._numberOfUnits)
+        self._dataSource = dataSource if (dataSource is not None) else TwelveDataSource()
+        if (assetTimeSeries is None):
+            with instrumentedStage(self._instrumentation, 'fetch'):
+                self._allAssetTimeSeries = self._dataSource.fetch(self._tickerSymbols, self._tickInterval, self._numberOfUnits)
+        elif isinstance(assetTimeSeries, list):
+            self._allAssetTimeSeries = assetTimeSeries
+        else:
+            self._allAssetTimeSeries = [assetTimeSeries]
+        self._assetTimeSeries = self._allAssetTimeSeries[0]
         
-        self._assetTimeSeries = self._assetObject.missingUnitsExcluded(dataType = 'numpy')[0]
-        self._holdingPeriods = []
-        self._openingAndClosingOrders = []
-        self._profitLossForTrades = self.computeReturnSeries()
-        self._tradesPercentageChangeSeries = (self.percentageChangeSeries(seriesType = 1))
-        self._underlyingPercentageChangeSeries = (self.percentageChangeSeries(seriesType = 2))
+        self._strategy = strategy if (strategy is not None) else RollingMinimumStrategy()
+        self._executionModel = executionModel
+        self._results = {}
+        self._resultsKey = None
+        self._strategyEvaluations = 0
         self._backtestID = str(uuid.uuid4())
 
 
+    @property
+    def _strategyParameters(self) -> dict:
+        return (self._strategy.parameters())
+
+    @property
+    def _orderIndices(self) -> np.ndarray:
+        return (self.tradeResults()['orderIndices'])
+
+    @property
+    def _openingAndClosingOrders(self) -> list[tuple[int, float]]:
+        return (self.cachedResult('openingAndClosingOrders', self.buildOpeningAndClosingOrders))
+
+    @property
+    def _holdingPeriods(self) -> np.ndarray:
+        return (self.tradeResults()['holdingPeriods'])
+
+    @property
+    def _profitLossForTrades(self) -> np.ndarray:
+        return (self.tradeResults()['profitLossForTrades'])
+
+    @property
+    def _tradesPercentageChangeSeries(self) -> np.ndarray:
+        return (self.percentageChangeSeries(seriesType = 1))
+
+    @property
+    def _underlyingPercentageChangeSeries(self) -> np.ndarray:
+        return (self.percentageChangeSeries(seriesType = 2))
+
+
+    def resultsKey(self) -> tuple:
+
+        '''Returns everything that the cached results depend on. The cache is cleared whenever any of it changes.'''
+
+        return (self._assetTimeSeries, self._executionMode, self._executionModel, type(self._strategy), tuple(sorted(self._strategyParameters.items())), tuple(id(i) for i in self._allAssetTimeSeries))
+
+
+    def setStrategyParameters(self,
+                              **strategyParameters: int) -> None:
+
+        '''
+        Updates the parameters of the strategy. Valid names are listed in the strategy's defaultParameters, e.g. subframeLength, entryCount
+        and exitIndex for backtestStrategy.RollingMinimumStrategy. Cached results are recomputed on next access.
+        '''
+
+        self._strategy = self._strategy.withParameters(**strategyParameters)
+
+
+    def setStrategy(self,
+                    strategy: Strategy) -> None:
+
+        '''Replaces the strategy being backtested. Cached results are recomputed on next access.'''
+
+        self._strategy = strategy
+
+
+    def setExecutionModel(self,
+                          executionModel: ExecutionModel) -> None:
+
+        '''Replaces the execution model applied to the trades, or removes it when None. Cached results are recomputed on next access.'''
+
+        self._executionModel = executionModel
+
+
+    def warmUpLength(self) -> int:
+
+        '''Returns the number of bars at the start of the series that the strategy produces no state for. Order indices are offset by this amount.'''
+
+        return (self._strategy.warmUpLength())
+
+
+    def instrumentationReport(self) -> pd.DataFrame:
+
+        '''Returns the per-stage report of the instrumentation given to the constructor. See backtestInstrumentation.Instrumentation.report().'''
+
+        if (self._instrumentation is None):
+            raise ValueError('No instrumentation was given to the backtest. Pass instrumentation = Instrumentation() to the constructor')
+
+        return (self._instrumentation.report())
+
+
+    def priceColumns(self) -> PriceColumns:
+
+        '''Returns the columns of the time series in the form that Strategy.signals() takes. Columns are loaded through seriesColumn().'''
+
+        return (PriceColumns(self.seriesColumn))
+
+
+    def cachedResult(self,
+                     name: str,
+                     function: Callable[[], Any]) -> Any:
+
+        '''
+        Returns the result stored under name, calling function to compute it on first access. Stored results are shared between callers,
+        so they should not be modified in place.
+
+        Parameters 
+        ---------- 
+        name: str
+            The name that the result is stored under.
+        function: Callable[[], Any]
+            Computes the result when it has not been stored yet.
+        '''
+
+        currentKey = self.resultsKey()
+        if (self._resultsKey is None) or (self._resultsKey[0] is not currentKey[0]) or (self._resultsKey[1:] != currentKey[1:]):
+            self._results = {}
+            self._resultsKey = currentKey
+        if (name not in self._results):
+            self._results[name] = function()
+        
+        return (self._results[name])
+
+
+    def invalidateResults(self) -> None:
+
+        '''Clears every cached result. Only needed if the time series was modified in place, since replacing it clears the cache automatically.'''
+
+        self._results = {}
+        self._resultsKey = None
+
+
+    @instrumented
     def batcher(self,
                 subframeLength: int, 
                 gapToNextFrame: int) -> list[list[float]]:
@@ -79,13 +287,96 @@ class BacktestDriver:
             
         return fullSeries[subframeLength : len(fullSeries)]
 
+
+    def seriesColumn(self,
+                     column: int | str = 'close') -> np.ndarray:
+
+        '''
+        Returns a single column of the time series as a float64 array. No copy is made when the underlying series is already stored as float64,
+        and the converted column is cached otherwise.
+
+        Parameters 
+        ---------- 
+        column: int | str
+            The column to return, either as an index or as one of 'open', 'high', 'low', 'close' or 'volume'.
+        '''
+
+        if isinstance(column, str):
+            column = columnIndices[column.lower()]
+        if (len(self._assetTimeSeries.shape) == 1):
+            return (self.cachedResult('seriesColumn', lambda: np.asarray(self._assetTimeSeries, dtype = np.float64)))
+        
+        return (self.cachedResult('seriesColumn' + str(column), lambda: np.asarray(self._assetTimeSeries[:, column], dtype = np.float64)))
+
+
+    def barDate(self,
+                index: int) -> pd.Timestamp:
+
+        '''Returns the date of the bar at index. Dates stored as epoch seconds are converted to timestamps.'''
+
+        date = self._assetTimeSeries[index, 0]
+        if isinstance(date, (float, int, np.number)):
+            return (pd.Timestamp(int(date), unit = 's'))
+
+        return (pd.Timestamp(date))
+
+
+    def backtestYears(self) -> float:
+
+        '''Returns the length of time that the backtest was ran over, in years.'''
+
+        return ((self.barDate(-1) - self.barDate(0)) / np.timedelta64(1, 'D') / 365.25)
+
+
+    def barDates(self) -> np.ndarray:
+
+        '''Returns the dates of every bar as a datetime64 array. Dates stored as epoch seconds are converted.'''
+
+        def buildBarDates() -> np.ndarray:
+            dates = self._assetTimeSeries[:, 0]
+            if np.issubdtype(dates.dtype, np.number):
+                return (dates.astype(np.int64).astype('datetime64[s]').astype('datetime64[ns]'))
+            return (pd.to_datetime(pd.Series(dates)).to_numpy(dtype = 'datetime64[ns]'))
+
+        return (self.cachedResult('barDates', buildBarDates))
+
+
+    def dateLabel(self,
+                  index: int) -> str:
+
+        '''Returns the date of the bar at index as a string.'''
+
+        return (str(self.barDate(index)))
+
+
+    def windowView(self,
+                   subframeLength: int,
+                   gapToNextFrame: int,
+                   column: int | str = 'close') -> np.ndarray:
+
+        '''
+        Vectorized equivalent of batcher(). Returns a read-only strided view of shape (len(series) - subframeLength, ceil(subframeLength / gapToNextFrame)),
+        where row k holds the same values, in the same order, as batcher(subframeLength, gapToNextFrame)[k]. No window is ever copied.
+
+        Parameters 
+        ---------- 
+        subframeLength: int
+            Determines how long each subframe should be.
+        gapToNextFrame: int
+            Determines the spacing between the start of one subframe and the next. 
+        column: int | str
+            The column of the time series to window. Defaults to the closing price.
+        '''
+
+        return (slidingWindows(self.seriesColumn(column), subframeLength, gapToNextFrame))
+
     
+    @instrumented
     def positionStates(self) -> list[tuple[bool, bool, bool, bool]]:
         
         '''
-        Trading logic defined here. This method returns a list of tuples that represent the status of a trade, or lack thereof.
-        So long as you keep the structure of the output the same, the content of this method is all that you have to change 
-        to use this software to perform backtests using your own strategy. 
+        Returns a list of tuples that represent the status of a trade, or lack thereof, at every bar after the strategy's warm-up.
+        To backtest your own strategy, subclass backtestStrategy.Strategy and pass it to the constructor or to setStrategy(), rather than changing this method.
         
         (True, False, False, False) indicates that a trade was opened at this index position in the series.
         (False, True, False, False) indicates that an open trade is being held at this index position in the series.
@@ -93,110 +384,218 @@ class BacktestDriver:
         (False, False, False, True) indicates that nothing should be done and that no trades are currently open at this index position in the series.
         '''
         
-        lastFives = self.batcher(5, 1)
-        
-        minimumSubframeValues = []
-        for i in lastFives:
-            minimumSubframeValues.append(min(i))
-        
-        entryCount = 0
-        positionIsOpen = False
-        currentState = (False, False, False, True)
-        states = []
-        for i, j in enumerate(lastFives):
-                            
-            if (j[0] == minimumSubframeValues[i]):
-                entryCount += 1
-            else:
-                entryCount = 0
-                
-            if (entryCount == 3):
-                currentState = (True, False, False, False)
-                positionIsOpen = True
-            if (positionIsOpen == True) and (entryCount != 3): 
-                currentState = (False, True, False, False)
-            if (positionIsOpen == True) and (j[2] == minimumSubframeValues[i]):
-                currentState = (False, False, True, False)
-                positionIsOpen = False
-            if (positionIsOpen == False) and (currentState != (False, False, True, False)):
-                currentState = (False, False, False, True)
-            try:
-                if (states[-1] == (False, True, False, False)) and (currentState == (True, False, False, False)):
-                    currentState = (False, True, False, True)
-                if (positionIsOpen == False) and (states[-1] == (False, False, True, False)):
-                    currentState = (False, False, False, True)
-            except IndexError:
-                pass
-    
-            states.append(currentState)
-            
-        return (states)
+        return (kernels.codesToStates(self.positionStateCodes()))
     
 
+    def positionStateCodes(self) -> np.ndarray:
+
+        '''
+        Returns the same states as positionStates(), encoded as one uint8 per bar using the codes defined in backtestKernels
+        (NO_POSITION, OPENED, HOLDING, CLOSED and OPENED_WHILE_HOLDING). In 'compiled' mode the strategy's signals are computed for the whole
+        series at once and the state machine runs in backtestKernels.stateTransitions(), so no Python objects are created per bar.
+        The codes are computed once and cached until the time series, the strategy or the execution mode changes.
+        '''
+
+        return (self.cachedResult('positionStateCodes', self.evaluateStrategy))
+
+
+    @instrumented
+    def evaluateStrategy(self) -> np.ndarray:
+
+        '''Runs the strategy over the whole series and returns the state codes. Every call is counted in self._strategyEvaluations.'''
+
+        self._strategyEvaluations += 1
+        if (self._executionMode == 'python'):
+            return (referenceStateCodes(self._strategy, self.priceColumns()))
+
+        return (vectorizedStateCodes(self._strategy, self.priceColumns()))
+
+
     def priceAndStatesConstructor(self) -> pd.DataFrame:
 
         '''Combines the results from the positionStates() method with the underlying time series prices, and stores them in a dataframe.'''
         
-        tempStates = pd.DataFrame(self.positionStates())
-        tempStates.index = tempStates.index + 5 # Note the + 5 here, since batcher() was called with a subframeLength of 5 in positionStates()
+        return (self.cachedResult('priceAndStatesConstructor', self.buildPriceAndStates))
+
+
+    @instrumented
+    def buildPriceAndStates(self) -> pd.DataFrame:
+
+        '''Builds the dataframe returned by priceAndStatesConstructor().'''
+
+        prices = self.seriesColumn('close')
+        positionOpen = np.zeros(len(prices), dtype = bool)
+        positionOpen[self.warmUpLength():] = (self.positionStateCodes() != kernels.NO_POSITION) # Offset by the warm-up, since no states are produced for those bars
         
-        pricesAndStates = pd.DataFrame(self._assetTimeSeries[:, 4], columns = ['Price'])
-        pricesAndStates['PositionOpen'] = tempStates[0] + tempStates[1] + tempStates[2]
-        pricesAndStates.fillna(False,  inplace = True)
+        pricesAndStates = pd.DataFrame({'Price': prices, 'PositionOpen': positionOpen})
         
         return (pricesAndStates)
     
 
-    def computeReturnSeries(self) -> list[float]:
+    @instrumented
+    def computeReturnSeries(self) -> np.ndarray:
 
-        '''Computes the returns from the trade series. Returns the series as a list.'''
-        
-        openingAndClosingOrders = []
-        for i, j in enumerate(self.positionStates()):
-            if (j[0] == True):
-                openingAndClosingOrders.append((i + 5, self._assetTimeSeries[:, 4][i + 5])) # Note the + 5 here, since batcher() was called with a subframeLength of 5 in positionStates()
-            if (j[2] == True):
-                openingAndClosingOrders.append((i + 5, self._assetTimeSeries[:, 4][i + 5])) # Note the + 5 here, since batcher() was called with a subframeLength of 5 in positionStates()
-        if ((len(openingAndClosingOrders) % 2) == 1):
-            openingAndClosingOrders.pop(-1)
-        
-        self._openingAndClosingOrders = openingAndClosingOrders
+        '''Computes the returns from the trade series. Returns the series as a numpy array.'''
         
-        profitLossForTrades = []
-        holdingPeriods = []
-        for i, j in enumerate(openingAndClosingOrders):
-            if ((i % 2) == 1):
-                profitLossForTrades.append(((j[1] - openingAndClosingOrders[i - 1][1]) / openingAndClosingOrders[i - 1][1]))
-                holdingPeriods.append((j[0] - openingAndClosingOrders[i - 1][0]))
-        
-        self._holdingPeriods = holdingPeriods
-        
-        return (profitLossForTrades)
+        return (self.tradeResults()['profitLossForTrades'])
+
+
+    def tradeResults(self) -> dict[str, Any]:
+
+        '''
+        Returns the cached order indices, trade records, trade returns and holding periods, along with 'equityReturns', the change in equity
+        over each trade. With an execution model, the returns are net of costs, the records hold the fill bars and prices, and 'execution'
+        holds the full output of ExecutionModel.execute().
+        '''
+
+        return (self.cachedResult('tradeResults', self.buildTradeResults))
+
+
+    def tradeRecords(self) -> np.ndarray:
+
+        '''
+        Returns one record per trade as a structured array of tradeRecordType, with the fields entryIndex, exitIndex, entryPrice, exitPrice,
+        tradeReturn and holdingPeriod, so that trades can be filtered and aggregated with array operations, e.g. records['tradeReturn'].
+        '''
+
+        return (self.tradeResults()['tradeRecords'])
+
+
+    def tickerTradeResults(self) -> dict[str, dict[str, Any]]:
+
+        '''
+        Returns tradeResults() for every ticker symbol, keyed by symbol, each computed over that ticker's own series with the same strategy,
+        execution mode and execution model. The first ticker's results are the same object as tradeResults().
+        '''
+
+        def buildTickerTradeResults() -> dict[str, dict[str, Any]]:
+            tickerTradeResults = {self._tickerSymbols[0]: self.tradeResults()}
+            for i, j in zip(self._tickerSymbols[1:], self._allAssetTimeSeries[1:]):
+                tickerTradeResults[i] = BacktestDriver([i], self._tickInterval, self._numberOfUnits, assetTimeSeries = j, executionMode = self._executionMode,
+                                                       dataSource = self._dataSource, strategy = self._strategy, executionModel = self._executionModel).tradeResults()
+            return (tickerTradeResults)
+
+        return (self.cachedResult('tickerTradeResults', buildTickerTradeResults))
+
+
+    @instrumented
+    def buildTradeResults(self) -> dict[str, Any]:
+
+        '''
+        Pairs up the opening and closing orders found in positionStateCodes() and computes the return and holding period of each trade.
+        The execution model, when there is one, is applied to the order pairs as a whole.
+        '''
+
+        stateCodes = self.positionStateCodes()
+        orderIndices = np.flatnonzero((stateCodes == kernels.OPENED) | (stateCodes == kernels.CLOSED)) + self.warmUpLength() # Offset by the warm-up, since no states are produced for those bars
+        if ((len(orderIndices) % 2) == 1):
+            orderIndices = orderIndices[:-1]
+
+        return (tradeResultsFromOrders(orderIndices, self.priceColumns(), self._executionModel))
+
+
+    def buildOpeningAndClosingOrders(self) -> list[tuple[int, float]]:
+
+        '''Lists the (index, price) of every opening and closing order, in order, from the trade records. Only built when asked for.'''
+
+        tradeRecords = self.tradeRecords()
+        indices = np.column_stack((tradeRecords['entryIndex'], tradeRecords['exitIndex'])).ravel()
+        prices = np.column_stack((tradeRecords['entryPrice'], tradeRecords['exitPrice'])).ravel()
+
+        return (list(zip(indices.tolist(), prices.tolist())))
     
     
     def percentageChangeSeries(self,
                                seriesType: int) -> np.array:
         
-        '''Computes the returns from the trade series as a percentage change series. Returns the series as a numpy array.'''
+        '''
+        Computes the returns from the trade series as a percentage change series. Returns the series as a numpy array. For the trade series
+        (seriesType 1), these are the changes in equity over each trade, which include the position size of the execution model.
+        '''
 
         if (seriesType == 1):
-            return (np.array(self._profitLossForTrades, dtype = np.float64))
+            return (self.cachedResult('tradesPercentageChangeSeries', lambda: np.array(self.tradeResults()['equityReturns'], dtype = np.float64)))
         if (seriesType == 2):
-            return (np.array((np.diff(self._assetTimeSeries[:, 4]) / self._assetTimeSeries[:, 4][:-1]), dtype = np.float64))
+            return (self.cachedResult('underlyingPercentageChangeSeries', lambda: np.diff(self.seriesColumn('close')) / self.seriesColumn('close')[:-1]))
 
 
+    @instrumented
     def tradeSeriesWithPositionIndices(self) -> pd.DataFrame:
         
         '''Aligns the trade series with the indices where the trades were generated at. Returns the series as a pandas DataFrame.'''
         
-        indicesToBeCast = []
-        for i, j in enumerate(self._openingAndClosingOrders[1::2]):
-            indicesToBeCast.append(j[0])
+        return (self.cachedResult('tradeSeriesWithPositionIndices', lambda: pd.DataFrame(self.percentageChangeSeries(seriesType = 1), index = self._orderIndices[1::2])))
 
-        tradeSeries = pd.DataFrame(self.percentageChangeSeries(seriesType = 1))
-        tradeSeries.index = indicesToBeCast
-        
-        return (tradeSeries)
+
+    def batchBacktest(self) -> dict:
+
+        '''
+        Runs the strategy over every requested ticker symbol in one pass, rather than only the first. See backtestBatch.batchBacktest()
+        for the layout of the result, which holds per-ticker trade series and a combined portfolio.
+        '''
+
+        from backtestBatch import batchBacktest
+
+        return (self.cachedResult('batchBacktest', lambda: batchBacktest(self._allAssetTimeSeries, self._tickerSymbols, self._strategy)))
+
+
+    def walkForward(self,
+                    strategyParameterGrid: dict[str, list],
+                    trainLength: int,
+                    testLength: int,
+                    **walkForwardOptions) -> pd.DataFrame:
+
+        '''
+        Runs a walk-forward analysis of the strategy over the first ticker's series, optimizing strategyParameterGrid on each train slice and
+        backtesting the best parameters on the test slice that follows. See backtestWalkForward.walkForward() for the options and the result.
+        '''
+
+        from backtestWalkForward import walkForward
+
+        return (walkForward(self._assetTimeSeries, strategyParameterGrid, trainLength, testLength, tickerSymbols = self._tickerSymbols[:1],
+                            tickInterval = self._tickInterval, executionMode = self._executionMode, strategy = self._strategy,
+                            executionModel = self._executionModel, **walkForwardOptions))
+
+
+    @instrumented
+    def cumulativeSeries(self) -> pd.DataFrame:
+
+        '''
+        Returns the compounded returns of the underlying and trade return series, aligned on the bars of the underlying series. Used for the
+        equity curve, where each point is the growth of the equity since the first bar.
+        '''
+
+        def buildCumulativeSeries() -> pd.DataFrame:
+            tradeSeries = self.tradeSeriesWithPositionIndices()
+            tradeGrowth = (1 + tradeSeries[0]).cumprod() - 1
+            compositeSeries = pd.DataFrame((1 + self._underlyingPercentageChangeSeries).cumprod() - 1, columns = ['underlyingSeries'])
+            compositeSeries['tradeSeries'] = tradeGrowth
+            compositeSeries.iloc[0, 1] = 0.0
+            compositeSeries.iloc[-1, 1] = float(tradeGrowth.iloc[-1]) if (len(tradeGrowth) > 0) else 0.0
+            return (compositeSeries.interpolate(method = 'linear'))
+
+        return (self.cachedResult('cumulativeSeries', buildCumulativeSeries))
+
+
+    @instrumented
+    def drawdownSeries(self) -> pd.DataFrame:
+
+        '''Returns the drawdowns of the underlying and trade return series, aligned on the bars of the underlying series.'''
+
+        def buildDrawdownSeries() -> pd.DataFrame:
+            tradeSeries = self.tradeSeriesWithPositionIndices()
+            tradeSeriesDrawdown = (((1 + tradeSeries[0]).cumprod()) - ((1 + tradeSeries[0]).cumprod()).cummax()) / ((1 + tradeSeries[0]).cumprod()).cummax()
+
+            underlyingSeries = pd.DataFrame(self._underlyingPercentageChangeSeries)
+            underlyingDrawdown = (((1 + underlyingSeries[0]).cumprod()) - ((1 + underlyingSeries[0]).cumprod()).cummax()) / ((1 + underlyingSeries[0]).cumprod()).cummax()
+
+            compositeDrawdown = pd.concat([underlyingDrawdown, tradeSeriesDrawdown], axis = 1)
+            compositeDrawdown.columns = ['underlyingSeries','tradeSeries']
+            compositeDrawdown.iloc[0, 1] = 0.0
+            compositeDrawdown.iloc[-1, 1] = float(tradeSeriesDrawdown.iloc[-1]) if (len(tradeSeriesDrawdown) > 0) else 0.0
+            return (compositeDrawdown.interpolate(method = 'linear'))
+
+        return (self.cachedResult('drawdownSeries', buildDrawdownSeries))
     
 
 #backtest = BacktestDriver(['SPY'], '45min', 390)
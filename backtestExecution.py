@@ -0,0 +1,148 @@
+import numpy as np
+from backtestStrategy import PriceColumns
+
+
+class ExecutionModel:
+
+    '''
+    Describes how orders are filled and what they cost. Every cost is applied to the order pairs of a backtest as array operations, so that
+    the model adds little to each backtest in a parameter sweep. With the default values, fills are frictionless and at the close of the
+    bar the order was generated on, and each trade commits all of the equity, which matches the returns of a backtest without a model.
+
+    Parameters
+    ----------
+    commissionRate : float
+        commission paid on each fill, as a fraction of the value traded, e.g. 0.0005 for 5 bps.
+    commissionPerOrder : float
+        fixed commission paid on each fill, in the same currency as initialCapital.
+    spreadBps : float
+        the full bid/ask spread in basis points. Half of it is paid on each fill.
+    slippageBps : float
+        a further adverse price move on each fill, in basis points.
+    impactCoefficient : float
+        volume-based slippage. Each fill moves the price against the order by impactCoefficient * sqrt(participation), where participation is
+        the value of the order over the value traded in the fill bar (price times volume). The order value is positionSize * initialCapital,
+        so that the cost does not depend on the path of the equity. Bars without volume add no impact.
+    fillAt : str
+        'close' fills orders at the close of the bar they were generated on, 'nextOpen' at the open of the following bar. With 'nextOpen',
+        a trade whose closing order falls on the last bar cannot be filled and is dropped.
+    positionSize : float
+        the fraction of equity committed to each trade. Values above 1 use leverage.
+    initialCapital : float
+        the equity before the first trade.
+    '''
+
+    def __init__(self,
+                 commissionRate: float = 0.0,
+                 commissionPerOrder: float = 0.0,
+                 spreadBps: float = 0.0,
+                 slippageBps: float = 0.0,
+                 impactCoefficient: float = 0.0,
+                 fillAt: str = 'close',
+                 positionSize: float = 1.0,
+                 initialCapital: float = 100_000.0) -> None:
+
+        if (fillAt not in ('close', 'nextOpen')):
+            raise ValueError('Invalid argument(s). Valid arguments are: \'close\' or \'nextOpen\'')
+        if (positionSize <= 0):
+            raise ValueError('positionSize must be greater than 0')
+
+        self._commissionRate = commissionRate
+        self._commissionPerOrder = commissionPerOrder
+        self._spreadBps = spreadBps
+        self._slippageBps = slippageBps
+        self._impactCoefficient = impactCoefficient
+        self._fillAt = fillAt
+        self._positionSize = positionSize
+        self._initialCapital = initialCapital
+
+
+    def __repr__(self) -> str:
+
+        return ('ExecutionModel(' + ', '.join(i + ' = ' + repr(j) for i, j in self.parameters().items()) + ')')
+
+
+    def parameters(self) -> dict:
+
+        return ({'commissionRate': self._commissionRate,
+                 'commissionPerOrder': self._commissionPerOrder,
+                 'spreadBps': self._spreadBps,
+                 'slippageBps': self._slippageBps,
+                 'impactCoefficient': self._impactCoefficient,
+                 'fillAt': self._fillAt,
+                 'positionSize': self._positionSize,
+                 'initialCapital': self._initialCapital})
+
+
+    def fillCosts(self,
+                  prices: PriceColumns,
+                  fillIndices: np.ndarray) -> np.ndarray:
+
+        '''Returns the adverse price move paid on each fill, as a fraction of the price: half the spread, the slippage and the volume impact.'''
+
+        fillCosts = np.full(len(fillIndices), (self._spreadBps / 2 + self._slippageBps) / 10_000)
+        if (self._impactCoefficient != 0) and (len(fillIndices) > 0):
+            valueTraded = prices['close'][fillIndices] * prices['volume'][fillIndices]
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                participation = np.where(valueTraded > 0, (self._positionSize * self._initialCapital) / valueTraded, 0.0)
+            fillCosts += self._impactCoefficient * np.sqrt(participation)
+
+        return (fillCosts)
+
+
+    def execute(self,
+                prices: PriceColumns,
+                orderIndices: np.ndarray) -> dict[str, np.ndarray]:
+
+        '''
+        Fills the order pairs of a backtest and compounds the equity across its trades.
+
+        Returns a dictionary of arrays with one value per filled trade:
+            'kept' : the order pairs that were filled, as a boolean mask over orderIndices[0::2].
+            'entryIndices', 'exitIndices' : the bars the trade was opened and closed on.
+            'entryPrices', 'exitPrices' : the prices paid and received, after the spread, slippage and impact.
+            'grossReturns' : the return between the unadjusted fill prices.
+            'netReturns' : the return of the trade after every cost, including commissions.
+            'equityReturns' : the change in equity over the trade, which is netReturns scaled by positionSize.
+            'equity' : the equity after the trade. Once it reaches zero, it stays there.
+
+        Parameters
+        ----------
+        prices : PriceColumns
+            the columns of the series that was backtested.
+        orderIndices : np.ndarray
+            the bars of the opening and closing orders, alternating, as in BacktestDriver.tradeResults().
+        '''
+
+        fillPrices = prices['open'] if (self._fillAt == 'nextOpen') else prices['close']
+        fillOffset = 1 if (self._fillAt == 'nextOpen') else 0
+        entryIndices = orderIndices[0::2] + fillOffset
+        exitIndices = orderIndices[1::2] + fillOffset
+        kept = exitIndices < len(fillPrices)
+        entryIndices = entryIndices[kept]
+        exitIndices = exitIndices[kept]
+
+        entryPrices = fillPrices[entryIndices] * (1 + self.fillCosts(prices, entryIndices))
+        exitPrices = fillPrices[exitIndices] * (1 - self.fillCosts(prices, exitIndices))
+        returnsBeforeFixedCosts = (exitPrices * (1 - self._commissionRate)) / (entryPrices * (1 + self._commissionRate)) - 1
+
+        # Equity follows E[k] = a[k] * E[k - 1] + b, with a[k] = 1 + positionSize * return and b the fixed commissions of a trade,
+        # which unrolls to E[k] = A[k] * (E[0] + sum of b / A[j] for j <= k), where A is the running product of a.
+        growth = np.cumprod(1 + self._positionSize * returnsBeforeFixedCosts)
+        with np.errstate(divide = 'ignore', over = 'ignore', invalid = 'ignore'):
+            equity = growth * (self._initialCapital - np.cumsum(2 * self._commissionPerOrder / growth))
+            ruined = np.maximum.accumulate(~(equity > 0)) # Once the equity is used up, no further trades can be placed
+            equity[ruined] = 0.0
+            previousEquity = np.concatenate(([self._initialCapital], equity[:-1]))
+            netReturns = np.where(ruined, np.where(previousEquity > 0, -1 / self._positionSize, 0.0),
+                                  returnsBeforeFixedCosts - 2 * self._commissionPerOrder / (self._positionSize * previousEquity))
+
+        return ({'kept': kept,
+                 'entryIndices': entryIndices,
+                 'exitIndices': exitIndices,
+                 'entryPrices': entryPrices,
+                 'exitPrices': exitPrices,
+                 'grossReturns': (fillPrices[exitIndices] - fillPrices[entryIndices]) / fillPrices[entryIndices],
+                 'netReturns': netReturns,
+                 'equityReturns': self._positionSize * netReturns,
+                 'equity': equity})
@@ -0,0 +1,227 @@
+from contextlib import nullcontext
+import functools
+import pandas as pd
+import time
+import tracemalloc
+from typing import Any, Callable
+
+_disabledStage = nullcontext()
+
+
+class Instrumentation:
+
+    '''
+    Records where a backtest spends its time. Each stage, e.g. the data fetch or the strategy evaluation, is timed in wall-clock and CPU
+    time and counted every time it runs. Stages that run inside other stages are recorded under the path of the enclosing stages, such as
+    'computeReturnSeries/buildTradeResults/evaluateStrategy', so the report reads as a call tree. Pass an instance to BacktestDriver,
+    or to any of its subclasses, and read the results with report().
+
+    Parameters
+    ----------
+    trackMemory : bool
+        when True, the peak memory allocated within each stage, above what was allocated when the stage started, is recorded with
+        tracemalloc. Tracing slows Python allocations down considerably, so it only runs while a stage is open and is off by default.
+    '''
+
+    def __init__(self,
+                 trackMemory: bool = False) -> None:
+
+        self._trackMemory = trackMemory
+        self._stages = {}
+        self._openStages = []
+        self._startedTracing = False
+
+
+    def __repr__(self) -> str:
+
+        return ('Instrumentation(trackMemory = ' + repr(self._trackMemory) + ', stages = ' + str(len(self._stages)) + ')')
+
+
+    def stage(self,
+              stageName: str) -> 'InstrumentedStage':
+
+        '''Returns a context manager that records the code it wraps as one call of stageName, nested under any stage that is already open.'''
+
+        return (InstrumentedStage(self, stageName))
+
+
+    def enterStage(self,
+                   stageName: str) -> None:
+
+        parentPath = self._openStages[-1]['path'] if self._openStages else None
+        openStage = {'path': stageName if (parentPath is None) else (parentPath + '/' + stageName), 'memoryStart': 0, 'peakMemory': 0}
+        self._stages.setdefault(openStage['path'], {'calls': 0, 'wallTime': 0.0, 'cpuTime': 0.0, 'peakMemory': None})
+        if self._trackMemory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._startedTracing = True
+            currentMemory, peakMemory = tracemalloc.get_traced_memory()
+            if self._openStages:
+                self._openStages[-1]['peakMemory'] = max(self._openStages[-1]['peakMemory'], peakMemory) # reset_peak() below would otherwise lose the peak of the enclosing stage
+            tracemalloc.reset_peak()
+            openStage['memoryStart'] = openStage['peakMemory'] = currentMemory
+        self._openStages.append(openStage)
+        openStage['cpuStart'] = time.process_time()
+        openStage['wallStart'] = time.perf_counter()
+
+
+    def exitStage(self) -> None:
+
+        wallTime = time.perf_counter()
+        cpuTime = time.process_time()
+        openStage = self._openStages.pop()
+        record = self._stages[openStage['path']]
+        record['calls'] += 1
+        record['wallTime'] += wallTime - openStage['wallStart']
+        record['cpuTime'] += cpuTime - openStage['cpuStart']
+
+        if self._trackMemory and tracemalloc.is_tracing():
+            peakMemory = max(tracemalloc.get_traced_memory()[1], openStage['peakMemory'])
+            record['peakMemory'] = max(record['peakMemory'] or 0, peakMemory - openStage['memoryStart'])
+            if self._openStages:
+                self._openStages[-1]['peakMemory'] = max(self._openStages[-1]['peakMemory'], peakMemory)
+            elif self._startedTracing:
+                tracemalloc.stop()
+                self._startedTracing = False
+
+
+    def reset(self) -> None:
+
+        '''Clears every recorded stage. Stages that are open keep being recorded when they close.'''
+
+        self._stages = {i['path']: {'calls': 0, 'wallTime': 0.0, 'cpuTime': 0.0, 'peakMemory': None} for i in self._openStages}
+
+
+    def records(self) -> list[dict]:
+
+        '''
+        Returns one dictionary per stage, in the order the stages were first entered, with the keys 'stage', 'calls', 'wallTime' and 'cpuTime',
+        in seconds and summed over every call, and 'peakMemory', the largest peak of any call in bytes, or None when memory is not tracked.
+        Suitable for writing as JSON.
+        '''
+
+        return ([{'stage': i, **j} for i, j in self._stages.items()])
+
+
+    def report(self) -> pd.DataFrame:
+
+        '''Returns the records as a DataFrame indexed by stage, with the share of the total wall-clock time taken by each top level stage.'''
+
+        report = pd.DataFrame(self.records(), columns = ['stage', 'calls', 'wallTime', 'cpuTime', 'peakMemory']).set_index('stage')
+        topLevel = ~report.index.str.contains('/')
+        report['wallShare'] = report['wallTime'] / report.loc[topLevel, 'wallTime'].sum() if topLevel.any() else float('nan')
+
+        return (report)
+
+
+class InstrumentedStage:
+
+    '''Context manager returned by Instrumentation.stage().'''
+
+    __slots__ = ('_instrumentation', '_stageName')
+
+    def __init__(self,
+                 instrumentation: Instrumentation,
+                 stageName: str) -> None:
+
+        self._instrumentation = instrumentation
+        self._stageName = stageName
+
+
+    def __enter__(self) -> None:
+
+        self._instrumentation.enterStage(self._stageName)
+
+
+    def __exit__(self, *exceptionInformation) -> bool:
+
+        self._instrumentation.exitStage()
+
+        return (False)
+
+
+def instrumentedStage(instrumentation: Instrumentation,
+                      stageName: str):
+
+    '''Returns instrumentation.stage(stageName), or a shared context manager that does nothing when instrumentation is None.'''
+
+    if (instrumentation is None):
+        return (_disabledStage)
+
+    return (instrumentation.stage(stageName))
+
+
+def instrumented(method: Callable) -> Callable:
+
+    '''
+    Decorator for methods of BacktestDriver and its subclasses. Each call is recorded as a stage named after the method when the backtest
+    was given an Instrumentation, and otherwise costs one attribute lookup on top of the call itself.
+    '''
+
+    stageName = method.__name__
+
+    @functools.wraps(method)
+    def instrumentedMethod(self, *args, **kwargs):
+        if (self._instrumentation is None):
+            return (method(self, *args, **kwargs))
+        with self._instrumentation.stage(stageName):
+            return (method(self, *args, **kwargs))
+
+    return (instrumentedMethod)
+
+
+def profileCall(function: Callable[[], Any],
+                profiler: str = 'cProfile',
+                outputPath: str = None,
+                sortBy: str = 'cumulative',
+                numberOfLines: int = 30) -> tuple[Any, str]:
+
+    '''
+    Runs function once under a profiler, e.g. profileCall(lambda: BacktestMetrics(...).composeLog()) to profile a whole run, and returns
+    its result along with the profiler's text report.
+
+    Parameters
+    ----------
+    function : Callable[[], Any]
+        the code to profile.
+    profiler : str
+        'cProfile', from the standard library, or 'pyinstrument', a sampling profiler that must be installed separately.
+    outputPath : str, optional
+        where to write the full profile: pstats data for cProfile, which tools such as snakeviz open, or an HTML page for pyinstrument.
+    sortBy : str
+        the pstats sort key for the cProfile report.
+    numberOfLines : int
+        the number of functions listed in the cProfile report.
+    '''
+
+    if (profiler == 'cProfile'):
+        import cProfile
+        import io
+        import pstats
+
+        profile = cProfile.Profile()
+        result = profile.runcall(function)
+        if (outputPath is not None):
+            profile.dump_stats(outputPath)
+        reportStream = io.StringIO()
+        pstats.Stats(profile, stream = reportStream).sort_stats(sortBy).print_stats(numberOfLines)
+        return (result, reportStream.getvalue())
+
+    if (profiler == 'pyinstrument'):
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ImportError('pyinstrument is not installed. Install it with: pip install pyinstrument') from None
+
+        profile = Profiler()
+        profile.start()
+        try:
+            result = function()
+        finally:
+            profile.stop()
+        if (outputPath is not None):
+            with open(outputPath, 'w') as outputFile:
+                outputFile.write(profile.output_html())
+        return (result, profile.output_text())
+
+    raise ValueError('Invalid argument(s). Valid arguments are: \'cProfile\' or \'pyinstrument\'')
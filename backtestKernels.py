@@ -0,0 +1,222 @@
+import numpy as np
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+NO_POSITION = 0 # (False, False, False, True)
+OPENED = 1 # (True, False, False, False)
+HOLDING = 2 # (False, True, False, False)
+CLOSED = 3 # (False, False, True, False)
+OPENED_WHILE_HOLDING = 4 # (False, True, False, True)
+NO_PREVIOUS_BAR = 255 # Marks, in an initial state, that the series starts at its first bar
+
+stateTuples = ((False, False, False, True),
+               (True, False, False, False),
+               (False, True, False, False),
+               (False, False, True, False),
+               (False, True, False, True))
+
+stateCodes = {j: i for i, j in enumerate(stateTuples)}
+
+
+def statesToCodes(states: list[tuple[bool, bool, bool, bool]]) -> np.ndarray:
+
+    '''Converts the list of tuples returned by BacktestDriver.positionStates() into an array of uint8 state codes.'''
+
+    return (np.fromiter((stateCodes[i] for i in states), dtype = np.uint8, count = len(states)))
+
+
+def codesToStates(codes: np.ndarray) -> list[tuple[bool, bool, bool, bool]]:
+
+    '''Converts an array of uint8 state codes back into the list of tuples returned by BacktestDriver.positionStates().'''
+
+    return ([stateTuples[i] for i in codes.tolist()])
+
+
+def entryTriggers(entrySignals: np.ndarray,
+                  entryCount: int) -> np.ndarray:
+
+    '''Marks the bars at which entrySignals has been True for exactly entryCount bars in a row. Works along the last axis.'''
+
+    barIndices = np.arange(entrySignals.shape[-1])
+    lastFalseIndices = np.maximum.accumulate(np.where(entrySignals, -1, barIndices), axis = -1)
+
+    return ((barIndices - lastFalseIndices) == entryCount)
+
+
+def shiftedByOneBar(flags: np.ndarray) -> np.ndarray:
+
+    '''Returns flags delayed by one bar along the last axis, with False for the first bar.'''
+
+    shiftedFlags = np.zeros_like(flags)
+    shiftedFlags[..., 1:] = flags[..., :-1]
+
+    return (shiftedFlags)
+
+
+def startingStates(shape: tuple = ()) -> np.ndarray:
+
+    '''
+    Returns the state of the position state machine before the first bar of a series, for signals whose leading dimensions are shape.
+    A state holds, along its last axis, the number of consecutive entry signals, whether a position is open, and the previous state code.
+    '''
+
+    states = np.zeros(shape + (3,), dtype = np.int64)
+    states[..., 2] = NO_PREVIOUS_BAR
+
+    return (states)
+
+
+def finalStates(entrySignals: np.ndarray,
+                codes: np.ndarray,
+                initialStates: np.ndarray = None) -> np.ndarray:
+
+    '''
+    Returns the state of the position state machine after the last bar of entrySignals, given the codes that stateTransitions() returned
+    for them from initialStates. Passing the result as the initialStates of the following bars continues the series without a break.
+    '''
+
+    initialStates = initialStates if (initialStates is not None) else startingStates(entrySignals.shape[:-1])
+    if (entrySignals.shape[-1] == 0):
+        return (initialStates.copy())
+    barIndices = np.arange(entrySignals.shape[-1])
+    lastFalseIndices = np.where(entrySignals, -1, barIndices).max(axis = -1)
+
+    states = np.empty(initialStates.shape, dtype = np.int64)
+    states[..., 0] = np.where(lastFalseIndices >= 0, entrySignals.shape[-1] - 1 - lastFalseIndices, entrySignals.shape[-1] + initialStates[..., 0])
+    states[..., 1] = np.isin(codes[..., -1], (OPENED, HOLDING, OPENED_WHILE_HOLDING))
+    states[..., 2] = codes[..., -1]
+
+    return (states)
+
+
+def stateTransitionsNumpy(entrySignals: np.ndarray,
+                          exitSignals: np.ndarray,
+                          entryCount: int = 3,
+                          initialStates: np.ndarray = None) -> np.ndarray:
+
+    '''
+    Pure NumPy implementation of the position state machine behind BacktestDriver.positionStates(). Returns one uint8 state code per bar.
+    Both signal arrays may be 1-D, or 2-D with one row per ticker, in which case every row is processed independently.
+
+    Parameters
+    ----------
+    entrySignals : np.ndarray
+        boolean array that is True wherever the entry condition holds. A position is opened once it has held for exactly entryCount bars in a row.
+    exitSignals : np.ndarray
+        boolean array that is True wherever an open position should be closed.
+    entryCount : int
+        the number of consecutive entry signals needed to open a position.
+    initialStates : np.ndarray, optional
+        the state before the first bar, as returned by finalStates() for the bars that precede these. Defaults to the start of a series.
+    '''
+
+    barIndices = np.arange(entrySignals.shape[-1])
+    if (initialStates is None):
+        triggered = entryTriggers(entrySignals, entryCount)
+        initiallyOpen = np.zeros(entrySignals.shape[:-1] + (1,), dtype = bool)
+        initiallyClosed = initiallyOpen
+    else:
+        lastFalseIndices = np.maximum.accumulate(np.where(entrySignals, -1 - initialStates[..., :1], barIndices), axis = -1) # Entry signals carried in count as earlier bars
+        triggered = (barIndices - lastFalseIndices) == entryCount
+        initiallyOpen = initialStates[..., 1:2] != 0
+        initiallyClosed = initialStates[..., 2:3] == CLOSED
+
+    # A position is open after a bar if the most recent trigger or exit signal up to that bar was a trigger that was not also an exit.
+    lastEventIndices = np.maximum.accumulate(np.where(triggered | exitSignals, barIndices, -1), axis = -1)
+    openAfter = np.where(lastEventIndices >= 0, np.take_along_axis(triggered & ~exitSignals, np.maximum(lastEventIndices, 0), axis = -1), initiallyOpen)
+    openBefore = shiftedByOneBar(openAfter)
+    openBefore[..., :1] = initiallyOpen
+
+    closedNow = exitSignals & (openBefore | triggered)
+    closedBefore = shiftedByOneBar(closedNow)
+    closedBefore[..., :1] = initiallyClosed
+
+    codes = np.full(entrySignals.shape, NO_POSITION, dtype = np.uint8)
+    codes[openAfter] = HOLDING
+    codes[openAfter & triggered] = OPENED
+    codes[openAfter & triggered & openBefore] = OPENED_WHILE_HOLDING
+    codes[closedNow & ~closedBefore] = CLOSED
+
+    return (codes)
+
+
+def stateTransitionsLoop(entrySignals: np.ndarray,
+                         exitSignals: np.ndarray,
+                         entryCount: int = 3,
+                         initialStates: np.ndarray = None) -> np.ndarray:
+
+    '''
+    Bar-by-bar implementation of the position state machine behind BacktestDriver.positionStates(), written so that numba can compile it.
+    Takes 2-D signal arrays with one row per ticker and returns one uint8 state code per bar. initialStates, with one row per ticker,
+    continues from the state that finalStates() returned for the preceding bars.
+    '''
+
+    codes = np.empty(entrySignals.shape, dtype = np.uint8)
+    for row in range(entrySignals.shape[0]):
+        consecutiveEntries = 0
+        positionIsOpen = False
+        previousState = NO_PREVIOUS_BAR
+        if (initialStates is not None):
+            consecutiveEntries = initialStates[row, 0]
+            positionIsOpen = initialStates[row, 1] != 0
+            previousState = initialStates[row, 2]
+        currentState = previousState if (previousState != NO_PREVIOUS_BAR) else NO_POSITION
+        for i in range(entrySignals.shape[1]):
+
+            if entrySignals[row, i]:
+                consecutiveEntries += 1
+            else:
+                consecutiveEntries = 0
+
+            if (consecutiveEntries == entryCount):
+                currentState = OPENED
+                positionIsOpen = True
+            if positionIsOpen and (consecutiveEntries != entryCount):
+                currentState = HOLDING
+            if positionIsOpen and exitSignals[row, i]:
+                currentState = CLOSED
+                positionIsOpen = False
+            if (not positionIsOpen) and (currentState != CLOSED):
+                currentState = NO_POSITION
+            if (previousState == HOLDING) and (currentState == OPENED):
+                currentState = OPENED_WHILE_HOLDING
+            if (not positionIsOpen) and (previousState == CLOSED):
+                currentState = NO_POSITION
+
+            codes[row, i] = currentState
+            previousState = currentState
+
+    return (codes)
+
+
+if (njit is not None):
+    stateTransitionsCompiled = njit(cache = True)(stateTransitionsLoop)
+else:
+    stateTransitionsCompiled = None
+
+
+def stateTransitions(entrySignals: np.ndarray,
+                     exitSignals: np.ndarray,
+                     entryCount: int = 3,
+                     initialStates: np.ndarray = None) -> np.ndarray:
+
+    '''
+    Runs the numba-compiled state machine when numba is installed, and the pure NumPy implementation otherwise.
+    Accepts 1-D signals for a single series, or 2-D signals with one row per ticker. A series can be processed in consecutive blocks by
+    passing, as initialStates, the finalStates() of the block before, which gives the same codes as a single call over the whole series.
+    '''
+
+    entrySignals = np.ascontiguousarray(entrySignals, dtype = np.bool_)
+    exitSignals = np.ascontiguousarray(exitSignals, dtype = np.bool_)
+    if (initialStates is not None):
+        initialStates = np.ascontiguousarray(initialStates, dtype = np.int64)
+    if (stateTransitionsCompiled is None):
+        return (stateTransitionsNumpy(entrySignals, exitSignals, entryCount, initialStates))
+    if (entrySignals.ndim == 1):
+        return (stateTransitionsCompiled(entrySignals[np.newaxis], exitSignals[np.newaxis], entryCount,
+                                         initialStates[np.newaxis] if (initialStates is not None) else None)[0])
+
+    return (stateTransitionsCompiled(entrySignals, exitSignals, entryCount, initialStates))
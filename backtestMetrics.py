@@ -1,7 +1,11 @@
-from datetime import datetime
-from bs4 import BeautifulSoup
-from urllib.request import urlopen
 from backtestDriver import BacktestDriver
+import numpy as np
+from backtestData import DataSource
+from backtestExecution import ExecutionModel
+from backtestInstrumentation import Instrumentation, instrumented
+from backtestStrategy import Strategy
+from backtestRates import RateProvider, defaultRateProvider, annualRiskFreeRate, periodRiskFreeReturn
+from backtestStatistics import tradeStatistics
 
 
 class BacktestMetrics(BacktestDriver):
@@ -17,65 +21,156 @@ class BacktestMetrics(BacktestDriver):
         the interval of time between each data point. Options are: '1min', '5min', '15min', '30min', '45min', '1h', '2h', '4h', '8h', '1day', '1week', and '1month'
     numberOfUnits : int
         the number of units of data to request from the API.
+    assetTimeSeries : np.ndarray | list[np.ndarray], optional
+        an array of bars laid out as [Date, Open, High, Low, Close, Volume], or one such array per ticker symbol. When given, the API is not called and these series are backtested instead.
+    executionMode : str
+        how the position states are computed. Options are: 'compiled' and 'python'.
+    dataSource : DataSource, optional
+        where the bars are fetched from when assetTimeSeries is not given. Defaults to the Twelve Data API.
+    strategy : Strategy, optional
+        the strategy to backtest. Defaults to backtestStrategy.RollingMinimumStrategy.
+    executionModel : ExecutionModel, optional
+        the commissions, slippage, fill prices and position size applied to the trades. Defaults to frictionless fills at the close.
+    rateProvider : RateProvider, optional
+        supplies the risk-free rate for each bar. Defaults to backtestRates.defaultRateProvider(), the local ten year Treasury table when there
+        is one and a zero rate otherwise, which never goes to the network. Pass a TableRateProvider with a TreasuryRateFetcher to fill the table.
+    instrumentation : Instrumentation, optional
+        records the time, CPU time, call count and, optionally, peak memory of each stage of the backtest. See backtestInstrumentation.
+    **keywordArguments
+        passed on to the next class, so that BacktestMetrics can be combined with BacktestPlotter.
     '''
 
     def __init__(self, 
                  tickerSymbols: list[str],
                  tickInterval: int,
-                 numberOfUnits: int) -> None:
+                 numberOfUnits: int,
+                 assetTimeSeries: np.ndarray = None,
+                 executionMode: str = 'compiled',
+                 dataSource: DataSource = None,
+                 strategy: Strategy = None,
+                 executionModel: ExecutionModel = None,
+                 rateProvider: RateProvider = None,
+                 instrumentation: Instrumentation = None,
+                 **keywordArguments) -> None:
     
         self._tickerSymbols = tickerSymbols
         self._tickInterval = tickInterval
         self._numberOfUnits = numberOfUnits
 
-        super().__init__(tickerSymbols, tickInterval, numberOfUnits)
+        super().__init__(tickerSymbols, tickInterval, numberOfUnits, assetTimeSeries = assetTimeSeries, executionMode = executionMode, dataSource = dataSource,
+                         strategy = strategy, executionModel = executionModel, instrumentation = instrumentation, **keywordArguments)
+        self._rateProvider = rateProvider if (rateProvider is not None) else defaultRateProvider()
         
 
     def yieldCurveParser(self) -> float:
 
-        '''Fetches the ten year from the web. Page updates once a day.'''
+        '''Returns the ten year rate, in percent, in effect on the last bar of the backtest, from the rate provider.'''
         
-        URL = ("https://home.treasury.gov/resource-center/data-chart-center/interest-rates/TextView?type=daily_treasury_yield_curve&field_tdr_date_value_month=" + str(datetime.today().strftime('%Y%m')))
-        webpageTableAsList = []
-        soup = BeautifulSoup(urlopen(URL).read())
-        attributes = soup.find('table').find_all('tr')
-        for parYieldCurveRate in attributes:
-            maturityDate = parYieldCurveRate.find_all('td')
-            maturityDate = [i.text.strip() for i in maturityDate]
-            webpageTableAsList.append(maturityDate)
-            
-        tenYearRate = float(webpageTableAsList[-1][17])
-        
-        return (tenYearRate)
+        return (self.cachedResult('yieldCurveParser', lambda: 100 * float(self._rateProvider.alignedRates(self.barDates()[-1:])[0])))
+
+
+    @instrumented
+    def riskFreeRate(self) -> float:
+
+        '''Returns the constant annual rate, as a fraction, that compounds to the same return as yieldCurveStandardization() over the backtest.'''
+
+        return (self.cachedResult('riskFreeRate', lambda: annualRiskFreeRate(self.barDates(), self._rateProvider)))
+
 
-    
     def yieldCurveStandardization(self) -> float:
 
-        '''Reduces the rate to match the period of time that the backtest was ran over. This is done so that the ratios/KPIs will compute properly.'''
-        pass
+        '''
+        Reduces the rate to match the period of time that the backtest was ran over. This is done so that the ratios/KPIs will compute properly.
+        Each bar is aligned with the rate in effect on its date, and the rates are compounded over the exact gaps between bars.
+        '''
+        
+        return (self.cachedResult('yieldCurveStandardization', lambda: periodRiskFreeReturn(self.barDates(), self._rateProvider.alignedRates(self.barDates()))))
+
+
+    @instrumented
+    def statistics(self) -> dict[str, np.ndarray]:
+
+        '''
+        Computes every metric for the trade series and the underlying series together, in a single pass over both. Row 0 of each
+        array belongs to the trade series and row 1 to the underlying series. The result is cached until the backtest changes.
+        '''
+
+        return (self.cachedResult('statistics', lambda: tradeStatistics([self._tradesPercentageChangeSeries, self._underlyingPercentageChangeSeries], [self._holdingPeriods],
+                                                                        len(self._assetTimeSeries), self.backtestYears(), self.riskFreeRate())))
+
+
+    def sharpeRatio(self) -> float:
+
+        '''Annualized Sharpe ratio of the trade series, using the number of trades per year as the period.'''
+
+        return (float(self.statistics()['sharpeRatio'][0]))
+
+
+    def sortinoRatio(self) -> float:
+
+        '''Annualized Sortino ratio of the trade series, using the number of trades per year as the period.'''
+
+        return (float(self.statistics()['sortinoRatio'][0]))
+
+
+    def maximumDrawdown(self) -> float:
+
+        '''Largest peak-to-trough decline of the compounded trade series, as a negative fraction.'''
+
+        return (float(self.statistics()['maximumDrawdown'][0]))
+
+
+    def compoundAnnualGrowthRate(self) -> float:
+
+        '''Compound annual growth rate of the trade series over the length of the backtest.'''
+
+        return (float(self.statistics()['compoundAnnualGrowthRate'][0]))
+
+
+    def winRate(self) -> float:
+
+        '''Fraction of trades with a positive return.'''
+
+        return (float(self.statistics()['winRate'][0]))
+
+
+    def profitFactor(self) -> float:
 
+        '''Sum of the winning trade returns divided by the sum of the losing trade returns.'''
 
-    def someMetric(self): # Type hinting to be determined
-        pass
+        return (float(self.statistics()['profitFactor'][0]))
 
 
-    def someOtherMetric(self): # Type hinting to be determined
-        pass
+    def exposure(self) -> float:
 
+        '''Fraction of bars during which a trade was open.'''
 
-    def someRatio(self): # Type hinting to be determined
-        pass
+        return (float(self.statistics()['exposure'][0]))
 
 
-    def composeLog(self): # Type hinting to be determined
+    @instrumented
+    def composeLog(self) -> list[tuple[str, str | float]]:
 
         '''Puts together all the metrics so that they can either be stored or viewed in the console.'''
 
+        statistics = self.statistics()
         log = [
               ('backtestID', self._backtestID),
-              ('someMetric', self.someMetric()),
-              ('someOtherMetric', self.someOtherMetric()),
-              ('someRatio', self.someRatio())
+              ('tradeCount', int(statistics['count'][0])),
+              ('totalReturn', float(statistics['totalReturn'][0])),
+              ('compoundAnnualGrowthRate', self.compoundAnnualGrowthRate()),
+              ('sharpeRatio', self.sharpeRatio()),
+              ('sortinoRatio', self.sortinoRatio()),
+              ('maximumDrawdown', self.maximumDrawdown()),
+              ('winRate', self.winRate()),
+              ('profitFactor', self.profitFactor()),
+              ('exposure', self.exposure()),
+              ('averageHoldingPeriod', float(statistics['averageHoldingPeriod'][0])),
+              ('underlyingTotalReturn', float(statistics['totalReturn'][1])),
+              ('underlyingSharpeRatio', float(statistics['sharpeRatio'][1])),
+              ('underlyingMaximumDrawdown', float(statistics['maximumDrawdown'][1])),
+              ('riskFreeRate', self.riskFreeRate()),
+              ('standardizedRiskFreeRate', self.yieldCurveStandardization())
               ]
 
         return (log)
@@ -1,8 +1,375 @@
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
+import os
 import matplotlib.pyplot as plt; plt.rcdefaults()
 import matplotlib.patches as mpatches
-from backtestDriver import BacktestDriver 
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+from backtestDriver import BacktestDriver
+from backtestData import DataSource
+from backtestExecution import ExecutionModel
+from backtestInstrumentation import Instrumentation, instrumented, instrumentedStage
+from backtestStrategy import Strategy
+
+plotNames = ('plotIndividualTrades', 'cumulativeSeriesPlot', 'drawdownPlot')
+
+figureSize = [14.275, 9.525]
+
+
+def envelopeIndices(values: np.ndarray,
+                    maximumPoints: int) -> np.ndarray:
+
+    '''
+    Returns the indices of the points to draw so that a line keeps its per-pixel envelope. The series is split into maximumPoints // 2
+    buckets, and the lowest and highest point of each bucket are kept, along with the first and last point, so every peak and trough survives.
+    '''
+
+    numberOfValues = len(values)
+    if (numberOfValues <= maximumPoints):
+        return (np.arange(numberOfValues))
+    bucketSize = -(-numberOfValues // max(1, maximumPoints // 2))
+    numberOfBuckets = -(-numberOfValues // bucketSize)
+    buckets = np.full(numberOfBuckets * bucketSize, np.nan)
+    buckets[:numberOfValues] = values
+    buckets = buckets.reshape(numberOfBuckets, bucketSize)
+    bucketStarts = np.arange(numberOfBuckets) * bucketSize
+    minimumIndices = np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis = 1) + bucketStarts
+    maximumIndices = np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis = 1) + bucketStarts
+
+    return (np.unique(np.concatenate(([0, numberOfValues - 1], minimumIndices, maximumIndices))))
+
+
+def largestTriangleThreeBucketsIndices(values: np.ndarray,
+                                       maximumPoints: int) -> np.ndarray:
+
+    '''
+    Returns the indices of the points kept by Largest-Triangle-Three-Buckets downsampling. The first and last point are kept, and from each of
+    the buckets between them the point that forms the largest triangle with the previously kept point and the average of the next bucket.
+    The bucket that holds the global minimum or maximum keeps it instead, so that the range of the line is drawn in full. When both fall in
+    the same bucket, one point more than maximumPoints is returned.
+    '''
+
+    numberOfValues = len(values)
+    if (numberOfValues <= maximumPoints) or (maximumPoints < 3):
+        return (np.arange(numberOfValues))
+    bucketEdges = np.linspace(1, numberOfValues - 1, maximumPoints - 1).astype(np.int64)
+    bucketEdges = np.append(bucketEdges, numberOfValues)
+    positions = np.arange(numberOfValues, dtype = np.float64)
+    extremeIndices = np.array([np.argmin(np.where(np.isnan(values), np.inf, values)), np.argmax(np.where(np.isnan(values), -np.inf, values))])
+
+    keptIndices = np.empty(maximumPoints, dtype = np.int64)
+    keptIndices[0] = 0
+    keptIndices[-1] = numberOfValues - 1
+    previousIndex = 0
+    for i in range(maximumPoints - 2):
+        start, stop = bucketEdges[i], bucketEdges[i + 1]
+        averagePosition = positions[stop:bucketEdges[i + 2]].mean()
+        averageValue = values[stop:bucketEdges[i + 2]].mean()
+        areas = np.abs((positions[previousIndex] - averagePosition) * (values[start:stop] - values[previousIndex])
+                       - (positions[previousIndex] - positions[start:stop]) * (averageValue - values[previousIndex]))
+        previousIndex = start + int(np.argmax(np.nan_to_num(areas, nan = -1.0)))
+        bucketExtremes = extremeIndices[(extremeIndices >= start) & (extremeIndices < stop)]
+        if (len(bucketExtremes) > 0):
+            previousIndex = int(bucketExtremes.max())
+        keptIndices[i + 1] = previousIndex
+
+    return (np.unique(np.concatenate((keptIndices, extremeIndices))))
+
+
+def downsampledIndices(values: np.ndarray,
+                       downsampling: str = 'envelope',
+                       maximumPoints: int = 4000) -> np.ndarray:
+
+    '''
+    Returns the indices of the points to draw for a line.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        the values of the line, one per bar.
+    downsampling : str
+        'envelope' keeps the minimum and maximum of every bucket, 'lttb' uses Largest-Triangle-Three-Buckets, and None keeps every point.
+    maximumPoints : int
+        roughly the number of points to keep. Series with fewer points are drawn in full.
+    '''
+
+    if (downsampling is None):
+        return (np.arange(len(values)))
+    if (downsampling == 'envelope'):
+        return (envelopeIndices(values, maximumPoints))
+    if (downsampling == 'lttb'):
+        return (largestTriangleThreeBucketsIndices(values, maximumPoints))
+    raise ValueError('Invalid argument(s). Valid arguments are: \'envelope\', \'lttb\' or None')
+
+
+def positionIntervals(positionOpen: np.ndarray,
+                      minimumGap: int = 0) -> tuple[np.ndarray, np.ndarray]:
+
+    '''
+    Returns the first and last bar of every run of bars with a position open. Runs separated by no more than minimumGap bars are merged,
+    since gaps narrower than a pixel are not visible once drawn.
+    '''
+
+    changes = np.diff(np.concatenate(([False], positionOpen, [False])).astype(np.int8))
+    starts = np.flatnonzero(changes == 1)
+    stops = np.flatnonzero(changes == -1) - 1
+    if (minimumGap > 0) and (len(starts) > 1):
+        separated = (starts[1:] - stops[:-1]) > minimumGap
+        starts = starts[np.concatenate(([True], separated))]
+        stops = stops[np.concatenate((separated, [True]))]
+
+    return (starts, stops)
+
+
+def plotTitle(backtest: BacktestDriver) -> str:
+
+    return ('Long System over ' + str(backtest._tickerSymbols[0]) + ' with Overnight Holding Periods Permitted, ' + backtest.dateLabel(0) + ' – ' + backtest.dateLabel(-1))
+
+
+def individualTradesData(backtest: BacktestDriver,
+                         downsampling: str = 'envelope',
+                         maximumPoints: int = 4000) -> dict:
+
+    '''Collects what renderIndividualTrades() draws. Only the downsampled points of the price line and the merged trade intervals are kept.'''
+
+    pricesAndStates = backtest.priceAndStatesConstructor()
+    prices = pricesAndStates['Price'].to_numpy()
+    pointIndices = downsampledIndices(prices, downsampling, maximumPoints)
+    intervalStarts, intervalStops = positionIntervals(pricesAndStates['PositionOpen'].to_numpy(), (len(prices) // maximumPoints) if (downsampling is not None) else 0)
+
+    return ({'plotName': 'plotIndividualTrades',
+             'numberOfBars': len(prices),
+             'priceIndices': pointIndices,
+             'prices': prices[pointIndices],
+             'priceLimits': (np.nanmin(prices), np.nanmax(prices)),
+             'intervalStarts': intervalStarts,
+             'intervalStops': intervalStops,
+             'tradeCount': len(backtest._holdingPeriods),
+             'title': plotTitle(backtest)})
+
+
+def cumulativeSeriesData(backtest: BacktestDriver,
+                         downsampling: str = 'envelope',
+                         maximumPoints: int = 4000) -> dict:
+
+    '''Collects what renderCumulativeSeries() draws. The axis limits are taken from the full series, before downsampling.'''
+
+    compositeSeries = backtest.cumulativeSeries()
+    underlyingSeries = compositeSeries['underlyingSeries'].to_numpy()
+    tradeSeries = compositeSeries['tradeSeries'].to_numpy()
+    underlyingIndices = downsampledIndices(underlyingSeries, downsampling, maximumPoints)
+    tradeIndices = downsampledIndices(tradeSeries, downsampling, maximumPoints)
+    numberOfBars = len(backtest.seriesColumn('close'))
+    intervalStarts, intervalStops = positionIntervals(backtest.priceAndStatesConstructor()['PositionOpen'].to_numpy(), (numberOfBars // maximumPoints) if (downsampling is not None) else 0)
+
+    return ({'plotName': 'cumulativeSeriesPlot',
+             'numberOfBars': len(underlyingSeries),
+             'underlyingIndices': underlyingIndices,
+             'underlyingSeries': underlyingSeries[underlyingIndices],
+             'tradeIndices': tradeIndices,
+             'tradeSeries': tradeSeries[tradeIndices],
+             'seriesLimits': (min(np.nanmin(tradeSeries), np.nanmin(underlyingSeries)) - 0.005, max(np.nanmax(tradeSeries), np.nanmax(underlyingSeries)) + 0.005),
+             'intervalStarts': intervalStarts,
+             'intervalStops': intervalStops,
+             'tradeCount': len(backtest._holdingPeriods),
+             'title': plotTitle(backtest)})
+
+
+def drawdownData(backtest: BacktestDriver,
+                 downsampling: str = 'envelope',
+                 maximumPoints: int = 4000) -> dict:
+
+    '''Collects what renderDrawdown() draws.'''
+
+    compositeDrawdown = backtest.drawdownSeries()
+    underlyingSeries = compositeDrawdown['underlyingSeries'].to_numpy()
+    tradeSeries = compositeDrawdown['tradeSeries'].to_numpy()
+    underlyingIndices = downsampledIndices(underlyingSeries, downsampling, maximumPoints)
+    tradeIndices = downsampledIndices(tradeSeries, downsampling, maximumPoints)
+
+    return ({'plotName': 'drawdownPlot',
+             'numberOfBars': len(underlyingSeries),
+             'underlyingIndices': underlyingIndices,
+             'underlyingSeries': underlyingSeries[underlyingIndices],
+             'tradeIndices': tradeIndices,
+             'tradeSeries': tradeSeries[tradeIndices],
+             'title': 'Drawdown for ' + plotTitle(backtest)})
+
+
+def newFigure(headless: bool) -> tuple:
+
+    '''Returns a figure and its axes. Headless figures are not registered with pyplot, so they need no display and never have to be closed.'''
+
+    if headless:
+        figure = Figure(figsize = figureSize)
+        return (figure, figure.subplots())
+
+    return (plt.subplots(figsize = figureSize))
+
+
+def shadeIntervals(ax1,
+                   intervalStarts: np.ndarray,
+                   intervalStops: np.ndarray,
+                   alpha: float) -> None:
+
+    '''Shades every interval over the full height of the axes, as a single collection of rectangles.'''
+
+    vertices = np.empty((len(intervalStarts), 4, 2))
+    vertices[:, [0, 1], 0] = intervalStarts[:, np.newaxis]
+    vertices[:, [2, 3], 0] = intervalStops[:, np.newaxis]
+    vertices[:, [0, 3], 1] = 0
+    vertices[:, [1, 2], 1] = 1
+    ax1.add_collection(PolyCollection(vertices, transform = ax1.get_xaxis_transform(), facecolor = 'grey', edgecolor = 'none', alpha = alpha), autolim = False)
+
+
+def styleAxes(ax1,
+              labelSize: int,
+              percentages: bool) -> None:
+
+    ax1.tick_params(labelsize = labelSize, labelright = True)
+    if percentages:
+        yValues = ax1.get_yticks()
+        ax1.set_yticks(yValues)
+        ax1.set_yticklabels(['{:,.2%}'.format(y) for y in yValues])
+    ax1.minorticks_on()
+    ax1.grid(which = 'both', linestyle = '-', linewidth = '1', color = 'dimgrey')
+    ax1.grid(which = 'minor', linestyle = ':', linewidth = '1', color = 'grey')
+
+
+def renderIndividualTrades(figureData: dict,
+                           headless: bool = False) -> Figure:
+
+    '''Draws the underlying data with the trades executed by the backtest, shaded in.'''
+
+    fig, ax1 = newFigure(headless)
+    ax1.plot(figureData['priceIndices'], figureData['prices'], color = 'black')
+    shadeIntervals(ax1, figureData['intervalStarts'], figureData['intervalStops'], 0.5)
+    ax1.set_xlim(0, figureData['numberOfBars'] - 1)
+    ax1.set_ylim(*figureData['priceLimits']);
+    ax1.title.set_text(figureData['title'])
+    underlyingCurve = mpatches.Patch(color = 'black', label = 'Underlying Asset')
+    individualTrades = mpatches.Patch(color = 'grey', alpha = .75, label = (str(figureData['tradeCount']) + ' Trade(s)'))
+    ax1.legend(handles = [underlyingCurve, individualTrades], loc = 'upper left')
+    styleAxes(ax1, 16, False)
+
+    return (fig)
+
+
+def renderCumulativeSeries(figureData: dict,
+                           headless: bool = False) -> Figure:
+
+    '''Draws the cumulative returns of the underlying data and of the trade series, with the trades shaded in.'''
+
+    fig, ax1 = newFigure(headless)
+    ax1.plot(figureData['underlyingIndices'], figureData['underlyingSeries'], color = 'black', linewidth = 1.1)
+    ax1.plot(figureData['tradeIndices'], figureData['tradeSeries'], color = 'C0', linewidth = 1.5)
+    ax1.axhline(0.0, linewidth = 0.5, color = 'firebrick')
+    shadeIntervals(ax1, figureData['intervalStarts'], figureData['intervalStops'], 0.25)
+    ax1.set_xlim(0, figureData['numberOfBars'] - 1)
+    ax1.set_ylim(*figureData['seriesLimits']);
+    ax1.set_title(figureData['title'])
+    underlyingCurve = mpatches.Patch(color = 'black', label = 'Underlying Asset')
+    tradeSeriesCurve = mpatches.Patch(color = 'C0', alpha = 0.8, label = 'Trade Series')
+    individualTrades = mpatches.Patch(color = 'grey', alpha = 0.25, label = (str(figureData['tradeCount']) + ' Trade(s)'))
+    ax1.legend(handles = [underlyingCurve, tradeSeriesCurve, individualTrades], loc = 'upper left')
+    styleAxes(ax1, 14, True)
+
+    return (fig)
+
+
+def renderDrawdown(figureData: dict,
+                   headless: bool = False) -> Figure:
+
+    '''Draws the drawdown for both the underlying series, and the trade series.'''
+
+    fig, ax1 = newFigure(headless)
+    ax1.plot(figureData['underlyingIndices'], figureData['underlyingSeries'], color = 'black', linewidth = 1.1)
+    ax1.plot(figureData['tradeIndices'], figureData['tradeSeries'], color = 'C0', linewidth = 1.5)
+    ax1.axhline(0.0, linewidth = 0.5, color = 'firebrick')
+    ax1.set_xlim(0, figureData['numberOfBars'] - 1)
+    ax1.set_title(figureData['title'])
+    underlyingCurve = mpatches.Patch(color = 'black', label = 'Underlying Asset')
+    tradeSeriesCurve = mpatches.Patch(color = 'C0', alpha = 0.8, label = 'Trade Series')
+    ax1.legend(handles = [underlyingCurve, tradeSeriesCurve], loc = 'lower left')
+    styleAxes(ax1, 14, True)
+
+    return (fig)
+
+
+figureBuilders = {'plotIndividualTrades': (individualTradesData, renderIndividualTrades),
+                  'cumulativeSeriesPlot': (cumulativeSeriesData, renderCumulativeSeries),
+                  'drawdownPlot': (drawdownData, renderDrawdown)}
+
+
+def saveFigure(figureData: dict,
+               path: str,
+               dpi: float = None) -> int:
+
+    '''Renders a figure headlessly, writes it to path and returns the size of the file in bytes.'''
+
+    figure = figureBuilders[figureData['plotName']][1](figureData, headless = True)
+    figure.savefig(path, dpi = dpi if (dpi is not None) else 'figure')
+
+    return (os.path.getsize(path))
+
+
+def saveFigureTask(task: tuple[dict, str, float]) -> int:
+
+    return (saveFigure(*task))
+
+
+def exportFigures(figures: list[tuple[dict, str]],
+                  maxWorkers: int = None,
+                  dpi: float = None) -> list[int]:
+
+    '''
+    Renders many figures without a display and writes them to disk, in parallel across processes. Only the figure data, which is already
+    downsampled, is sent to the workers. Returns the size of each file in bytes.
+
+    Parameters
+    ----------
+    figures : list[tuple[dict, str]]
+        pairs of figure data, as returned by individualTradesData(), cumulativeSeriesData() or drawdownData(), and the path to write it to.
+        The file format follows the extension of the path.
+    maxWorkers : int, optional
+        the number of worker processes. Defaults to the number of CPUs. With 1, the figures are rendered in the current process.
+    dpi : float, optional
+        the resolution of the files. Defaults to that of the figure.
+    '''
+
+    tasks = [(i, j, dpi) for i, j in figures]
+    maxWorkers = min(len(tasks), maxWorkers if (maxWorkers is not None) else (os.cpu_count() or 1))
+    if (maxWorkers <= 1):
+        return ([saveFigureTask(i) for i in tasks])
+
+    with ProcessPoolExecutor(max_workers = maxWorkers) as executor:
+        return (list(executor.map(saveFigureTask, tasks)))
+
+
+def exportPlots(backtest: BacktestDriver,
+                directory: str,
+                plotNames: tuple[str] = plotNames,
+                downsampling: str = 'envelope',
+                maximumPoints: int = 4000,
+                fileFormat: str = 'png',
+                maxWorkers: int = 1,
+                dpi: float = None) -> list[str]:
+
+    '''
+    Writes the plots of a backtest to directory without a display, one file per plot named after the BacktestPlotter method that shows it.
+    Accepts any BacktestDriver, not only a BacktestPlotter. Returns the paths of the files. See exportFigures() for maxWorkers and dpi.
+    With instrumentation, building the figure data and rendering the files are recorded as the stages 'plotData' and 'plotRender'.
+    '''
+
+    os.makedirs(directory, exist_ok = True)
+    paths = [os.path.join(directory, i + '.' + fileFormat) for i in plotNames]
+    with instrumentedStage(backtest._instrumentation, 'plotData'):
+        figures = [(figureBuilders[i][0](backtest, downsampling, maximumPoints), j) for i, j in zip(plotNames, paths)]
+    with instrumentedStage(backtest._instrumentation, 'plotRender'):
+        exportFigures(figures, maxWorkers, dpi)
+
+    return (paths)
 
 
 class BacktestPlotter(BacktestDriver):
@@ -10,6 +377,11 @@ class BacktestPlotter(BacktestDriver):
     '''
     Class used to plot the results of the backtest.
 
+    Each plot accepts show, downsampling and maximumPoints. Lines are downsampled to about maximumPoints points per line, keeping their
+    per-pixel minimum and maximum by default, and trades are shaded as one rectangle per run of bars in a position, so that long series of
+    minute bars render quickly. Pass downsampling = None to draw every bar. With show = False the figure is returned without pausing
+    for a display. Use exportPlots() to write the plots to files headlessly.
+
     Parameters
     ----------
     tickerSymbol : list[str]
@@ -18,120 +390,107 @@ class BacktestPlotter(BacktestDriver):
         the interval of time between each data point. Options are: '1min', '5min', '15min', '30min', '45min', '1h', '2h', '4h', '8h', '1day', '1week', and '1month'
     numberOfUnits : int
         the number of units of data to request from the API.
+    assetTimeSeries : np.ndarray | list[np.ndarray], optional
+        an array of bars laid out as [Date, Open, High, Low, Close, Volume], or one such array per ticker symbol. When given, the API is not called and these series are backtested instead.
+    executionMode : str
+        how the position states are computed. Options are: 'compiled' and 'python'.
+    dataSource : DataSource, optional
+        where the bars are fetched from when assetTimeSeries is not given. Defaults to the Twelve Data API.
+    strategy : Strategy, optional
+        the strategy to backtest. Defaults to backtestStrategy.RollingMinimumStrategy.
+    executionModel : ExecutionModel, optional
+        the commissions, slippage, fill prices and position size applied to the trades. Defaults to frictionless fills at the close.
+    instrumentation : Instrumentation, optional
+        records the time, CPU time, call count and, optionally, peak memory of each stage of the backtest. See backtestInstrumentation.
+    **keywordArguments
+        passed on to the next class, so that a class combining BacktestPlotter with BacktestMetrics can be given a rateProvider.
     '''
 
 
-    def __init__(self, 
+    def __init__(self,
                  tickerSymbols: list[str],
-                 tickInterval: int, 
-                 numberOfUnits: int) -> None:
-    
+                 tickInterval: int,
+                 numberOfUnits: int,
+                 assetTimeSeries: np.ndarray = None,
+                 executionMode: str = 'compiled',
+                 dataSource: DataSource = None,
+                 strategy: Strategy = None,
+                 executionModel: ExecutionModel = None,
+                 instrumentation: Instrumentation = None,
+                 **keywordArguments) -> None:
+
         self._tickerSymbols = tickerSymbols
         self._tickInterval = tickInterval
         self._numberOfUnits = numberOfUnits
 
-        super().__init__(tickerSymbols, tickInterval, numberOfUnits)
-        
+        super().__init__(tickerSymbols, tickInterval, numberOfUnits, assetTimeSeries = assetTimeSeries, executionMode = executionMode, dataSource = dataSource,
+                         strategy = strategy, executionModel = executionModel, instrumentation = instrumentation, **keywordArguments)
+
+
+    @instrumented
+    def plotIndividualTrades(self,
+                             show: bool = True,
+                             downsampling: str = 'envelope',
+                             maximumPoints: int = 4000) -> Figure:
 
-    def plotIndividualTrades(self) -> None:
-        
         '''Plots the underlying data with the trades executed by the backtest, shaded in.'''
 
-        pricesAndStates = self.priceAndStatesConstructor()
-        
-        fig, ax1 = plt.subplots(figsize = [14.275, 9.525])
-        pricesAndStates['Price'].plot(color = 'black')
-        ax1.fill_between(pricesAndStates.index, 0, 1, where = pricesAndStates['PositionOpen'], transform = ax1.get_xaxis_transform(), color = 'grey', alpha = 0.5)
-        ax1.set_ylim(pricesAndStates['Price'].min(), pricesAndStates['Price'].max());
-        ax1.title.set_text('Long System over ' + str(self._tickerSymbols[0]) + ' with Overnight Holding Periods Permitted, ' + str(self._assetTimeSeries[0][0]) + ' – ' + str(self._assetTimeSeries[-1][0]))
-        ax1.tick_params(labelsize = 16, labelright = True)
-        underlyingCurve = mpatches.Patch(color = 'black', label = 'Underlying Asset')
-        individualTrades = mpatches.Patch(color = 'grey', alpha = .75, label = (str(len(self._holdingPeriods)) + ' Trade(s)'))
-        plt.legend(handles = [underlyingCurve, individualTrades], loc = 'upper left')
-        ax1.minorticks_on()
-        ax1.grid(which = 'both', linestyle = '-', linewidth = '1', color = 'dimgrey')
-        ax1.grid(which = 'minor', linestyle = ':', linewidth = '1', color = 'grey')
-        plt.pause(0.01)
-
-
-    def cumulativeSeriesPlot(self) -> None:
-        
+        with instrumentedStage(self._instrumentation, 'plotData'):
+            figureData = individualTradesData(self, downsampling, maximumPoints)
+        with instrumentedStage(self._instrumentation, 'plotRender'):
+            fig = renderIndividualTrades(figureData)
+            if show:
+                plt.pause(0.01)
+
+        return (fig)
+
+
+    @instrumented
+    def cumulativeSeriesPlot(self,
+                             show: bool = True,
+                             downsampling: str = 'envelope',
+                             maximumPoints: int = 4000) -> Figure:
+
         '''Plots the underlying data with the trades executed by the backtest, shaded in.
            Also plots the equity curve in the same figure for the trade series generated.'''
 
-        tradeSeries = self.tradeSeriesWithPositionIndices()
-        compositeSeries = pd.DataFrame(self._underlyingPercentageChangeSeries, columns = ['underlyingSeries']).cumsum()
-        compositeSeries['tradeSeries'] = tradeSeries.cumsum()
-        compositeSeries['tradeSeries'].iloc[0] = 0.0
-        compositeSeries['tradeSeries'].iloc[-1] = float(tradeSeries.sum())
-        compositeSeries = compositeSeries.interpolate(method = 'linear')
-        
-        pricesAndStates = self.priceAndStatesConstructor()
-        
-        fig, ax1 = plt.subplots(figsize = [14.275, 9.525])
-        compositeSeries['underlyingSeries'].plot(color = 'black', linewidth = 1.1)
-        compositeSeries['tradeSeries'].plot(color = 'C0', linewidth = 1.5)
-        ax1.axhline(0.0, linewidth = 0.5, color = 'firebrick')
-        ax1.fill_between(pricesAndStates.index, 0, 1, where = pricesAndStates['PositionOpen'], transform = ax1.get_xaxis_transform(), color = 'grey', alpha = 0.25)
-        
-        if (compositeSeries['tradeSeries'].min() < compositeSeries['underlyingSeries'].min()):
-            if (compositeSeries['tradeSeries'].max() < compositeSeries['underlyingSeries'].max()):
-                ax1.set_ylim(compositeSeries['tradeSeries'].min() - 0.005, compositeSeries['underlyingSeries'].max() + 0.005);
-            else:
-                ax1.set_ylim(compositeSeries['tradeSeries'].min() - 0.005, compositeSeries['tradeSeries'].max() + 0.005);
-        else:
-            if (compositeSeries['tradeSeries'].max() < compositeSeries['underlyingSeries'].max()):
-                ax1.set_ylim(compositeSeries['underlyingSeries'].min() - 0.005, compositeSeries['underlyingSeries'].max() + 0.005);
-            else:
-                ax1.set_ylim(compositeSeries['underlyingSeries'].min() - 0.005, compositeSeries['tradeSeries'].max() + 0.005);
-        
-        ax1.set_title('Long System over ' + str(self._tickerSymbols[0]) + ' with Overnight Holding Periods Permitted, ' + str(self._assetTimeSeries[0][0]) + ' – ' + str(self._assetTimeSeries[-1][0]))
-        ax1.tick_params(labelsize = 14, labelright = True)
-        yValues = ax1.get_yticks()
-        ax1.set_yticklabels(['{:,.2%}'.format(y) for y in yValues])
-        underlyingCurve = mpatches.Patch(color = 'black', label = 'Underlying Asset')
-        tradeSeriesCurve = mpatches.Patch(color = 'C0', alpha = 0.8, label = 'Trade Series')
-        individualTrades = mpatches.Patch(color = 'grey', alpha = 0.25, label = (str(len(self._holdingPeriods)) + ' Trade(s)'))
-        plt.legend(handles = [underlyingCurve, tradeSeriesCurve, individualTrades], loc = 'upper left')
-        ax1.minorticks_on()
-        ax1.grid(which = 'both', linestyle = '-', linewidth = '1', color = 'dimgrey')
-        ax1.grid(which = 'minor', linestyle = ':', linewidth = '1', color = 'grey')
-        plt.pause(0.01)
-
-
-    def drawdownPlot(self) -> None:
-        
+        with instrumentedStage(self._instrumentation, 'plotData'):
+            figureData = cumulativeSeriesData(self, downsampling, maximumPoints)
+        with instrumentedStage(self._instrumentation, 'plotRender'):
+            fig = renderCumulativeSeries(figureData)
+            if show:
+                plt.pause(0.01)
+
+        return (fig)
+
+
+    @instrumented
+    def drawdownPlot(self,
+                     show: bool = True,
+                     downsampling: str = 'envelope',
+                     maximumPoints: int = 4000) -> Figure:
+
         '''Plots the drawdown for both the underlying series, and the trade series.'''
-        
-        tradeSeries = self.tradeSeriesWithPositionIndices()
-        tradeSeriesDrawdown = (((1 + tradeSeries[0]).cumprod()) - ((1 + tradeSeries[0]).cumprod()).cummax()) / ((1 + tradeSeries[0]).cumprod()).cummax()
-
-        underlyingSeries = pd.DataFrame(self._underlyingPercentageChangeSeries)
-        underlyingDrawdown = (((1 + underlyingSeries[0]).cumprod()) - ((1 + underlyingSeries[0]).cumprod()).cummax()) / ((1 + underlyingSeries[0]).cumprod()).cummax()
-
-        compositeDrawdown = pd.concat([underlyingDrawdown, tradeSeriesDrawdown], axis = 1)
-        compositeDrawdown.columns = ['underlyingSeries','tradeSeries']
-        compositeDrawdown['tradeSeries'].iloc[0] = 0.0
-        compositeDrawdown['tradeSeries'].iloc[-1] = float(tradeSeriesDrawdown.iloc[-1])
-        compositeDrawdown = compositeDrawdown.interpolate(method = 'linear')
-
-        fig, ax1 = plt.subplots(figsize = [14.275, 9.525])
-        compositeDrawdown['underlyingSeries'].plot(color = 'black', linewidth = 1.1)
-        compositeDrawdown['tradeSeries'].plot(color = 'C0', linewidth = 1.5)
-        ax1.axhline(0.0, linewidth = 0.5, color = 'firebrick')
-        ax1.set_title('Drawdown for Long System over ' + str(self._tickerSymbols[0]) + ' with Overnight Holding Periods Permitted, ' + str(self._assetTimeSeries[0][0]) + ' – ' + str(self._assetTimeSeries[-1][0]))
-        ax1.tick_params(labelsize = 14, labelright = True)
-        yValues = ax1.get_yticks()
-        ax1.set_yticklabels(['{:,.2%}'.format(y) for y in yValues])
-        underlyingCurve = mpatches.Patch(color = 'black', label = 'Underlying Asset')
-        tradeSeriesCurve = mpatches.Patch(color = 'C0', alpha = 0.8, label = 'Trade Series')
-        plt.legend(handles = [underlyingCurve, tradeSeriesCurve], loc = 'lower left')
-        ax1.minorticks_on()
-        ax1.grid(which = 'both', linestyle = '-', linewidth = '1', color = 'dimgrey')
-        ax1.grid(which = 'minor', linestyle = ':', linewidth = '1', color = 'grey')
-        plt.pause(0.01)
-          
-        
+
+        with instrumentedStage(self._instrumentation, 'plotData'):
+            figureData = drawdownData(self, downsampling, maximumPoints)
+        with instrumentedStage(self._instrumentation, 'plotRender'):
+            fig = renderDrawdown(figureData)
+            if show:
+                plt.pause(0.01)
+
+        return (fig)
+
+
+    def exportPlots(self,
+                    directory: str,
+                    **exportOptions) -> list[str]:
+
+        '''Writes the plots to directory without a display. See the module function exportPlots() for the options.'''
+
+        return (exportPlots(self, directory, **exportOptions))
+
+
 #backtest = BacktestPlotter(['SPY'], '45min', 390)
 #backtest.plotIndividualTrades()
 #backtest.cumulativeSeriesPlot()
@@ -0,0 +1,328 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+import numpy as np
+import asyncio
+import json
+import os
+import time
+from backtestData import DataSource, columnNames
+
+retriedStatusCodes = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+
+    '''
+    Paces requests to a rate limit. The bucket holds up to capacity tokens and refills at rate tokens per second, and every request takes
+    one token, waiting for it if the bucket is empty. Bursts of up to capacity requests therefore go out at once, and longer runs settle at
+    the rate. Shared by every request of an AsyncPrefetcher, so concurrent requests are paced together.
+
+    Parameters
+    ----------
+    rate : float
+        the number of tokens added per second.
+    capacity : float
+        the largest number of tokens the bucket holds. The bucket starts full.
+    '''
+
+    def __init__(self,
+                 rate: float,
+                 capacity: float) -> None:
+
+        if (rate <= 0) or (capacity < 1):
+            raise ValueError('rate must be greater than 0 and capacity at least 1')
+
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updatedAt = time.monotonic()
+        self._resumeAt = 0.0
+        self._lock = None
+        self._lockLoop = None
+
+
+    def __repr__(self) -> str:
+
+        return ('TokenBucket(rate = ' + repr(self._rate) + ', capacity = ' + repr(self._capacity) + ')')
+
+
+    def refill(self) -> None:
+
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updatedAt) * self._rate)
+        self._updatedAt = now
+
+
+    def defer(self,
+              seconds: float) -> None:
+
+        '''Holds every request back for the given number of seconds, e.g. after the server answers that the rate limit was exceeded.'''
+
+        self._resumeAt = max(self._resumeAt, time.monotonic() + seconds)
+        self._tokens = 0.0
+        self._updatedAt = max(self._updatedAt, self._resumeAt)
+
+
+    async def acquire(self) -> None:
+
+        '''Waits until a token is available and takes it. Waiting requests are served in the order they arrived.'''
+
+        if (self._lockLoop is not asyncio.get_running_loop()):
+            self._lock = asyncio.Lock() # A lock belongs to one event loop, and each prefetch() runs its own
+            self._lockLoop = asyncio.get_running_loop()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if (now < self._resumeAt):
+                    await asyncio.sleep(self._resumeAt - now)
+                    continue
+                self.refill()
+                if (self._tokens >= 1):
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class AsyncPrefetcher(DataSource):
+
+    '''
+    Fetches the bars for many (tickerSymbol, tickInterval, numberOfUnits) requests concurrently from the Twelve Data time series endpoint,
+    so that loading a universe of tickers takes about as long as its slowest requests rather than the sum of all of them. Requests run on an
+    asyncio event loop, at most maxConcurrency at a time, paced by a TokenBucket to stay within the API's rate limit, and are retried with
+    exponential backoff when the server is rate limited, unavailable or unreachable.
+
+    Call prefetch() with every request up front, then pass the prefetcher to BacktestDriver as its dataSource. The driver is served from
+    the prefetched bars, and any request that was not prefetched is fetched on demand. It can also be wrapped in a CachedDataSource. As with
+    TwelveDataSource, the series of several tickers fetched together are matched on their dates, keeping only the bars they all have.
+
+    Parameters
+    ----------
+    apiKey : str, optional
+        the Twelve Data API key. Defaults to the key claydates reads, from the key.txt file in its datasets folder.
+    baseUrl : str
+        the address of the API, e.g. that of a local server in tests.
+    maxConcurrency : int
+        the largest number of requests in flight at once.
+    requestsPerMinute : float
+        the sustained request rate that the token bucket allows. The default is the limit of Twelve Data's free plan.
+    burst : int, optional
+        the number of requests that may be sent at once before the pacing starts. Defaults to requestsPerMinute.
+    maxRetries : int
+        the number of times a failed request is retried before the prefetch gives up.
+    retryDelay : float
+        the wait in seconds before the first retry, doubling with each further retry. A Retry-After header from the server takes precedence.
+    timeout : float
+        the number of seconds to wait for each response.
+    timeZone : str
+        the time zone the API reports dates in, as claydates requests them.
+    '''
+
+    def __init__(self,
+                 apiKey: str = None,
+                 baseUrl: str = 'https://api.twelvedata.com',
+                 maxConcurrency: int = 8,
+                 requestsPerMinute: float = 8.0,
+                 burst: int = None,
+                 maxRetries: int = 3,
+                 retryDelay: float = 1.0,
+                 timeout: float = 30.0,
+                 timeZone: str = 'America/New_York') -> None:
+
+        if (maxConcurrency < 1):
+            raise ValueError('maxConcurrency must be at least 1')
+
+        self._apiKey = apiKey
+        self._baseUrl = baseUrl.rstrip('/')
+        self._maxConcurrency = maxConcurrency
+        self._tokenBucket = TokenBucket(requestsPerMinute / 60, burst if (burst is not None) else requestsPerMinute)
+        self._maxRetries = maxRetries
+        self._retryDelay = retryDelay
+        self._timeout = timeout
+        self._timeZone = timeZone
+        self._prefetched = {}
+        self._requestCount = 0
+
+
+    def __repr__(self) -> str:
+
+        return ('AsyncPrefetcher(baseUrl = ' + repr(self._baseUrl) + ', maxConcurrency = ' + repr(self._maxConcurrency) + ', ' + repr(self._tokenBucket) + ')')
+
+
+    def apiKey(self) -> str:
+
+        if (self._apiKey is None):
+            import claydates
+            with open(os.path.join(os.path.dirname(claydates.__file__), 'datasets', 'key.txt')) as keyFile:
+                self._apiKey = keyFile.read().strip()
+
+        return (self._apiKey)
+
+
+    def requestUrl(self,
+                   tickerSymbol: str,
+                   tickInterval: str,
+                   numberOfUnits: int) -> str:
+
+        return (self._baseUrl + '/time_series?' + urlencode({'symbol': tickerSymbol, 'interval': tickInterval, 'outputsize': numberOfUnits,
+                                                              'timezone': self._timeZone, 'apikey': self.apiKey()}))
+
+
+    @staticmethod
+    def parseResponse(payload: dict) -> np.ndarray:
+
+        '''
+        Converts a time series response, whose values run from the most recent bar back, into a float64 array of shape (bars, 6) laid out
+        as DataSource.fetch() returns them, oldest bar first. Series without volume, such as currency pairs, get a NaN volume column.
+        '''
+
+        values = payload.get('values', [])
+        bars = np.full((len(values), len(columnNames)), np.nan, dtype = np.float64)
+        if (len(values) == 0):
+            return (bars)
+        values = values[::-1]
+        bars[:, 0] = np.array([i['datetime'] for i in values], dtype = 'datetime64[s]').astype(np.int64)
+        for i, j in enumerate(columnNames[1:], start = 1):
+            if (j in values[0]):
+                bars[:, i] = [float(k[j]) for k in values] # Prices arrive as strings. Several times faster than going through a DataFrame
+
+        return (bars)
+
+
+    def retryWait(self,
+                  attempt: int,
+                  retryAfter: str = None) -> float:
+
+        if (retryAfter is not None):
+            try:
+                return (float(retryAfter))
+            except ValueError:
+                pass
+
+        return (self._retryDelay * 2 ** attempt)
+
+
+    def requestBars(self,
+                    url: str) -> tuple[int, dict, str]:
+
+        '''Sends one blocking request and returns the HTTP status, the decoded body (or None) and the Retry-After header (or None).'''
+
+        try:
+            with urlopen(url, timeout = self._timeout) as response:
+                return (response.status, json.load(response), response.headers.get('Retry-After'))
+        except HTTPError as error:
+            return (error.code, None, error.headers.get('Retry-After') if (error.headers is not None) else None)
+
+
+    async def fetchOneAsync(self,
+                            tickerSymbol: str,
+                            tickInterval: str,
+                            numberOfUnits: int,
+                            executor: ThreadPoolExecutor,
+                            semaphore: asyncio.Semaphore) -> np.ndarray:
+
+        url = self.requestUrl(tickerSymbol, tickInterval, numberOfUnits)
+        description = tickerSymbol + ' at ' + tickInterval
+        loop = asyncio.get_running_loop()
+        for attempt in range(self._maxRetries + 1):
+            async with semaphore:
+                await self._tokenBucket.acquire()
+                self._requestCount += 1
+                try:
+                    status, payload, retryAfter = await loop.run_in_executor(executor, self.requestBars, url)
+                except (URLError, TimeoutError, ConnectionError) as error:
+                    status, payload, retryAfter = None, None, None
+                    failure = str(error)
+
+            # Twelve Data also reports errors, the rate limit among them, with status 200 and the error code in the body.
+            if (payload is not None) and (payload.get('status') == 'error'):
+                status = int(payload.get('code', 400))
+            if (status == 200):
+                return (self.parseResponse(payload))
+            if (status is not None):
+                failure = 'HTTP ' + str(status) + ((': ' + payload['message']) if (payload is not None) and ('message' in payload) else '')
+                if (status not in retriedStatusCodes):
+                    raise LookupError('The request for ' + description + ' failed with ' + failure)
+            if (attempt < self._maxRetries):
+                wait = self.retryWait(attempt, retryAfter)
+                if (status == 429):
+                    self._tokenBucket.defer(wait) # The other requests would be refused too until the limit resets
+                await asyncio.sleep(wait)
+
+        raise ConnectionError('The request for ' + description + ' failed after ' + str(self._maxRetries + 1) + ' attempts, last with ' + failure)
+
+
+    async def prefetchAsync(self,
+                            requests: list[tuple[str, str, int]]) -> dict[tuple[str, str, int], np.ndarray]:
+
+        '''The coroutine behind prefetch(), for callers that already run an event loop.'''
+
+        requests = list(dict.fromkeys(tuple(i) for i in requests))
+        semaphore = asyncio.Semaphore(self._maxConcurrency)
+        with ThreadPoolExecutor(max_workers = self._maxConcurrency) as executor:
+            results = await asyncio.gather(*[self.fetchOneAsync(*i, executor, semaphore) for i in requests], return_exceptions = True)
+        self._prefetched.update({i: j for i, j in zip(requests, results) if not isinstance(j, BaseException)})
+        for i in results:
+            if isinstance(i, BaseException):
+                raise i
+
+        return ({i: self._prefetched[i] for i in requests})
+
+
+    def prefetch(self,
+                 requests: list[tuple[str, str, int]]) -> dict[tuple[str, str, int], np.ndarray]:
+
+        '''
+        Fetches every (tickerSymbol, tickInterval, numberOfUnits) request concurrently and keeps the bars for fetch(). Returns the bars of each
+        request. Every request is attempted even when some fail, and the bars that did arrive are kept, before the first failure is raised.
+        Called from inside a running event loop, e.g. in a notebook, the requests run on their own loop in a worker thread, and the caller's
+        loop is blocked until they finish. Coroutines can await prefetchAsync() instead.
+        '''
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return (asyncio.run(self.prefetchAsync(requests)))
+        with ThreadPoolExecutor(max_workers = 1) as executor:
+            return (executor.submit(asyncio.run, self.prefetchAsync(requests)).result()) # asyncio.run() refuses to start inside a running loop
+
+
+    def fetch(self,
+              tickerSymbols: list[str],
+              tickInterval: str,
+              numberOfUnits: int) -> list[np.ndarray]:
+
+        missingRequests = [(i, tickInterval, numberOfUnits) for i in tickerSymbols if (i, tickInterval, numberOfUnits) not in self._prefetched]
+        if missingRequests:
+            self.prefetch(missingRequests)
+
+        return (self.matchDates([self._prefetched[(i, tickInterval, numberOfUnits)] for i in tickerSymbols]))
+
+
+    @staticmethod
+    def matchDates(allBars: list[np.ndarray]) -> list[np.ndarray]:
+
+        '''Keeps only the bars whose date is in every series, as claydates does for several tickers, so that the series line up bar for bar.'''
+
+        if (len(allBars) < 2):
+            return (allBars)
+        commonDates = allBars[0][:, 0]
+        for i in allBars[1:]:
+            commonDates = np.intersect1d(commonDates, i[:, 0])
+
+        return ([i if (len(i) == len(commonDates)) else i[np.isin(i[:, 0], commonDates)] for i in allBars])
+
+
+    def requestCount(self) -> int:
+
+        '''Returns the number of requests sent so far, retries included.'''
+
+        return (self._requestCount)
+
+
+    def clear(self) -> None:
+
+        '''Drops every prefetched series.'''
+
+        self._prefetched = {}
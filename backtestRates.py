@@ -0,0 +1,235 @@
+from urllib.request import urlopen
+import pandas as pd
+import numpy as np
+import os
+
+defaultRateTablePath = os.path.join(os.path.expanduser('~'), '.backtestingPlatform', 'tenYearTreasuryRates.csv')
+
+
+class TreasuryRateFetcher:
+
+    '''
+    Fetches the daily ten year par yield from the Treasury's yield curve page, one month per request. Requires BeautifulSoup.
+    Only used to populate a local rate table, so that backtests never wait on the network once the table covers their dates.
+    '''
+
+    URL = 'https://home.treasury.gov/resource-center/data-chart-center/interest-rates/TextView?type=daily_treasury_yield_curve&field_tdr_date_value_month='
+
+    def fetchMonth(self,
+                   month: pd.Period) -> pd.DataFrame:
+
+        '''Returns the Date and Rate (in percent) of every trading day in a month.'''
+
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(urlopen(self.URL + month.strftime('%Y%m')).read(), 'html.parser')
+        table = soup.find('table')
+        headers = [i.text.strip() for i in table.find_all('th')]
+        tenYearColumn = headers.index('10 Yr') if ('10 Yr' in headers) else 17
+        rows = []
+        for parYieldCurveRate in table.find_all('tr'):
+            cells = [i.text.strip() for i in parYieldCurveRate.find_all('td')]
+            if (len(cells) > tenYearColumn) and (cells[tenYearColumn] not in ('', 'N/A')):
+                rows.append((pd.Timestamp(cells[0]), float(cells[tenYearColumn])))
+
+        return (pd.DataFrame(rows, columns = ['Date', 'Rate']))
+
+
+class RateProvider:
+
+    '''Interface for anything that can supply the annual risk-free rate, as a fraction, on given dates.'''
+
+    def alignedRates(self,
+                     dates: np.ndarray) -> np.ndarray:
+
+        raise NotImplementedError
+
+
+class ConstantRateProvider(RateProvider):
+
+    '''Supplies the same annual rate on every date. Useful for reproducible comparisons and when no rate table is available.'''
+
+    def __init__(self,
+                 rate: float) -> None:
+
+        self._rate = rate
+
+
+    def alignedRates(self,
+                     dates: np.ndarray) -> np.ndarray:
+
+        return (np.full(len(dates), self._rate, dtype = np.float64))
+
+
+class TableRateProvider(RateProvider):
+
+    '''
+    Supplies rates from a local, date-indexed table stored as CSV or Parquet with the columns Date and Rate, where Rate is in percent.
+    Each date takes the most recent rate published on or before it. When a fetcher is given, months that the table does not cover are
+    fetched and merged into the table, including a month that was only partly published when it was last fetched.
+
+    Parameters
+    ----------
+    tablePath : str
+        the CSV or Parquet file that holds the table.
+    fetcher : TreasuryRateFetcher, optional
+        used to fill in missing months. Without it, the table is only read.
+    offline : bool
+        when True, the fetcher is never called.
+    '''
+
+    def __init__(self,
+                 tablePath: str = defaultRateTablePath,
+                 fetcher: TreasuryRateFetcher = None,
+                 offline: bool = False) -> None:
+
+        self._tablePath = tablePath
+        self._fetcher = fetcher
+        self._offline = offline
+        self._dates = None
+        self._rates = None
+        self._memo = {}
+        self._fetchedOn = {}
+
+
+    def loadTable(self) -> pd.DataFrame:
+
+        if not os.path.exists(self._tablePath):
+            return (pd.DataFrame({'Date': pd.Series(dtype = 'datetime64[ns]'), 'Rate': pd.Series(dtype = np.float64)}))
+        if self._tablePath.endswith('.parquet'):
+            table = pd.read_parquet(self._tablePath)
+        else:
+            table = pd.read_csv(self._tablePath, parse_dates = ['Date'])
+
+        return (table)
+
+
+    def storeTable(self,
+                   table: pd.DataFrame) -> None:
+
+        os.makedirs(os.path.dirname(os.path.abspath(self._tablePath)), exist_ok = True)
+        if self._tablePath.endswith('.parquet'):
+            table.to_parquet(self._tablePath, index = False)
+        else:
+            table.to_csv(self._tablePath, index = False)
+
+
+    def setTable(self,
+                 table: pd.DataFrame) -> None:
+
+        table = table.drop_duplicates('Date', keep = 'last').sort_values('Date')
+        self._dates = table['Date'].to_numpy(dtype = 'datetime64[ns]')
+        self._rates = table['Rate'].to_numpy(dtype = np.float64) / 100
+        self._memo = {}
+
+
+    def ensureCoverage(self,
+                       firstDate: np.datetime64,
+                       lastDate: np.datetime64) -> None:
+
+        '''
+        Loads the table, and fetches and stores the months between firstDate and lastDate that it does not cover yet. A month is covered
+        when the table holds it up to lastDate, or up to its last business day or today if either comes first. A month that was stored
+        while it was still running is therefore fetched again once later dates are needed. Each month is fetched at most once a day.
+        '''
+
+        if (self._dates is None):
+            self.setTable(self.loadTable())
+        if (self._fetcher is None) or self._offline:
+            return
+        today = self.today()
+        storedDates = pd.DatetimeIndex(self._dates)
+        lastStoredDates = pd.Series(storedDates, index = storedDates.to_period('M')).groupby(level = 0).max()
+        missingMonths = []
+        for i in pd.period_range(pd.Timestamp(firstDate), pd.Timestamp(lastDate), freq = 'M'):
+            lastNeededDate = min(pd.Timestamp(lastDate).normalize(), pd.offsets.BMonthEnd().rollforward(i.start_time), today)
+            if (lastNeededDate < i.start_time) or (self._fetchedOn.get(i) == today):
+                continue
+            if (i not in lastStoredDates.index) or (lastStoredDates[i] < lastNeededDate):
+                missingMonths.append(i)
+                self._fetchedOn[i] = today
+        if missingMonths:
+            table = pd.concat([self.loadTable()] + [self._fetcher.fetchMonth(i) for i in missingMonths], ignore_index = True)
+            self.storeTable(table.drop_duplicates('Date', keep = 'last').sort_values('Date'))
+            self.setTable(table)
+
+
+    @staticmethod
+    def today() -> pd.Timestamp:
+
+        return (pd.Timestamp.today().normalize())
+
+
+    def rateOn(self,
+               date: np.datetime64) -> float:
+
+        '''
+        Returns the rate in effect on a single date. Lookups are memoized by day, for days that the table covers. A later day takes the
+        last rate in the table for now, and is looked up again on the next call, so that it picks up the table once it has been topped up.
+        '''
+
+        day = np.datetime64(date, 'D')
+        if (day in self._memo):
+            return (self._memo[day])
+        rate = float(self.alignedRates(np.array([day]))[0])
+        if (day <= self._dates[-1]):
+            self._memo[day] = rate
+
+        return (rate)
+
+
+    def alignedRates(self,
+                     dates: np.ndarray) -> np.ndarray:
+
+        '''Returns the rate in effect on each date, as an annual fraction. Dates before the first entry take the first rate.'''
+
+        dates = np.asarray(dates, dtype = 'datetime64[ns]')
+        if (len(dates) == 0):
+            return (np.empty(0, dtype = np.float64))
+        self.ensureCoverage(dates.min(), dates.max())
+        if (len(self._dates) == 0):
+            raise LookupError('The rate table at ' + self._tablePath + ' is empty and no fetcher is available to populate it.')
+
+        return (self._rates[np.maximum(np.searchsorted(self._dates, dates, side = 'right') - 1, 0)])
+
+
+def defaultRateProvider(tablePath: str = defaultRateTablePath) -> RateProvider:
+
+    '''
+    Returns the rate provider that metrics use when none is given: the local table at tablePath, read only, when it exists, and a zero rate
+    otherwise. Never touches the network. Populate the table with TableRateProvider(fetcher = TreasuryRateFetcher()).
+    '''
+
+    if os.path.exists(tablePath):
+        return (TableRateProvider(tablePath))
+
+    return (ConstantRateProvider(0.0))
+
+
+def periodRiskFreeReturn(dates: np.ndarray,
+                         annualRates: np.ndarray) -> float:
+
+    '''
+    Compounds per-bar annual rates into the risk-free return earned between the first and the last date. Each gap between
+    consecutive bars accrues at the rate in effect at the start of the gap, for exactly the length of that gap.
+    '''
+
+    gapsInYears = np.diff(np.asarray(dates, dtype = 'datetime64[ns]')) / np.timedelta64(1, 'D') / 365.25
+
+    return (float(np.expm1(np.sum(np.log1p(annualRates[:-1]) * gapsInYears))))
+
+
+def annualRiskFreeRate(dates: np.ndarray,
+                       rateProvider: RateProvider) -> float:
+
+    '''
+    Returns the constant annual rate, as a fraction, that compounds to the same return as periodRiskFreeReturn() between the first and the
+    last date. When the dates span no time, returns the rate on the first date.
+    '''
+
+    dates = np.asarray(dates, dtype = 'datetime64[ns]')
+    years = (dates[-1] - dates[0]) / np.timedelta64(1, 'D') / 365.25
+    if (years <= 0):
+        return (float(rateProvider.alignedRates(dates[:1])[0]))
+
+    return ((1 + periodRiskFreeReturn(dates, rateProvider.alignedRates(dates))) ** (1 / years) - 1)
@@ -0,0 +1,183 @@
+import numpy as np
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+statisticNames = ('count', 'totalReturn', 'meanReturn', 'standardDeviation', 'downsideDeviation', 'winRate', 'profitFactor', 'maximumDrawdown')
+
+
+def asReturnMatrix(returnSeries: np.ndarray | list[np.ndarray]) -> np.ndarray:
+
+    '''
+    Returns the input as a float64 array of shape (series, periods). A 1-D array becomes a single row, and a list of arrays of
+    different lengths is padded at the end with NaN, which every statistic in this module skips.
+    '''
+
+    if isinstance(returnSeries, np.ndarray):
+        return (np.atleast_2d(np.asarray(returnSeries, dtype = np.float64)))
+    returnMatrix = np.full((len(returnSeries), max([len(i) for i in returnSeries], default = 0)), np.nan, dtype = np.float64)
+    for i, j in enumerate(returnSeries):
+        returnMatrix[i, :len(j)] = j
+
+    return (returnMatrix)
+
+
+def statisticsLoop(returnMatrix: np.ndarray,
+                   riskFreeReturns: np.ndarray) -> np.ndarray:
+
+    '''
+    Computes every statistic in statisticNames for each row in a single pass over the returns, written so that numba can compile it.
+    Welford's method is used for the mean and variance. riskFreeReturns holds the risk-free return per period for each row.
+    '''
+
+    statistics = np.full((returnMatrix.shape[0], len(statisticNames)), np.nan)
+    for row in range(returnMatrix.shape[0]):
+        count = 0
+        mean = 0.0
+        sumOfSquares = 0.0
+        downsideSumOfSquares = 0.0
+        wins = 0
+        grossProfit = 0.0
+        grossLoss = 0.0
+        equity = 1.0
+        peak = 1.0
+        maximumDrawdown = 0.0
+        for i in range(returnMatrix.shape[1]):
+            periodReturn = returnMatrix[row, i]
+            if np.isnan(periodReturn):
+                continue
+            count += 1
+            delta = periodReturn - mean
+            mean += delta / count
+            sumOfSquares += delta * (periodReturn - mean)
+            excessReturn = periodReturn - riskFreeReturns[row]
+            if (excessReturn < 0):
+                downsideSumOfSquares += excessReturn * excessReturn
+            if (periodReturn > 0):
+                wins += 1
+                grossProfit += periodReturn
+            else:
+                grossLoss -= periodReturn
+            equity *= 1 + periodReturn
+            peak = max(peak, equity)
+            maximumDrawdown = min(maximumDrawdown, (equity - peak) / peak)
+
+        statistics[row, 0] = count
+        statistics[row, 1] = equity - 1
+        statistics[row, 7] = maximumDrawdown
+        if (count > 0):
+            statistics[row, 2] = mean
+            statistics[row, 4] = np.sqrt(downsideSumOfSquares / count)
+            statistics[row, 5] = wins / count
+            statistics[row, 6] = (grossProfit / grossLoss) if (grossLoss > 0) else np.inf
+        if (count > 1):
+            statistics[row, 3] = np.sqrt(sumOfSquares / (count - 1))
+
+    return (statistics)
+
+
+def statisticsNumpy(returnMatrix: np.ndarray,
+                    riskFreeReturns: np.ndarray) -> np.ndarray:
+
+    '''Pure NumPy implementation of statisticsLoop(), used when numba is not installed.'''
+
+    isReturn = ~np.isnan(returnMatrix)
+    count = isReturn.sum(axis = 1)
+    safeCount = np.where(count > 0, count, np.nan)
+    filledReturns = np.where(isReturn, returnMatrix, 0.0)
+    mean = filledReturns.sum(axis = 1) / safeCount
+    deviations = np.where(isReturn, returnMatrix - mean[:, np.newaxis], 0.0)
+    excessReturns = np.where(isReturn, np.minimum(returnMatrix - riskFreeReturns[:, np.newaxis], 0.0), 0.0)
+    grossLoss = -np.where(filledReturns > 0, 0.0, filledReturns).sum(axis = 1)
+    grossProfit = np.where(filledReturns > 0, filledReturns, 0.0).sum(axis = 1)
+
+    equityCurve = np.cumprod(1 + filledReturns, axis = 1)
+    peaks = np.maximum(np.maximum.accumulate(equityCurve, axis = 1), 1.0)
+
+    statistics = np.empty((returnMatrix.shape[0], len(statisticNames)))
+    statistics[:, 0] = count
+    statistics[:, 1] = (equityCurve[:, -1] - 1) if (returnMatrix.shape[1] > 0) else 0.0
+    statistics[:, 2] = mean
+    statistics[:, 3] = np.sqrt((deviations ** 2).sum(axis = 1) / np.where(count > 1, count - 1, np.nan))
+    statistics[:, 4] = np.sqrt((excessReturns ** 2).sum(axis = 1) / safeCount)
+    statistics[:, 5] = (filledReturns > 0).sum(axis = 1) / safeCount
+    statistics[:, 6] = np.where(grossLoss > 0, grossProfit / np.where(grossLoss > 0, grossLoss, 1.0), np.where(count > 0, np.inf, np.nan))
+    statistics[:, 7] = np.minimum(((equityCurve - peaks) / peaks).min(axis = 1, initial = 0.0), 0.0)
+
+    return (statistics)
+
+
+if (njit is not None):
+    statisticsCompiled = njit(cache = True)(statisticsLoop)
+else:
+    statisticsCompiled = None
+
+
+def returnStatistics(returnSeries: np.ndarray | list[np.ndarray],
+                     years: float | np.ndarray,
+                     riskFreeRate: float = 0.0) -> dict[str, np.ndarray]:
+
+    '''
+    Computes performance statistics for one or many return series at once. Returns a dictionary of arrays with one value per series.
+    Along with the names in statisticNames, the result holds 'periodsPerYear', 'compoundAnnualGrowthRate', 'sharpeRatio' and 'sortinoRatio'.
+
+    Parameters
+    ----------
+    returnSeries : np.ndarray | list[np.ndarray]
+        simple returns per period, either trade by trade or bar by bar. Accepts a 1-D array, a 2-D array with one series per row
+        (NaN entries are skipped), or a list of arrays of different lengths.
+    years : float | np.ndarray
+        the length of time covered by each series, in years. Used to annualize the ratios and the growth rate.
+    riskFreeRate : float | np.ndarray
+        the annual risk-free rate as a fraction, e.g. 0.04 for 4%.
+    '''
+
+    returnMatrix = asReturnMatrix(returnSeries)
+    years = np.broadcast_to(np.asarray(years, dtype = np.float64), (returnMatrix.shape[0],))
+    count = (~np.isnan(returnMatrix)).sum(axis = 1)
+    periodsPerYear = count / years
+    riskFreeReturns = np.power(1 + np.broadcast_to(np.asarray(riskFreeRate, dtype = np.float64), years.shape), 1 / np.where(periodsPerYear > 0, periodsPerYear, np.nan)) - 1
+    riskFreeReturns = np.nan_to_num(riskFreeReturns)
+
+    if (statisticsCompiled is not None):
+        statistics = statisticsCompiled(np.ascontiguousarray(returnMatrix), riskFreeReturns)
+    else:
+        statistics = statisticsNumpy(returnMatrix, riskFreeReturns)
+
+    results = {j: statistics[:, i] for i, j in enumerate(statisticNames)}
+    results['periodsPerYear'] = periodsPerYear
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        results['compoundAnnualGrowthRate'] = np.power(1 + results['totalReturn'], 1 / years) - 1
+        results['sharpeRatio'] = (results['meanReturn'] - riskFreeReturns) / results['standardDeviation'] * np.sqrt(periodsPerYear)
+        results['sortinoRatio'] = (results['meanReturn'] - riskFreeReturns) / results['downsideDeviation'] * np.sqrt(periodsPerYear)
+
+    return (results)
+
+
+def holdingStatistics(holdingPeriods: np.ndarray | list[np.ndarray],
+                      numberOfBars: int | np.ndarray) -> dict[str, np.ndarray]:
+
+    '''Returns the share of bars spent in a trade ('exposure') and the 'averageHoldingPeriod', in bars, for one or many sets of holding periods.'''
+
+    holdingMatrix = asReturnMatrix(holdingPeriods)
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        return ({'exposure': np.nansum(holdingMatrix, axis = 1) / numberOfBars,
+                 'averageHoldingPeriod': np.nansum(holdingMatrix, axis = 1) / (~np.isnan(holdingMatrix)).sum(axis = 1)})
+
+
+def tradeStatistics(returnSeries: np.ndarray | list[np.ndarray],
+                    holdingPeriods: np.ndarray | list[np.ndarray],
+                    numberOfBars: int | np.ndarray,
+                    years: float | np.ndarray,
+                    riskFreeRate: float | np.ndarray = 0.0) -> dict[str, np.ndarray]:
+
+    '''
+    Combines returnStatistics() and holdingStatistics() into one dictionary. Shared by BacktestMetrics.statistics() and
+    backtestSweep.summarizeBacktest(), so that both report the same numbers for the same backtest.
+    '''
+
+    statistics = returnStatistics(returnSeries, years, riskFreeRate)
+    statistics.update(holdingStatistics(holdingPeriods, numberOfBars))
+
+    return (statistics)
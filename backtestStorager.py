@@ -1,4 +1,38 @@
 from backtestMetrics import BacktestMetrics
+from contextlib import closing
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from backtestData import DataSource, barsToArray
+from backtestRates import RateProvider
+from backtestExecution import ExecutionModel
+from backtestInstrumentation import Instrumentation, instrumented
+from backtestStrategy import Strategy
+
+
+def loadMetrics(storageDirectory: str = 'backtests',
+                condition: str = None,
+                parameters: tuple = ()) -> pd.DataFrame:
+
+    '''
+    Reads the metrics of every stored run from the run index, without opening any run folder.
+
+    Parameters
+    ----------
+    storageDirectory : str
+        the directory that the runs were stored in.
+    condition : str, optional
+        an SQL condition to filter runs by, e.g. 'sharpeRatio > ? AND tickInterval = ?'.
+    parameters : tuple
+        the values for any placeholders in condition.
+    '''
+
+    with closing(sqlite3.connect(os.path.join(storageDirectory, 'runs.sqlite'))) as connection:
+        return (pd.read_sql_query('SELECT * FROM metrics' + ((' WHERE ' + condition) if condition else ''), connection, params = parameters))
 
 
 class BacktestStorager(BacktestMetrics):
@@ -14,54 +48,190 @@ class BacktestStorager(BacktestMetrics):
         the interval of time between each data point. Options are: '1min', '5min', '15min', '30min', '45min', '1h', '2h', '4h', '8h', '1day', '1week', and '1month'
     numberOfUnits : int
         the number of units of data to request from the API.
+    assetTimeSeries : np.ndarray | list[np.ndarray], optional
+        an array of bars laid out as [Date, Open, High, Low, Close, Volume], or one such array per ticker symbol. When given, the API is not called and these series are backtested instead.
+    executionMode : str
+        how the position states are computed. Options are: 'compiled' and 'python'.
+    dataSource : DataSource, optional
+        where the bars are fetched from when assetTimeSeries is not given. Defaults to the Twelve Data API.
+    strategy : Strategy, optional
+        the strategy to backtest. Defaults to backtestStrategy.RollingMinimumStrategy.
+    executionModel : ExecutionModel, optional
+        the commissions, slippage, fill prices and position size applied to the trades. Defaults to frictionless fills at the close.
+    rateProvider : RateProvider, optional
+        supplies the risk-free rate for each bar. Defaults to backtestRates.defaultRateProvider().
+    storageDirectory : str
+        the directory that holds the run store. Each run gets a folder under runs/, identical underlying series are stored once under
+        series/, and the metrics of every run are appended to the index runs.sqlite.
+    instrumentation : Instrumentation, optional
+        records the time, CPU time, call count and, optionally, peak memory of each stage of the backtest, including the storing itself.
+        The report is written to the run folder as instrumentation.json. See backtestInstrumentation.
     '''
 
     def __init__(self, 
                  tickerSymbols: list[str],
                  tickInterval: int,
-                 numberOfUnits: int) -> None:
+                 numberOfUnits: int,
+                 assetTimeSeries: np.ndarray = None,
+                 executionMode: str = 'compiled',
+                 dataSource: DataSource = None,
+                 strategy: Strategy = None,
+                 executionModel: ExecutionModel = None,
+                 rateProvider: RateProvider = None,
+                 storageDirectory: str = 'backtests',
+                 instrumentation: Instrumentation = None) -> None:
     
         self._tickerSymbols = tickerSymbols
         self._tickInterval = tickInterval
         self._numberOfUnits = numberOfUnits
 
-        super().__init__(tickerSymbols, tickInterval, numberOfUnits)
+        super().__init__(tickerSymbols, tickInterval, numberOfUnits, assetTimeSeries = assetTimeSeries, executionMode = executionMode, dataSource = dataSource,
+                         strategy = strategy, executionModel = executionModel, rateProvider = rateProvider, instrumentation = instrumentation)
+        self._storageDirectory = storageDirectory
 
         self.createFolderForBacktest()
-        #put something here to let the next few method calls in the initializer (next few lines) know where the folder that was just created is.
         self.storeTradeSeries()
         self.storeUnderlyingSeries()
         self.storeMetrics()
         self.storePlots()
+        self.storeInstrumentation()
 
     def createFolderForBacktest(self) -> None:
 
         '''Creates a directory or subdirectory somewhere so that data can be stored there. Uses self._backtestID for the name of the folder.'''
-        pass
 
+        self._backtestFolder = os.path.join(self._storageDirectory, 'runs', self._backtestID)
+        os.makedirs(self._backtestFolder, exist_ok = True)
+        with open(os.path.join(self._backtestFolder, 'run.json'), 'w') as runFile:
+            json.dump({'backtestID': self._backtestID,
+                       'createdAt': time.time(),
+                       'tickerSymbols': list(self._tickerSymbols),
+                       'tickInterval': self._tickInterval,
+                       'numberOfUnits': self._numberOfUnits,
+                       'strategy': type(self._strategy).__name__,
+                       'strategyParameters': self._strategyParameters,
+                       'executionModel': self._executionModel.parameters() if (self._executionModel is not None) else None,
+                       'seriesHash': self.seriesHash(),
+                       'seriesHashes': dict(zip(self._tickerSymbols, self.seriesHashes()))}, runFile)
+
+
+    def seriesHashes(self) -> list[str]:
+
+        '''Returns a SHA-256 hash of the bars of each ticker symbol, used to store each distinct series only once.'''
+
+        def computeSeriesHashes() -> list[str]:
+            hashes = []
+            for i in self._allAssetTimeSeries:
+                bars = i if (isinstance(i, np.ndarray) and (i.dtype == np.float64)) else barsToArray(i)
+                hashes.append(hashlib.sha256(np.ascontiguousarray(bars).tobytes() + str(bars.shape).encode()).hexdigest())
+            return (hashes)
+
+        return (self.cachedResult('seriesHashes', computeSeriesHashes))
+
+
+    def seriesHash(self) -> str:
 
+        '''
+        Returns one hash for all of the bars that the backtest ran over. With a single ticker symbol, this is the hash of its series, and with
+        several, the hash of their hashes in order. Indexed in the metrics table, so that runs over the same data can be found together.
+        '''
+
+        seriesHashes = self.seriesHashes()
+        if (len(seriesHashes) == 1):
+            return (seriesHashes[0])
+
+        return (hashlib.sha256(','.join(seriesHashes).encode()).hexdigest())
+
+
+    @instrumented
     def storeTradeSeries(self) -> None:
 
-        '''Stores the trade series that was generated when the backtest ran.'''
-        pass
+        '''
+        Stores the trades of every ticker symbol in tradeSeries.npz, as one set of arrays per ticker named '<ticker>/<field>', e.g. 'SPY/openIndex'.
+        The fields are openIndex and closeIndex, the bars of the opening and closing orders, tradeReturn, the return of each trade net of
+        costs, equityReturn, the change in equity over each trade, which includes the position size, and holdingPeriod, in bars.
+        '''
 
+        tradeSeries = {}
+        for i, j in self.tickerTradeResults().items():
+            tradeSeries.update({i + '/openIndex': j['orderIndices'][0::2],
+                                i + '/closeIndex': j['orderIndices'][1::2],
+                                i + '/tradeReturn': j['profitLossForTrades'],
+                                i + '/equityReturn': np.asarray(j['equityReturns'], dtype = np.float64),
+                                i + '/holdingPeriod': j['holdingPeriods']})
+        np.savez_compressed(os.path.join(self._backtestFolder, 'tradeSeries.npz'), **tradeSeries)
 
-    def storeUnderlyingSeries(self) -> None:
 
-        '''Stores the series of data that was used to generate the backtest.'''
-        pass
+    @instrumented
+    def storeUnderlyingSeries(self) -> None:
 
+        '''
+        Stores the series of data that was used to generate the backtest, one file per ticker symbol, named after the hash of its bars. Series
+        that are already in the store, from earlier runs, are not written again. run.json maps each ticker symbol to its file.
+        '''
 
-    def storeMetrics(self) -> None:
+        for i, j in zip(self._allAssetTimeSeries, self.seriesHashes()):
+            seriesPath = os.path.join(self._storageDirectory, 'series', j + '.npz')
+            if os.path.exists(seriesPath):
+                continue
+            os.makedirs(os.path.dirname(seriesPath), exist_ok = True)
+            bars = i if (isinstance(i, np.ndarray) and (i.dtype == np.float64)) else barsToArray(i)
+            temporaryPath = seriesPath + '.' + self._backtestID + '.npz'
+            np.savez_compressed(temporaryPath, **{k: bars[:, l] for l, k in enumerate(['date', 'open', 'high', 'low', 'close', 'volume'])})
+            os.replace(temporaryPath, seriesPath) # Concurrent runs over the same series can race here, and either copy is identical
 
-        '''Fetches the output from self.composeLog() and stores it.'''
-        pass
 
+    @instrumented
+    def storeMetrics(self) -> None:
 
+        '''Fetches the output from self.composeLog() and stores it. Every run is appended as one row of the metrics table in runs.sqlite.'''
+
+        row = {'createdAt': time.time(),
+               'tickerSymbols': ','.join(self._tickerSymbols),
+               'tickInterval': self._tickInterval,
+               'numberOfUnits': self._numberOfUnits,
+               'strategy': type(self._strategy).__name__,
+               'strategyParameters': json.dumps(self._strategyParameters, sort_keys = True),
+               'executionModel': json.dumps(self._executionModel.parameters() if (self._executionModel is not None) else None, sort_keys = True),
+               'seriesHash': self.seriesHash(),
+               'seriesHashes': ','.join(self.seriesHashes())}
+        row.update(dict(self.composeLog()))
+
+        with closing(sqlite3.connect(os.path.join(self._storageDirectory, 'runs.sqlite'), timeout = 60, isolation_level = None)) as connection:
+            connection.execute('BEGIN IMMEDIATE') # Holds the write lock from reading the schema to the insert, so concurrent runs cannot both add a column
+            try:
+                connection.execute('CREATE TABLE IF NOT EXISTS metrics (backtestID TEXT PRIMARY KEY)')
+                existingColumns = {i[1] for i in connection.execute('PRAGMA table_info(metrics)')}
+                for i, j in row.items():
+                    if (i not in existingColumns):
+                        connection.execute('ALTER TABLE metrics ADD COLUMN "' + i + '" ' + ('TEXT' if isinstance(j, str) else 'REAL'))
+                connection.execute('CREATE INDEX IF NOT EXISTS metricsBySeries ON metrics (seriesHash)')
+                connection.execute('CREATE INDEX IF NOT EXISTS metricsByTicker ON metrics (tickerSymbols, tickInterval)')
+                connection.execute('INSERT INTO metrics (' + ', '.join('"' + i + '"' for i in row) + ') VALUES (' + ', '.join('?' * len(row)) + ')', list(row.values()))
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+
+
+    @instrumented
     def storePlots(self) -> None:
         
-        '''Stores any plots that you might want to store.'''
-        pass
+        '''Stores any plots that you might want to store. Renders the three BacktestPlotter figures headlessly into the run folder as PNG files.'''
+
+        from backtestPlotter import exportPlots
+
+        exportPlots(self, self._backtestFolder)
+
+
+    def storeInstrumentation(self) -> None:
+
+        '''Writes the records of the instrumentation, when the backtest has one, to instrumentation.json in the run folder.'''
+
+        if (self._instrumentation is None):
+            return
+        with open(os.path.join(self._backtestFolder, 'instrumentation.json'), 'w') as instrumentationFile:
+            json.dump({'backtestID': self._backtestID, 'stages': self._instrumentation.records()}, instrumentationFile, indent = 1)
 
 
 #backtest = BacktestStorager(['SPY'], '45min', 390)
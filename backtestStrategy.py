@@ -0,0 +1,342 @@
+from collections.abc import Mapping
+from numpy.lib.stride_tricks import sliding_window_view
+import numpy as np
+from typing import Callable
+import backtestKernels as kernels
+
+
+def slidingWindows(series: np.ndarray,
+                   subframeLength: int,
+                   gapToNextFrame: int) -> np.ndarray:
+
+    '''
+    Returns a read-only strided view over a 1-D series with the same subframe semantics as BacktestDriver.batcher(). Row k of the view
+    holds the values of the subframe ending at index k + subframeLength, oldest first. The last axis may be any length, so 2-D input of
+    shape (tickers, time) yields one set of windows per row.
+    '''
+
+    pointsPerFrame = len(range(0, subframeLength, gapToNextFrame))
+    frameSpan = (pointsPerFrame - 1) * gapToNextFrame + 1
+    firstFrameStart = subframeLength - frameSpan + 1
+    if (series.shape[-1] <= subframeLength):
+        return (np.empty(series.shape[:-1] + (0, pointsPerFrame), dtype = series.dtype))
+
+    return (sliding_window_view(series, frameSpan, axis = -1)[..., firstFrameStart:, ::gapToNextFrame])
+
+
+class PriceColumns(Mapping):
+
+    '''
+    Read-only mapping from the names 'date', 'open', 'high', 'low', 'close' and 'volume' to float64 arrays, with time along the last axis.
+    Each column is loaded on first access, so a strategy only pays for the columns it reads. Values computed from the columns can be
+    memoized with derived(), and slices taken with slice() share those values with the full series.
+
+    Parameters
+    ----------
+    columnLoader : Callable[[str], np.ndarray]
+        returns the array for a column name.
+    columns : dict[str, np.ndarray], optional
+        columns that are already loaded.
+    '''
+
+    names = ('date', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self,
+                 columnLoader: Callable[[str], np.ndarray],
+                 columns: dict[str, np.ndarray] = None) -> None:
+
+        self._columnLoader = columnLoader
+        self._columns = dict(columns or {})
+        self._derived = {}
+
+
+    def __getitem__(self,
+                    name: str) -> np.ndarray:
+
+        name = name.lower()
+        if (name not in self.names):
+            raise KeyError(name)
+        if (name not in self._columns):
+            self._columns[name] = self._columnLoader(name)
+
+        return (self._columns[name])
+
+
+    def derived(self,
+                key: tuple,
+                function: Callable[['PriceColumns'], np.ndarray]) -> np.ndarray:
+
+        '''
+        Returns function(self), computed once and stored under key. The result must hold one value per bar, and each value may only depend
+        on a fixed number of bars up to and including its own, e.g. a rolling minimum, so that any slice of it matches what the slice
+        alone would give past its warm-up. The key should name the computation and every parameter it uses.
+        '''
+
+        if (key not in self._derived):
+            self._derived[key] = function(self)
+
+        return (self._derived[key])
+
+
+    def slice(self,
+              start: int,
+              stop: int) -> 'PriceColumns':
+
+        '''Returns the bars from start up to stop as PriceColumns. Columns are views, and derived values are computed on the full series and shared.'''
+
+        return (PriceColumnsSlice(self, start, stop))
+
+
+    def __iter__(self):
+
+        return (iter(self.names))
+
+
+    def __len__(self) -> int:
+
+        return (len(self.names))
+
+
+class PriceColumnsSlice(PriceColumns):
+
+    '''A window of bars within a longer PriceColumns, as returned by PriceColumns.slice().'''
+
+    def __init__(self,
+                 parent: PriceColumns,
+                 start: int,
+                 stop: int) -> None:
+
+        super().__init__(lambda name: parent[name][..., start:stop])
+        self._parent = parent
+        self._start = start
+        self._stop = stop
+
+
+    def derived(self,
+                key: tuple,
+                function: Callable[[PriceColumns], np.ndarray]) -> np.ndarray:
+
+        return (self._parent.derived(key, function)[..., self._start:self._stop])
+
+
+    def slice(self,
+              start: int,
+              stop: int) -> PriceColumns:
+
+        return (PriceColumnsSlice(self._parent, self._start + start, self._start + stop))
+
+
+class Strategy:
+
+    '''
+    Interface for a trading strategy. A strategy declares how many bars it needs before it can signal, and returns its entry and exit
+    signals for a whole series at once. The engine turns the signals into positions, order pairs and returns. Subclasses list their
+    parameters, with default values, in defaultParameters.
+
+    A position is opened on a bar where the entry signal turns True while no position is open, and closed on a bar where the exit signal
+    is True while a position is open. The rules are those of backtestKernels.stateTransitions() with an entryCount of 1.
+    '''
+
+    defaultParameters = {}
+
+    def __init__(self,
+                 **strategyParameters) -> None:
+
+        unknownParameters = set(strategyParameters) - set(self.defaultParameters)
+        if unknownParameters:
+            raise ValueError('Invalid argument(s). Valid arguments are: ' + ', '.join('\'' + i + '\'' for i in self.defaultParameters))
+        self._strategyParameters = {**self.defaultParameters, **strategyParameters}
+
+
+    def __repr__(self) -> str:
+
+        return (type(self).__name__ + '(' + ', '.join(i + ' = ' + repr(j) for i, j in self._strategyParameters.items()) + ')')
+
+
+    def parameters(self) -> dict:
+
+        return (dict(self._strategyParameters))
+
+
+    def withParameters(self,
+                       **strategyParameters) -> 'Strategy':
+
+        '''Returns a new strategy of the same type, with strategyParameters replacing the current values.'''
+
+        return (type(self)(**{**self._strategyParameters, **strategyParameters}))
+
+
+    def warmUpLength(self) -> int:
+
+        '''Returns the number of bars at the start of a series that the strategy cannot signal on. No state is produced for these bars.'''
+
+        raise NotImplementedError
+
+
+    def lookbackLength(self) -> int:
+
+        '''
+        Returns how many bars before a bar its signals depend on. signals() over any slice that starts at least this many bars before a bar
+        must give that bar the same signals as over the whole series. Used to overlap the blocks of backtestChunked. Defaults to warmUpLength().
+        '''
+
+        return (self.warmUpLength())
+
+
+    def signals(self,
+                prices: PriceColumns) -> tuple[np.ndarray, np.ndarray]:
+
+        '''
+        Returns (entrySignals, exitSignals) as boolean arrays with the same shape as the columns in prices: one value per bar, for a 1-D series
+        or for a 2-D array with one row per ticker. Signals within the warm-up bars are ignored.
+        '''
+
+        raise NotImplementedError
+
+
+    def barSignals(self,
+                   prices: PriceColumns,
+                   barIndex: int) -> tuple[bool, bool]:
+
+        '''
+        Returns the entry and exit signals of a single bar of a 1-D series, using only the prices up to and including barIndex. Used by
+        referenceStateCodes() to check signals() bar by bar, so it should favour being obviously correct over being fast.
+        '''
+
+        raise NotImplementedError
+
+
+class RollingMinimumStrategy(Strategy):
+
+    '''
+    The strategy that ships with the platform. A subframe of the last subframeLength closing prices is taken at every bar. A position is
+    opened once the oldest price in the subframe has been its minimum for exactly entryCount bars in a row, and closed when the price at
+    exitIndex within the subframe is the minimum. Subframes containing NaN never signal.
+
+    Parameters
+    ----------
+    subframeLength : int
+        the number of bars that the rolling minimum is taken over.
+    entryCount : int
+        the number of consecutive bars on which the oldest price in the subframe must be the minimum before a position is opened.
+    exitIndex : int
+        the position within the subframe of the price that closes a position when it is the minimum.
+    '''
+
+    defaultParameters = {'subframeLength': 5, 'entryCount': 3, 'exitIndex': 2}
+
+    def __init__(self,
+                 **strategyParameters) -> None:
+
+        super().__init__(**strategyParameters)
+        subframeLength, entryCount, exitIndex = (self._strategyParameters[i] for i in ('subframeLength', 'entryCount', 'exitIndex'))
+        if (entryCount < 1):
+            raise ValueError('Invalid argument(s). entryCount must be at least 1, but is ' + repr(entryCount))
+        if not (1 <= exitIndex < subframeLength):
+            raise ValueError('Invalid argument(s). exitIndex must be at least 1 and less than subframeLength (' + repr(subframeLength) + '), but is ' + repr(exitIndex))
+
+
+    def warmUpLength(self) -> int:
+
+        return (self._strategyParameters['subframeLength'])
+
+
+    def lookbackLength(self) -> int:
+
+        # An entry depends on the entry condition of the entryCount bars before it as well as its own, each of which needs a full subframe.
+        return (self._strategyParameters['subframeLength'] + self._strategyParameters['entryCount'])
+
+
+    def isSubframeMinimum(self,
+                          prices: PriceColumns,
+                          position: int) -> np.ndarray:
+
+        '''
+        Returns, for every bar, whether the price at position within the subframe ending at that bar is the minimum of the subframe. False
+        during the warm-up. The rolling minimum and the result are stored with PriceColumns.derived(), so slices of one series share them.
+        '''
+
+        subframeLength = self._strategyParameters['subframeLength']
+
+        def rollingMinimum(prices: PriceColumns) -> np.ndarray:
+            closes = prices['close']
+            minimumSubframeValues = np.full(closes.shape, np.nan)
+            minimumSubframeValues[..., subframeLength:] = slidingWindows(closes, subframeLength, 1).min(axis = -1)
+            return (minimumSubframeValues)
+
+        def isMinimum(prices: PriceColumns) -> np.ndarray:
+            closes = prices['close']
+            minimumSubframeValues = prices.derived(('rollingMinimum', subframeLength), rollingMinimum)
+            conditions = np.zeros(closes.shape, dtype = bool)
+            if (closes.shape[-1] > subframeLength):
+                conditions[..., subframeLength:] = closes[..., position + 1 : closes.shape[-1] - subframeLength + position + 1] == minimumSubframeValues[..., subframeLength:]
+            return (conditions)
+
+        return (prices.derived(('isSubframeMinimum', subframeLength, position), isMinimum))
+
+
+    def signals(self,
+                prices: PriceColumns) -> tuple[np.ndarray, np.ndarray]:
+
+        subframeLength = self._strategyParameters['subframeLength']
+        entryConditions = self.isSubframeMinimum(prices, 0)
+        entrySignals = np.zeros(entryConditions.shape, dtype = bool)
+        entrySignals[..., subframeLength:] = kernels.entryTriggers(entryConditions[..., subframeLength:], self._strategyParameters['entryCount'])
+
+        return (entrySignals, self.isSubframeMinimum(prices, self._strategyParameters['exitIndex']))
+
+
+    def barSignals(self,
+                   prices: PriceColumns,
+                   barIndex: int) -> tuple[bool, bool]:
+
+        closes = prices['close']
+        subframeLength = self._strategyParameters['subframeLength']
+        entryCount = self._strategyParameters['entryCount']
+
+        def subframe(index: int) -> np.ndarray:
+            return (closes[index - subframeLength + 1 : index + 1])
+
+        # The entry condition must have held on exactly the last entryCount bars, counting only bars after the warm-up.
+        consecutiveEntries = 0
+        for i in range(barIndex, max(barIndex - entryCount, subframeLength - 1), -1):
+            if (subframe(i)[0] != subframe(i).min()):
+                break
+            consecutiveEntries += 1
+        previousBarIndex = barIndex - entryCount
+        previousBarHeld = (previousBarIndex >= subframeLength) and (subframe(previousBarIndex)[0] == subframe(previousBarIndex).min())
+
+        entrySignal = (consecutiveEntries == entryCount) and not previousBarHeld
+        exitSignal = (subframe(barIndex)[self._strategyParameters['exitIndex']] == subframe(barIndex).min())
+
+        return (bool(entrySignal), bool(exitSignal))
+
+
+def vectorizedStateCodes(strategy: Strategy,
+                         prices: PriceColumns) -> np.ndarray:
+
+    '''
+    Evaluates strategy.signals() over the whole series and runs the state machine on the result. Returns one uint8 state code per bar after
+    the warm-up, for a 1-D series or for a 2-D array with one row per ticker.
+    '''
+
+    warmUpLength = strategy.warmUpLength()
+    entrySignals, exitSignals = strategy.signals(prices)
+
+    return (kernels.stateTransitions(entrySignals[..., warmUpLength:], exitSignals[..., warmUpLength:], 1))
+
+
+def referenceStateCodes(strategy: Strategy,
+                        prices: PriceColumns) -> np.ndarray:
+
+    '''
+    Slow reference for vectorizedStateCodes(). Asks strategy.barSignals() for the signals of one bar at a time and steps the state machine
+    in plain Python, so that a vectorized strategy can be checked against a version that cannot look ahead. Takes a 1-D series.
+    '''
+
+    warmUpLength = strategy.warmUpLength()
+    barSignals = [strategy.barSignals(prices, i) for i in range(warmUpLength, prices['close'].shape[-1])]
+    entrySignals = np.array([i[0] for i in barSignals], dtype = bool)[np.newaxis]
+    exitSignals = np.array([i[1] for i in barSignals], dtype = bool)[np.newaxis]
+
+    return (kernels.stateTransitionsLoop(entrySignals, exitSignals, 1)[0])
@@ -0,0 +1,152 @@
+from collections import deque
+from typing import Callable
+import numpy as np
+import backtestKernels as kernels
+from backtestStrategy import RollingMinimumStrategy, Strategy
+
+
+class StreamingBacktest:
+
+    '''
+    Evaluates backtestStrategy.RollingMinimumStrategy one bar at a time, for paper trading on bars as they arrive.
+    Only the last subframeLength closing prices are kept, in a ring buffer, alongside a monotonic queue of candidate minimums,
+    so each bar costs a constant amount of work on average no matter how long the stream runs. As in the batch path, subframes
+    containing NaN never signal.
+
+    Parameters
+    ----------
+    strategyParameters : dict[str, int], optional
+        the parameters of the strategy, as accepted by BacktestDriver.setStrategyParameters(). Defaults to the driver's defaults.
+    tradeListener : Callable[[dict], None], optional
+        called with a dictionary describing each event, when a trade is opened ('type': 'open') and when it is closed ('type': 'close').
+    strategy : Strategy, optional
+        the strategy to evaluate, with strategyParameters, when given, replacing its values. Only RollingMinimumStrategy can be
+        streamed, and any other strategy raises a ValueError.
+    '''
+
+    def __init__(self,
+                 strategyParameters: dict[str, int] = None,
+                 tradeListener: Callable[[dict], None] = None,
+                 strategy: Strategy = None) -> None:
+
+        if (strategy is None):
+            strategy = RollingMinimumStrategy()
+        if (type(strategy) is not RollingMinimumStrategy):
+            raise ValueError('Invalid argument(s). Only RollingMinimumStrategy can be streamed, not ' + type(strategy).__name__)
+        self._strategy = strategy.withParameters(**(strategyParameters or {}))
+        self._strategyParameters = self._strategy.parameters()
+        self._tradeListener = tradeListener
+        self._subframeLength = self._strategyParameters['subframeLength']
+
+        self._ringBuffer = [0.0] * self._subframeLength
+        self._minimumCandidates = deque()
+        self._lastNaNIndex = -self._subframeLength - 1
+        self._barIndex = -1
+
+        self._consecutiveEntries = 0
+        self._positionIsOpen = False
+        self._currentState = kernels.NO_POSITION
+        self._previousState = None
+        self._pendingOrder = None
+        self._trades = []
+
+
+    def onBar(self,
+              bar: float | np.ndarray) -> int | None:
+
+        '''
+        Adds one bar to the stream and returns its state code, as defined in backtestKernels. Returns None for the first subframeLength
+        bars, which BacktestDriver.batcher() also leaves out. The bar may be a closing price, or a row laid out as [Date, Open, High, Low, Close, Volume].
+        '''
+
+        close = float(bar[4]) if (np.ndim(bar) > 0) else float(bar)
+        self._barIndex += 1
+        self._ringBuffer[self._barIndex % self._subframeLength] = close
+        if np.isnan(close):
+            self._lastNaNIndex = self._barIndex # Never queued, since NaN compares False and would stay in the queue ahead of later minimums
+        else:
+            while self._minimumCandidates and (self._minimumCandidates[-1][1] > close):
+                self._minimumCandidates.pop()
+            self._minimumCandidates.append((self._barIndex, close))
+        while self._minimumCandidates and (self._minimumCandidates[0][0] <= self._barIndex - self._subframeLength):
+            self._minimumCandidates.popleft()
+
+        if (self._barIndex < self._subframeLength):
+            return (None)
+
+        oldestIndex = self._barIndex - self._subframeLength + 1
+        if (self._lastNaNIndex >= oldestIndex):
+            entrySignal = exitSignal = False
+        else:
+            minimumSubframeValue = self._minimumCandidates[0][1]
+            entrySignal = (self._ringBuffer[oldestIndex % self._subframeLength] == minimumSubframeValue)
+            exitSignal = (self._ringBuffer[(oldestIndex + self._strategyParameters['exitIndex']) % self._subframeLength] == minimumSubframeValue)
+
+        state = self.stepStateMachine(entrySignal, exitSignal)
+        if (state == kernels.OPENED) or (state == kernels.CLOSED):
+            self.recordOrder(self._barIndex, close)
+
+        return (state)
+
+
+    def stepStateMachine(self,
+                         entrySignal: bool,
+                         exitSignal: bool) -> int:
+
+        '''Advances the state machine by one bar. Mirrors backtestKernels.stateTransitionsLoop().'''
+
+        entryCount = self._strategyParameters['entryCount']
+        if entrySignal:
+            self._consecutiveEntries += 1
+        else:
+            self._consecutiveEntries = 0
+
+        if (self._consecutiveEntries == entryCount):
+            self._currentState = kernels.OPENED
+            self._positionIsOpen = True
+        if self._positionIsOpen and (self._consecutiveEntries != entryCount):
+            self._currentState = kernels.HOLDING
+        if self._positionIsOpen and exitSignal:
+            self._currentState = kernels.CLOSED
+            self._positionIsOpen = False
+        if (not self._positionIsOpen) and (self._currentState != kernels.CLOSED):
+            self._currentState = kernels.NO_POSITION
+        if (self._previousState is not None):
+            if (self._previousState == kernels.HOLDING) and (self._currentState == kernels.OPENED):
+                self._currentState = kernels.OPENED_WHILE_HOLDING
+            if (not self._positionIsOpen) and (self._previousState == kernels.CLOSED):
+                self._currentState = kernels.NO_POSITION
+
+        self._previousState = self._currentState
+
+        return (self._currentState)
+
+
+    def recordOrder(self,
+                    barIndex: int,
+                    price: float) -> None:
+
+        '''Pairs orders in the order they occur, as BacktestDriver.computeReturnSeries() does, and notifies the trade listener.'''
+
+        if (self._pendingOrder is None):
+            self._pendingOrder = (barIndex, price)
+            event = {'type': 'open', 'openIndex': barIndex, 'openPrice': price}
+        else:
+            openIndex, openPrice = self._pendingOrder
+            self._pendingOrder = None
+            event = {'type': 'close', 'openIndex': openIndex, 'closeIndex': barIndex, 'openPrice': openPrice, 'closePrice': price,
+                     'return': (price - openPrice) / openPrice, 'holdingPeriod': barIndex - openIndex}
+            self._trades.append(event)
+        if (self._tradeListener is not None):
+            self._tradeListener(event)
+
+
+    def replay(self,
+               assetTimeSeries: np.ndarray) -> np.ndarray:
+
+        '''Feeds a historical series through onBar() and returns the state codes, aligned with BacktestDriver.positionStateCodes().'''
+
+        closes = assetTimeSeries[:, 4] if (np.ndim(assetTimeSeries) == 2) else assetTimeSeries
+        states = [self.onBar(i) for i in closes.tolist()]
+
+        return (np.array([i for i in states if (i is not None)], dtype = np.uint8))
@@ -0,0 +1,161 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from itertools import product
+import pandas as pd
+import numpy as np
+import os
+from backtestDriver import BacktestDriver
+from backtestData import barsToArray
+from backtestExecution import ExecutionModel
+from backtestStrategy import Strategy
+from backtestRates import RateProvider, defaultRateProvider, annualRiskFreeRate
+from backtestStatistics import tradeStatistics
+
+_workerSharedMemory = None
+_workerBacktest = None
+_workerRiskFreeRate = None
+
+
+def parameterGrid(strategyParameterGrid: dict[str, list]) -> list[dict]:
+
+    '''Expands a dictionary of parameter names and candidate values into a list with one dictionary per combination.'''
+
+    names = list(strategyParameterGrid)
+
+    return ([dict(zip(names, i)) for i in product(*(strategyParameterGrid[j] for j in names))])
+
+
+def summarizeBacktest(backtest: BacktestDriver,
+                      riskFreeRate: float = None) -> dict:
+
+    '''
+    Returns the headline numbers of a backtest as a flat dictionary, so that many backtests can be collected into one table. The numbers are
+    computed as BacktestMetrics computes them, with riskFreeRate as the annual rate. When riskFreeRate is not given, it is taken from
+    backtestRates.defaultRateProvider() over the dates of the backtest, as BacktestMetrics does by default.
+    '''
+
+    if (riskFreeRate is None):
+        riskFreeRate = annualRiskFreeRate(backtest.barDates(), defaultRateProvider())
+    statistics = tradeStatistics(backtest._tradesPercentageChangeSeries, backtest._holdingPeriods, len(backtest._assetTimeSeries), backtest.backtestYears(), riskFreeRate)
+
+    return ({'tradeCount': int(statistics['count'][0]),
+             'totalReturn': float(statistics['totalReturn'][0]),
+             'maximumDrawdown': float(statistics['maximumDrawdown'][0]),
+             'sharpeRatio': float(statistics['sharpeRatio'][0]),
+             'winRate': float(statistics['winRate'][0]),
+             'profitFactor': float(statistics['profitFactor'][0]),
+             'exposure': float(statistics['exposure'][0]),
+             'averageHoldingPeriod': float(statistics['averageHoldingPeriod'][0])})
+
+
+def evaluateParameters(backtest: BacktestDriver,
+                       strategyParameters: list[dict],
+                       riskFreeRate: float) -> list[dict]:
+
+    '''Runs the backtest once per parameter combination and returns one row per combination.'''
+
+    rows = []
+    for i in strategyParameters:
+        backtest.setStrategyParameters(**i)
+        rows.append({**i, **summarizeBacktest(backtest, riskFreeRate)})
+
+    return (rows)
+
+
+def attachWorker(sharedMemoryName: str,
+                 shape: tuple[int, int],
+                 tickerSymbols: list[str],
+                 tickInterval: str,
+                 executionMode: str,
+                 strategy: Strategy,
+                 executionModel: ExecutionModel,
+                 riskFreeRate: float) -> None:
+
+    '''Process pool initializer. Maps the shared price array into the worker and builds the backtest that every task in the worker reuses.'''
+
+    global _workerSharedMemory, _workerBacktest, _workerRiskFreeRate
+    _workerSharedMemory = shared_memory.SharedMemory(name = sharedMemoryName)
+    assetTimeSeries = np.ndarray(shape, dtype = np.float64, buffer = _workerSharedMemory.buf)
+    _workerBacktest = BacktestDriver(tickerSymbols, tickInterval, shape[0], assetTimeSeries = assetTimeSeries, executionMode = executionMode, strategy = strategy, executionModel = executionModel)
+    _workerRiskFreeRate = riskFreeRate
+
+
+def evaluateInWorker(strategyParameters: list[dict]) -> list[dict]:
+
+    return (evaluateParameters(_workerBacktest, strategyParameters, _workerRiskFreeRate))
+
+
+def sortedSweepResults(rows: list[dict],
+                       strategyParameterGrid: dict[str, list]) -> pd.DataFrame:
+
+    '''Collects the rows of a sweep into a table sorted by parameter values, so that the order does not depend on how the work was split.'''
+
+    return (pd.DataFrame(rows).sort_values(list(strategyParameterGrid)).reset_index(drop = True))
+
+
+def parameterSweep(assetTimeSeries: np.ndarray,
+                   strategyParameterGrid: dict[str, list],
+                   tickerSymbols: list[str] = None,
+                   tickInterval: str = '1min',
+                   maxWorkers: int = None,
+                   chunksPerWorker: int = 4,
+                   executionMode: str = 'compiled',
+                   strategy: Strategy = None,
+                   executionModel: ExecutionModel = None,
+                   rateProvider: RateProvider = None) -> pd.DataFrame:
+
+    '''
+    Backtests every combination in a grid of strategy parameters over one price series and returns the results as a table with one row per combination.
+    The series is copied once into shared memory, and each worker process maps it instead of receiving its own copy.
+
+    Parameters
+    ----------
+    assetTimeSeries : np.ndarray
+        the bars to backtest, laid out as [Date, Open, High, Low, Close, Volume]. Typically backtest._assetTimeSeries of an existing BacktestDriver.
+    strategyParameterGrid : dict[str, list]
+        the candidate values for each parameter of the strategy, as accepted by BacktestDriver.setStrategyParameters(), e.g. {'subframeLength': [5, 10], 'entryCount': [2, 3]}.
+    tickerSymbols : list[str]
+        the ticker symbol(s) the series belongs to.
+    tickInterval : str
+        the interval of time between each bar.
+    maxWorkers : int, optional
+        the number of worker processes. Defaults to the number of CPUs. With 1, the sweep runs in the current process.
+    chunksPerWorker : int
+        how many batches of combinations each worker receives. More batches balance uneven work better, fewer reduce scheduling overhead.
+    executionMode : str
+        passed on to BacktestDriver.
+    strategy : Strategy, optional
+        the strategy whose parameters are swept. Defaults to backtestStrategy.RollingMinimumStrategy. Sent to each worker once.
+    executionModel : ExecutionModel, optional
+        the costs applied to every backtest in the sweep. See backtestExecution.
+    rateProvider : RateProvider, optional
+        supplies the risk-free rate used in the Sharpe ratios, as in BacktestMetrics. Defaults to backtestRates.defaultRateProvider().
+    '''
+
+    combinations = parameterGrid(strategyParameterGrid)
+    tickerSymbols = tickerSymbols if (tickerSymbols is not None) else ['SWEEP']
+    if not (isinstance(assetTimeSeries, np.ndarray) and (assetTimeSeries.dtype == np.float64)):
+        assetTimeSeries = barsToArray(assetTimeSeries)
+    maxWorkers = maxWorkers if (maxWorkers is not None) else (os.cpu_count() or 1)
+    riskFreeRate = annualRiskFreeRate(assetTimeSeries[:, 0].astype(np.int64).astype('datetime64[s]'), rateProvider if (rateProvider is not None) else defaultRateProvider())
+
+    if (maxWorkers == 1):
+        backtest = BacktestDriver(tickerSymbols, tickInterval, len(assetTimeSeries), assetTimeSeries = assetTimeSeries, executionMode = executionMode, strategy = strategy, executionModel = executionModel)
+        return (sortedSweepResults(evaluateParameters(backtest, combinations, riskFreeRate), strategyParameterGrid))
+
+    numberOfChunks = max(1, min(len(combinations), maxWorkers * chunksPerWorker))
+    chunks = [combinations[i::numberOfChunks] for i in range(numberOfChunks)]
+    sharedMemory = shared_memory.SharedMemory(create = True, size = max(1, assetTimeSeries.nbytes))
+    try:
+        sharedArray = np.ndarray(assetTimeSeries.shape, dtype = np.float64, buffer = sharedMemory.buf)
+        sharedArray[:] = assetTimeSeries
+        with ProcessPoolExecutor(max_workers = maxWorkers,
+                                 initializer = attachWorker,
+                                 initargs = (sharedMemory.name, assetTimeSeries.shape, tickerSymbols, tickInterval, executionMode, strategy, executionModel, riskFreeRate)) as executor:
+            rows = [j for i in executor.map(evaluateInWorker, chunks) for j in i]
+        del sharedArray
+    finally:
+        sharedMemory.close()
+        sharedMemory.unlink()
+
+    return (sortedSweepResults(rows, strategyParameterGrid))
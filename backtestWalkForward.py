@@ -0,0 +1,255 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import pandas as pd
+import numpy as np
+import os
+from backtestDriver import BacktestDriver, columnIndices
+from backtestData import barsToArray
+from backtestExecution import ExecutionModel
+from backtestRates import RateProvider, defaultRateProvider, annualRiskFreeRate
+from backtestStrategy import Strategy, RollingMinimumStrategy, PriceColumns
+from backtestSweep import parameterGrid, summarizeBacktest
+
+_workerSharedMemory = None
+_workerFoldContext = None
+
+
+class FoldBacktest(BacktestDriver):
+
+    '''
+    A backtest over the bars from start up to stop of a longer series. The bars are a view of the full series, and the strategy reads its
+    prices through PriceColumns.slice(), so rolling values such as the rolling minimum are computed once over the full series and shared
+    by every fold that overlaps them.
+
+    Parameters
+    ----------
+    assetTimeSeries : np.ndarray
+        the full series of bars, laid out as [Date, Open, High, Low, Close, Volume].
+    prices : PriceColumns
+        the columns of the full series. Reused between folds.
+    start : int
+        the index of the first bar of the fold.
+    stop : int
+        the index after the last bar of the fold.
+    tickerSymbols : list[str]
+        the ticker symbol(s) the series belongs to.
+    tickInterval : str
+        the interval of time between each bar.
+    executionMode : str
+        passed on to BacktestDriver.
+    strategy : Strategy
+        the strategy to backtest. Its parameters are changed with setStrategyParameters() as the fold is optimized.
+    executionModel : ExecutionModel
+        passed on to BacktestDriver.
+    '''
+
+    def __init__(self,
+                 assetTimeSeries: np.ndarray,
+                 prices: PriceColumns,
+                 start: int,
+                 stop: int,
+                 tickerSymbols: list[str],
+                 tickInterval: str,
+                 executionMode: str,
+                 strategy: Strategy,
+                 executionModel: ExecutionModel) -> None:
+
+        super().__init__(tickerSymbols, tickInterval, stop - start, assetTimeSeries = assetTimeSeries[start:stop], executionMode = executionMode,
+                         strategy = strategy, executionModel = executionModel)
+        self._prices = prices.slice(start, stop)
+
+
+    def priceColumns(self) -> PriceColumns:
+
+        return (self._prices)
+
+
+def walkForwardFolds(numberOfBars: int,
+                     trainLength: int,
+                     testLength: int,
+                     step: int = None,
+                     anchored: bool = False) -> list[tuple[int, int, int, int]]:
+
+    '''
+    Splits a series into consecutive (trainStart, trainStop, testStart, testStop) folds, where each test slice directly follows its train slice.
+
+    Parameters
+    ----------
+    numberOfBars : int
+        the length of the series.
+    trainLength : int
+        the number of bars that parameters are optimized on. With anchored folds, the length of the first train slice.
+    testLength : int
+        the number of bars that the chosen parameters are evaluated on.
+    step : int, optional
+        how far each fold moves forward. Defaults to testLength, so that test slices cover the series without overlapping.
+    anchored : bool
+        when True, every train slice starts at the first bar and grows with each fold. Otherwise the train slice rolls forward.
+    '''
+
+    step = step if (step is not None) else testLength
+    folds = []
+    for testStart in range(trainLength, numberOfBars - testLength + 1, step):
+        folds.append((0 if anchored else (testStart - trainLength), testStart, testStart, testStart + testLength))
+
+    return (folds)
+
+
+def evaluateFold(context: dict,
+                 fold: tuple[int, int, int, int]) -> dict:
+
+    '''
+    Optimizes the strategy on the train slice of a fold, choosing the parameters with the highest objective, and backtests them on the test
+    slice. The test backtest starts one warm-up length before the test slice, so that the strategy can trade from the first test bar.
+    '''
+
+    trainStart, trainStop, testStart, testStop = fold
+    trainBacktest = FoldBacktest(context['assetTimeSeries'], context['prices'], trainStart, trainStop, context['tickerSymbols'],
+                                 context['tickInterval'], context['executionMode'], context['strategy'], context['executionModel'])
+    trainRiskFreeRate = annualRiskFreeRate(trainBacktest.barDates(), context['rateProvider'])
+    bestParameters, bestSummary, bestScore = None, None, -np.inf
+    for i in context['combinations']:
+        trainBacktest.setStrategyParameters(**i)
+        summary = summarizeBacktest(trainBacktest, trainRiskFreeRate)
+        score = summary[context['objective']] if not np.isnan(summary[context['objective']]) else -np.inf # Combinations without trades cannot be scored
+        if (bestSummary is None) or (score > bestScore):
+            bestParameters, bestSummary, bestScore = i, summary, score
+
+    bestStrategy = context['strategy'].withParameters(**bestParameters)
+    testBacktest = FoldBacktest(context['assetTimeSeries'], context['prices'], max(0, testStart - bestStrategy.warmUpLength()), testStop,
+                                context['tickerSymbols'], context['tickInterval'], context['executionMode'], bestStrategy, context['executionModel'])
+
+    return ({'trainStart': trainStart,
+             'trainStop': trainStop,
+             'testStart': testStart,
+             'testStop': testStop,
+             **bestParameters,
+             **{'train' + i[0].upper() + i[1:]: j for i, j in bestSummary.items()},
+             **{'test' + i[0].upper() + i[1:]: j for i, j in summarizeBacktest(testBacktest, annualRiskFreeRate(testBacktest.barDates(), context['rateProvider'])).items()}})
+
+
+def foldContext(assetTimeSeries: np.ndarray,
+                combinations: list[dict],
+                objective: str,
+                tickerSymbols: list[str],
+                tickInterval: str,
+                executionMode: str,
+                strategy: Strategy,
+                executionModel: ExecutionModel,
+                rateProvider: RateProvider) -> dict:
+
+    '''Bundles everything that evaluateFold() needs besides the fold itself, including the PriceColumns that the folds share.'''
+
+    return ({'assetTimeSeries': assetTimeSeries,
+             'prices': PriceColumns(lambda name: assetTimeSeries[:, columnIndices[name]]),
+             'combinations': combinations,
+             'objective': objective,
+             'tickerSymbols': tickerSymbols,
+             'tickInterval': tickInterval,
+             'executionMode': executionMode,
+             'strategy': strategy,
+             'executionModel': executionModel,
+             'rateProvider': rateProvider})
+
+
+def attachFoldWorker(sharedMemoryName: str,
+                     shape: tuple[int, int],
+                     *foldContextArguments) -> None:
+
+    '''Process pool initializer. Maps the shared price array into the worker and builds the fold context that every task in the worker reuses.'''
+
+    global _workerSharedMemory, _workerFoldContext
+    _workerSharedMemory = shared_memory.SharedMemory(name = sharedMemoryName)
+    assetTimeSeries = np.ndarray(shape, dtype = np.float64, buffer = _workerSharedMemory.buf)
+    _workerFoldContext = foldContext(assetTimeSeries, *foldContextArguments)
+
+
+def evaluateFoldsInWorker(folds: list[tuple[int, int, int, int]]) -> list[dict]:
+
+    return ([evaluateFold(_workerFoldContext, i) for i in folds])
+
+
+def walkForward(assetTimeSeries: np.ndarray,
+                strategyParameterGrid: dict[str, list],
+                trainLength: int,
+                testLength: int,
+                step: int = None,
+                anchored: bool = False,
+                objective: str = 'sharpeRatio',
+                tickerSymbols: list[str] = None,
+                tickInterval: str = '1min',
+                maxWorkers: int = None,
+                executionMode: str = 'compiled',
+                strategy: Strategy = None,
+                executionModel: ExecutionModel = None,
+                rateProvider: RateProvider = None) -> pd.DataFrame:
+
+    '''
+    Runs a walk-forward analysis. The series is split into folds with walkForwardFolds(), the parameters in the grid are optimized on each
+    train slice, and the best ones are backtested on the test slice that follows. Returns one row per fold, with the chosen parameters and
+    the summaries of backtestSweep.summarizeBacktest() for the train and test slices, prefixed with 'train' and 'test'.
+
+    The series is copied once into shared memory, and every fold is a view of it. Consecutive folds are sent to the same worker, so that
+    folds whose windows overlap reuse the rolling values the worker has already computed.
+
+    Parameters
+    ----------
+    assetTimeSeries : np.ndarray
+        the bars to backtest, laid out as [Date, Open, High, Low, Close, Volume].
+    strategyParameterGrid : dict[str, list]
+        the candidate values for each parameter of the strategy, as in backtestSweep.parameterSweep().
+    trainLength : int
+        the number of bars in each train slice.
+    testLength : int
+        the number of bars in each test slice.
+    step : int, optional
+        how far each fold moves forward. Defaults to testLength.
+    anchored : bool
+        when True, every train slice starts at the first bar.
+    objective : str
+        the column of summarizeBacktest() to maximize on the train slices, e.g. 'sharpeRatio' or 'totalReturn'.
+    tickerSymbols : list[str]
+        the ticker symbol(s) the series belongs to.
+    tickInterval : str
+        the interval of time between each bar.
+    maxWorkers : int, optional
+        the number of worker processes. Defaults to the number of CPUs. With 1, the folds run in the current process.
+    executionMode : str
+        passed on to BacktestDriver.
+    strategy : Strategy, optional
+        the strategy to optimize. Defaults to backtestStrategy.RollingMinimumStrategy.
+    executionModel : ExecutionModel, optional
+        the costs applied to every train and test backtest. See backtestExecution.
+    rateProvider : RateProvider, optional
+        supplies the risk-free rate used in the Sharpe ratios of each slice, as in BacktestMetrics. Defaults to backtestRates.defaultRateProvider().
+    '''
+
+    folds = walkForwardFolds(len(assetTimeSeries), trainLength, testLength, step, anchored)
+    if (len(folds) == 0):
+        raise ValueError('The series is too short for a single fold of ' + str(trainLength) + ' train and ' + str(testLength) + ' test bars')
+    if not (isinstance(assetTimeSeries, np.ndarray) and (assetTimeSeries.dtype == np.float64)):
+        assetTimeSeries = barsToArray(assetTimeSeries)
+    foldContextArguments = (parameterGrid(strategyParameterGrid), objective, tickerSymbols if (tickerSymbols is not None) else ['WALKFORWARD'],
+                            tickInterval, executionMode, strategy if (strategy is not None) else RollingMinimumStrategy(), executionModel,
+                            rateProvider if (rateProvider is not None) else defaultRateProvider())
+    maxWorkers = min(len(folds), maxWorkers if (maxWorkers is not None) else (os.cpu_count() or 1))
+
+    if (maxWorkers == 1):
+        context = foldContext(assetTimeSeries, *foldContextArguments)
+        return (pd.DataFrame([evaluateFold(context, i) for i in folds]))
+
+    chunks = [folds[i[0]:i[-1] + 1] for i in np.array_split(np.arange(len(folds)), maxWorkers)]
+    sharedMemory = shared_memory.SharedMemory(create = True, size = max(1, assetTimeSeries.nbytes))
+    try:
+        sharedArray = np.ndarray(assetTimeSeries.shape, dtype = np.float64, buffer = sharedMemory.buf)
+        sharedArray[:] = assetTimeSeries
+        with ProcessPoolExecutor(max_workers = maxWorkers,
+                                 initializer = attachFoldWorker,
+                                 initargs = (sharedMemory.name, assetTimeSeries.shape, *foldContextArguments)) as executor:
+            rows = [j for i in executor.map(evaluateFoldsInWorker, chunks) for j in i]
+        del sharedArray
+    finally:
+        sharedMemory.close()
+        sharedMemory.unlink()
+
+    return (pd.DataFrame(rows))
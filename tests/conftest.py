@@ -0,0 +1,24 @@
+import os
+import sys
+import pytest
+
+# The platform is a set of flat modules rather than an installed package, so the tests import them from the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twelveDataStub import StubTwelveDataServer
+
+
+@pytest.fixture
+def twelveDataStub():
+
+    '''Starts StubTwelveDataServer instances, with the arguments the test passes, and shuts every one of them down after the test.'''
+
+    servers = []
+
+    def startServer(**keywordArguments) -> StubTwelveDataServer:
+        servers.append(StubTwelveDataServer(**keywordArguments).__enter__())
+        return (servers[-1])
+
+    yield startServer
+    for i in servers:
+        i.__exit__(None, None, None)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+import backtestKernels as kernels
+from backtestBatch import batchBacktest
+from backtestBenchmarks import syntheticAssetTimeSeries
+from backtestDriver import BacktestDriver
+from backtestStrategy import RollingMinimumStrategy
+
+strategies = [RollingMinimumStrategy(), RollingMinimumStrategy(subframeLength = 9, entryCount = 2, exitIndex = 4)]
+
+
+def unequalSeries(lengths: list[int],
+                  seed: int) -> list[np.ndarray]:
+
+    '''Returns one series per length, ending on the same date, with closes on a coarse tick so that ties with the rolling minimum are common.'''
+
+    allAssetTimeSeries = []
+    for i, j in enumerate(lengths):
+        assetTimeSeries = syntheticAssetTimeSeries(max(lengths), seed = seed + i)[-j:]
+        assetTimeSeries[:, 4] = np.round(assetTimeSeries[:, 4], 1)
+        allAssetTimeSeries.append(assetTimeSeries)
+
+    return (allAssetTimeSeries)
+
+
+@pytest.mark.parametrize('strategy', strategies, ids = repr)
+@pytest.mark.parametrize('seed', range(20))
+def test_batchBacktest_matchesSingleTickerRuns(strategy, seed):
+
+    lengths = np.random.default_rng(seed).integers(5, 400, 3).tolist()
+    allAssetTimeSeries = unequalSeries(lengths, 3 * seed)
+    tickerSymbols = ['A', 'B', 'C']
+    results = batchBacktest(allAssetTimeSeries, tickerSymbols, strategy)
+
+    for i, j in enumerate(tickerSymbols):
+        single = BacktestDriver([j], '1min', lengths[i], assetTimeSeries = allAssetTimeSeries[i], strategy = strategy)
+        singleCodes = single.positionStateCodes()
+        assert np.array_equal(results['stateCodes'][i, results['stateCodes'].shape[1] - len(singleCodes):], singleCodes)
+        assert np.all(results['stateCodes'][i, :results['stateCodes'].shape[1] - len(singleCodes)] == kernels.NO_POSITION)
+        expected = single.tradeSeriesWithPositionIndices()
+        assert np.array_equal(results['tradeSeries'][j].index, expected.index)
+        assert np.allclose(results['tradeSeries'][j].to_numpy(), expected.to_numpy())
+
+
+def test_batchBacktest_knownOffByOneCase():
+
+    # Lengths for which the padded row used to see a full subframe on its own bar subframeLength - 1, one bar before a single-ticker run.
+    allAssetTimeSeries = unequalSeries([189, 174, 135], 0)
+    results = batchBacktest(allAssetTimeSeries, ['A', 'B', 'C'], RollingMinimumStrategy())
+    for i, j in enumerate(['A', 'B', 'C']):
+        single = BacktestDriver([j], '1min', len(allAssetTimeSeries[i]), assetTimeSeries = allAssetTimeSeries[i])
+        trades = results['trades'][results['trades']['ticker'] == j]
+        assert trades['openIndex'].tolist() == single.tradeResults()['orderIndices'][0::2].tolist()
+
+
+def test_batchBacktest_portfolioIndexedByDate():
+
+    allAssetTimeSeries = unequalSeries([300, 250], 7)
+    portfolio = batchBacktest(allAssetTimeSeries, ['A', 'B'], RollingMinimumStrategy())['portfolio']
+
+    assert len(portfolio) == 300
+    assert np.array_equal(portfolio.index.values.astype('datetime64[s]').astype(np.int64), allAssetTimeSeries[0][:, 0].astype(np.int64))
+    assert np.allclose(portfolio['equity'], np.cumprod(1 + portfolio['portfolioReturn']))
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtestBenchmarks import BenchmarkRegression, compareWithBaseline, saveBenchmarkBaseline
+
+
+def suiteResults(rows: list[tuple[str, int, float, int]]) -> pd.DataFrame:
+
+    return (pd.DataFrame([{'case': i, 'numberOfBars': j, 'seconds': k, 'barsPerSecond': j / k, 'peakMemory': l} for i, j, k, l in rows],
+                         columns = ['case', 'numberOfBars', 'seconds', 'barsPerSecond', 'peakMemory']))
+
+
+@pytest.fixture
+def baselinePath(tmp_path):
+
+    path = str(tmp_path / 'baseline.json')
+    saveBenchmarkBaseline(suiteResults([('batcher', 1_000, 0.5, 10_000_000), ('batcher', 10_000, 1.0, 20_000_000), ('positionStates', 1_000, 0.5, 10_000_000)]), path)
+
+    return (path)
+
+
+def test_compareWithBaseline_matchingRows(baselinePath):
+
+    comparison = compareWithBaseline(suiteResults([('batcher', 1_000, 0.55, 10_500_000), ('positionStates', 1_000, 0.45, 9_000_000)]), baselinePath)
+
+    assert len(comparison) == 2
+    assert np.allclose(comparison['timeRatio'], [1.1, 0.9])
+
+
+def test_compareWithBaseline_regression(baselinePath):
+
+    with pytest.raises(BenchmarkRegression, match = 'regressed'):
+        compareWithBaseline(suiteResults([('batcher', 1_000, 1.0, 10_000_000)]), baselinePath)
+
+
+def test_compareWithBaseline_caseMissingFromRun(baselinePath):
+
+    with pytest.raises(BenchmarkRegression, match = 'missing from this run'):
+        compareWithBaseline(suiteResults([('batcher', 10_000, 1.0, 20_000_000), ('positionStates', 1_000, 0.5, 10_000_000)]), baselinePath)
+
+
+def test_compareWithBaseline_caseMissingFromBaseline(baselinePath):
+
+    with pytest.raises(BenchmarkRegression, match = 'missing from the baseline'):
+        compareWithBaseline(suiteResults([('batcher', 1_000, 0.5, 10_000_000), ('drawdownData', 1_000, 0.5, 10_000_000)]), baselinePath)
@@ -0,0 +1,54 @@
+import pytest
+from backtestBenchmarks import syntheticAssetTimeSeries, suiteCases
+from backtestDriver import BacktestDriver
+
+pytest.importorskip('pytest_benchmark')
+
+# The cases of backtestBenchmarks.benchmarkSuite(), timed by pytest-benchmark. Run them with: python -m pytest tests/test_benchmarks.py
+# and compare runs with --benchmark-autosave and --benchmark-compare. --benchmark-skip leaves them out of a test run.
+barCounts = (10_000, 100_000)
+cases = suiteCases()
+
+
+@pytest.fixture(scope = 'module')
+def assetTimeSeries():
+
+    return ({i: syntheticAssetTimeSeries(i) for i in barCounts})
+
+
+@pytest.mark.parametrize('numberOfBars', barCounts)
+@pytest.mark.parametrize('caseName', list(cases))
+def test_suiteCase(benchmark, assetTimeSeries, caseName, numberOfBars):
+
+    prepare, run, maximumBars = cases[caseName]
+    if (maximumBars is not None) and (numberOfBars > maximumBars):
+        pytest.skip(caseName + ' stops at ' + str(maximumBars) + ' bars')
+
+    def preparedBacktest():
+        # Every round runs on a new backtest, so that no cached result is reused, and the preparation is left out of the timing
+        backtest = BacktestDriver(['BENCH'], '1min', numberOfBars, assetTimeSeries = assetTimeSeries[numberOfBars])
+        prepare(backtest)
+        return ((backtest,), {})
+
+    benchmark.group = caseName
+    benchmark.extra_info['numberOfBars'] = numberOfBars
+    benchmark.pedantic(run, setup = preparedBacktest, rounds = 5, warmup_rounds = 1)
+
+
+@pytest.mark.parametrize('maxConcurrency', [1, 8, 32])
+def test_prefetch(benchmark, twelveDataStub, maxConcurrency):
+
+    # A concurrency of 1 sends the requests one after another, as the blocking path through claydates does. The stub runs in this
+    # process, so parsing the responses and serving them share one core, which bounds the speedup at low latencies.
+    from backtestPrefetch import AsyncPrefetcher
+
+    tickerSymbols = ['B' + str(i) for i in range(32)]
+    server = twelveDataStub(latency = 0.25)
+    for i in tickerSymbols:
+        server.timeSeriesBody(i, 5_000)
+
+    def newPrefetcher():
+        return ((AsyncPrefetcher(apiKey = 'stub', baseUrl = server.url, maxConcurrency = maxConcurrency, requestsPerMinute = 1e9),), {})
+
+    benchmark.group = 'prefetch'
+    benchmark.pedantic(lambda prefetcher: prefetcher.prefetch([(i, '1min', 5_000) for i in tickerSymbols]), setup = newPrefetcher, rounds = 1)
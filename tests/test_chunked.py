@@ -0,0 +1,32 @@
+import os
+import numpy as np
+import pytest
+from backtestBenchmarks import syntheticAssetTimeSeries
+from backtestChunked import chunkedBacktest, barSeriesBlocks
+from backtestDriver import BacktestDriver
+from backtestExecution import ExecutionModel
+from backtestStrategy import RollingMinimumStrategy
+
+
+@pytest.fixture(scope = 'module')
+def assetTimeSeries():
+
+    assetTimeSeries = syntheticAssetTimeSeries(10_000, 1)
+    assetTimeSeries[:, 4] = np.round(assetTimeSeries[:, 4], 1)
+
+    return (assetTimeSeries)
+
+
+@pytest.mark.parametrize('blockLength', [1, 7, 100, 4096, 10_000])
+@pytest.mark.parametrize('executionModel', [None, ExecutionModel(commissionRate = 0.0001, commissionPerOrder = 1.0, impactCoefficient = 0.1, fillAt = 'nextOpen', positionSize = 0.5)], ids = repr)
+@pytest.mark.parametrize('strategy', [RollingMinimumStrategy(), RollingMinimumStrategy(subframeLength = 9, entryCount = 2, exitIndex = 4)], ids = repr)
+def test_chunkedBacktest_matchesInMemory(tmp_path, assetTimeSeries, strategy, executionModel, blockLength):
+
+    # Blocks both shorter and longer than the strategy's lookback
+    stateCodesPath = os.path.join(tmp_path, 'stateCodes')
+    backtest = BacktestDriver(['SYNTHETIC'], '1min', len(assetTimeSeries), assetTimeSeries = assetTimeSeries, strategy = strategy, executionModel = executionModel)
+    chunked = chunkedBacktest(barSeriesBlocks(assetTimeSeries, blockLength), strategy, executionModel, stateCodesPath)
+
+    assert np.array_equal(np.fromfile(stateCodesPath, dtype = np.uint8), backtest.positionStateCodes())
+    assert np.array_equal(chunked['tradeRecords'], backtest.tradeRecords())
+    assert np.array_equal(chunked['equityReturns'], backtest.tradeResults()['equityReturns'])
@@ -0,0 +1,173 @@
+import json
+import os
+import time
+import numpy as np
+import pytest
+from backtestBenchmarks import syntheticAssetTimeSeries
+from backtestData import BarSeries, CachedDataSource, DataSource, FileDataSource
+from backtestDriver import BacktestDriver
+
+
+class ArraySource(DataSource):
+
+    '''Serves the most recent bars of one array for every ticker symbol, and records the numberOfUnits of each call.'''
+
+    def __init__(self,
+                 bars: np.ndarray) -> None:
+
+        self.bars = bars
+        self.calls = []
+
+
+    def fetch(self,
+              tickerSymbols: list[str],
+              tickInterval: str,
+              numberOfUnits: int) -> list[np.ndarray]:
+
+        self.calls.append(numberOfUnits)
+
+        return ([self.bars[-numberOfUnits:].copy() for _ in tickerSymbols])
+
+
+def ageEntry(cache: CachedDataSource,
+             tickerSymbol: str,
+             tickInterval: str,
+             seconds: float) -> None:
+
+    '''Moves the fetch time of a cached entry back by seconds, so that it is stale on its next access.'''
+
+    metadataPath = os.path.join(cache.entryPath(tickerSymbol, tickInterval), 'metadata.json')
+    with open(metadataPath) as metadataFile:
+        metadata = json.load(metadataFile)
+    metadata['fetchedAt'] -= seconds
+    with open(metadataPath, 'w') as metadataFile:
+        json.dump(metadata, metadataFile)
+
+
+@pytest.fixture(params = [np.float64, np.float32])
+def bars(request):
+
+    return (BarSeries.fromArray(syntheticAssetTimeSeries(20), request.param))
+
+
+@pytest.mark.parametrize('key', [5, -1, np.int64(3), (slice(None), 4), (slice(None), slice(1, 3)), (slice(2, 7), slice(1, 5)), (5, slice(1, 3)),
+                                 (5, 4), (slice(None), [0, 4]), (slice(None), slice(7, 9))])
+def test_getitem_matchesArray(bars, key):
+
+    assert np.array_equal(bars[key], bars.toArray()[key])
+
+
+def test_getitem_rowsReturnBarSeries(bars):
+
+    assert isinstance(bars[2:5], BarSeries)
+    assert isinstance(bars[bars.close > 100], BarSeries)
+    assert np.array_equal(bars['close'], bars.close)
+
+
+def test_getitem_invalidKeys(bars):
+
+    with pytest.raises(IndexError):
+        bars[1, 2, 3]
+    with pytest.raises(IndexError):
+        bars[:, [7]]
+    with pytest.raises(IndexError):
+        bars[20]
+
+
+def test_array_copy(bars):
+
+    assert np.array_equal(np.asarray(bars), bars.toArray())
+    assert np.asarray(bars, dtype = np.float32).dtype == np.float32
+    assert np.array_equal(np.array(bars, copy = True), bars.toArray())
+    with pytest.raises(ValueError):
+        np.asarray(bars, copy = False)
+
+
+def test_cachedDataSource_memoryMappedSeriesSurvivesRefresh(tmp_path):
+
+    allBars = syntheticAssetTimeSeries(1_000)
+    source = ArraySource(allBars[:800])
+    cache = CachedDataSource(source, str(tmp_path), timeToLive = 60.0, memoryMapped = True)
+    held = cache.fetch(['SYNTHETIC'], '1min', 800)[0]
+    expected = held.toArray()
+
+    source.bars = allBars
+    ageEntry(cache, 'SYNTHETIC', '1min', 3 * 3600)
+    refreshed = cache.fetch(['SYNTHETIC'], '1min', 800)[0]
+
+    assert np.array_equal(held.toArray(), expected)
+    assert np.array_equal(refreshed.toArray(), allBars[-800:])
+    assert sorted(os.listdir(tmp_path)) == ['SYNTHETIC_1min']
+
+
+def test_cachedDataSource_hit(tmp_path):
+
+    source = ArraySource(syntheticAssetTimeSeries(1_000))
+    cache = CachedDataSource(source, str(tmp_path))
+    first = cache.fetch(['SYNTHETIC'], '1min', 500)[0]
+    second = cache.fetch(['SYNTHETIC'], '1min', 300)[0]
+
+    assert source.calls == [500]
+    assert np.array_equal(first, source.bars[-500:])
+    assert np.array_equal(second, source.bars[-300:])
+
+
+def test_cachedDataSource_staleTopUp(tmp_path):
+
+    allBars = syntheticAssetTimeSeries(1_000)
+    source = ArraySource(allBars[:800])
+    cache = CachedDataSource(source, str(tmp_path), timeToLive = 60.0)
+    cache.fetch(['SYNTHETIC'], '1min', 800)
+    source.bars = allBars[:820]
+    ageEntry(cache, 'SYNTHETIC', '1min', 30 * 60)
+    topped = cache.fetch(['SYNTHETIC'], '1min', 100)[0]
+
+    assert (len(source.calls) == 2) and (source.calls[0] == 800) and (31 <= source.calls[1] < 100)
+    assert np.array_equal(topped, allBars[720:820])
+    assert np.array_equal(cache.readEntry('SYNTHETIC', '1min')[0].toArray(), allBars[:820])
+
+
+def test_cachedDataSource_staleEntryNeverShrinks(tmp_path):
+
+    allBars = syntheticAssetTimeSeries(12_000)
+    source = ArraySource(allBars[:10_000])
+    cache = CachedDataSource(source, str(tmp_path), timeToLive = 60.0)
+    cache.fetch(['SYNTHETIC'], '1min', 10_000)
+
+    ageEntry(cache, 'SYNTHETIC', '1min', 2 * 3600)
+    assert np.array_equal(cache.fetch(['SYNTHETIC'], '1min', 100)[0], allBars[9_900:10_000])
+    assert len(cache.readEntry('SYNTHETIC', '1min')[0]) == 10_000
+
+    source.bars = allBars # The tail that a top-up fetches no longer reaches the cached bars, so the entry is fetched again
+    ageEntry(cache, 'SYNTHETIC', '1min', 2 * 3600)
+    assert np.array_equal(cache.fetch(['SYNTHETIC'], '1min', 100)[0], allBars[-100:])
+    assert np.array_equal(cache.readEntry('SYNTHETIC', '1min')[0].toArray(), allBars[-10_000:])
+    assert (len(source.calls) == 4) and (source.calls[0] == source.calls[3] == 10_000) and (121 <= source.calls[1] < 200) and (121 <= source.calls[2] < 200)
+
+
+def test_cachedDataSource_offline(tmp_path):
+
+    source = ArraySource(syntheticAssetTimeSeries(1_000))
+    CachedDataSource(source, str(tmp_path)).fetch(['SYNTHETIC'], '1min', 500)
+    offlineCache = CachedDataSource(source, str(tmp_path), offline = True)
+
+    assert np.array_equal(offlineCache.fetch(['SYNTHETIC'], '1min', 200)[0], source.bars[-200:])
+    with pytest.raises(LookupError):
+        offlineCache.fetch(['SYNTHETIC'], '1min', 600)
+    assert source.calls == [500]
+
+
+def test_fileDataSource_throughDriver(tmp_path):
+
+    assetTimeSeries = syntheticAssetTimeSeries(2_000, seed = 3)
+    assetTimeSeries[:, 4] = np.round(assetTimeSeries[:, 4], 1)
+    fileSource = FileDataSource(str(tmp_path / 'bars'))
+    fileSource.writeBars('SYNTHETIC', '1min', assetTimeSeries)
+    cache = CachedDataSource(fileSource, str(tmp_path / 'cache'))
+
+    reference = BacktestDriver(['SYNTHETIC'], '1min', 1_500, assetTimeSeries = assetTimeSeries[-1_500:])
+    for dataSource in (fileSource, cache, cache):
+        backtest = BacktestDriver(['SYNTHETIC'], '1min', 1_500, dataSource = dataSource)
+        assert np.array_equal(backtest._allAssetTimeSeries[0], assetTimeSeries[-1_500:])
+        assert np.array_equal(backtest.tradeRecords(), reference.tradeRecords())
+    assert fileSource._fetchCount == 2
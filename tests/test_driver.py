@@ -0,0 +1,22 @@
+import pytest
+from backtestBenchmarks import syntheticAssetTimeSeries
+
+
+def test_plotsAndLogEvaluateStrategyOnce():
+
+    matplotlib = pytest.importorskip('matplotlib')
+    matplotlib.use('Agg')
+    from backtestPlotter import BacktestPlotter
+    from backtestMetrics import BacktestMetrics
+    from backtestRates import ConstantRateProvider
+
+    class BacktestReport(BacktestPlotter, BacktestMetrics):
+        pass
+
+    backtest = BacktestReport(['SYNTHETIC'], '1min', 5_000, assetTimeSeries = syntheticAssetTimeSeries(5_000), rateProvider = ConstantRateProvider(0.0))
+    backtest.plotIndividualTrades()
+    backtest.cumulativeSeriesPlot()
+    backtest.drawdownPlot()
+    backtest.composeLog()
+
+    assert backtest._strategyEvaluations == 1
@@ -0,0 +1,95 @@
+import math
+import numpy as np
+import pytest
+from backtestExecution import ExecutionModel
+from backtestStrategy import PriceColumns
+
+
+def priceColumns(closes: list[float],
+                 opens: list[float] = None,
+                 volumes: list[float] = None) -> PriceColumns:
+
+    columns = {'close': np.array(closes, dtype = np.float64),
+               'open': np.array(opens if (opens is not None) else closes, dtype = np.float64),
+               'volume': np.array(volumes if (volumes is not None) else [np.nan] * len(closes), dtype = np.float64)}
+
+    return (PriceColumns(lambda name: columns[name]))
+
+
+def test_defaultModelIsFrictionless():
+
+    results = ExecutionModel().execute(priceColumns([100.0, 110.0, 105.0, 120.0]), np.array([0, 1, 2, 3]))
+
+    assert np.allclose(results['netReturns'], [0.1, 120 / 105 - 1])
+    assert np.allclose(results['equity'], [110_000.0, 110_000.0 * 120 / 105])
+
+
+def test_costs():
+
+    model = ExecutionModel(commissionRate = 0.001, commissionPerOrder = 5.0, spreadBps = 10.0, slippageBps = 2.0, positionSize = 0.5, initialCapital = 10_000.0)
+    results = model.execute(priceColumns([100.0, 110.0, 105.0, 120.0, 90.0]), np.array([0, 1, 2, 3]))
+
+    # Half the 10 bps spread plus 2 bps slippage is paid on each fill
+    entryPrices = [100.0 * 1.0007, 105.0 * 1.0007]
+    exitPrices = [110.0 * 0.9993, 120.0 * 0.9993]
+    returnsBeforeFixedCosts = [exitPrices[i] * 0.999 / (entryPrices[i] * 1.001) - 1 for i in range(2)]
+    firstEquity = 10_000.0 * (1 + 0.5 * returnsBeforeFixedCosts[0]) - 10.0
+    secondEquity = firstEquity * (1 + 0.5 * returnsBeforeFixedCosts[1]) - 10.0
+
+    assert np.allclose(results['entryPrices'], entryPrices)
+    assert np.allclose(results['exitPrices'], exitPrices)
+    assert np.allclose(results['grossReturns'], [0.1, 120 / 105 - 1])
+    assert np.allclose(results['equity'], [firstEquity, secondEquity])
+    assert np.allclose(results['equityReturns'], [firstEquity / 10_000.0 - 1, secondEquity / firstEquity - 1])
+    assert np.allclose(results['netReturns'], 2 * results['equityReturns'])
+
+
+def test_nextOpenDropsTradeClosingOnLastBar():
+
+    model = ExecutionModel(fillAt = 'nextOpen')
+    results = model.execute(priceColumns([100.0, 101.0, 102.0, 103.0, 104.0], opens = [99.0, 100.5, 101.5, 102.5, 103.5]), np.array([0, 2, 3, 4]))
+
+    assert results['kept'].tolist() == [True, False]
+    assert results['entryIndices'].tolist() == [1]
+    assert results['exitIndices'].tolist() == [3]
+    assert np.allclose(results['netReturns'], [102.5 / 100.5 - 1])
+
+
+def test_volumeImpactWithZeroAndNaNVolume():
+
+    model = ExecutionModel(impactCoefficient = 0.1, initialCapital = 10_000.0)
+    prices = priceColumns([100.0, 100.0, 100.0, 100.0], volumes = [1_000.0, 0.0, np.nan, 400.0])
+
+    # The order is worth 10,000 against 100,000 and 40,000 traded on the bars with volume
+    assert np.allclose(model.fillCosts(prices, np.arange(4)), [0.1 * math.sqrt(0.1), 0.0, 0.0, 0.1 * math.sqrt(0.25)])
+    results = model.execute(prices, np.array([0, 1, 2, 3]))
+    assert np.allclose(results['entryPrices'], [100.0 * (1 + 0.1 * math.sqrt(0.1)), 100.0])
+    assert np.allclose(results['exitPrices'], [100.0, 100.0 * (1 - 0.05)])
+
+
+def test_ruinedEquityStaysAtZero():
+
+    model = ExecutionModel(positionSize = 2.0, initialCapital = 1_000.0)
+    results = model.execute(priceColumns([100.0, 110.0, 100.0, 40.0, 50.0, 60.0]), np.array([0, 1, 2, 3, 4, 5]))
+
+    # The second trade loses 60% with twice the equity committed, which uses up more than the equity
+    assert np.allclose(results['equity'], [1_200.0, 0.0, 0.0])
+    assert np.allclose(results['netReturns'], [0.1, -0.5, 0.0])
+    assert np.allclose(results['equityReturns'], [0.2, -1.0, 0.0])
+
+
+def test_fixedCommissionsCanRuin():
+
+    model = ExecutionModel(commissionPerOrder = 30.0, initialCapital = 100.0)
+    results = model.execute(priceColumns([100.0, 100.0, 100.0, 100.0, 100.0, 100.0]), np.array([0, 1, 2, 3, 4, 5]))
+
+    assert np.allclose(results['equity'], [40.0, 0.0, 0.0])
+    assert np.allclose(results['netReturns'], [-0.6, -1.0, 0.0])
+
+
+def test_invalidArguments():
+
+    with pytest.raises(ValueError):
+        ExecutionModel(fillAt = 'open')
+    with pytest.raises(ValueError):
+        ExecutionModel(positionSize = 0.0)
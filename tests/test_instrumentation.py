@@ -0,0 +1,116 @@
+import tracemalloc
+import pytest
+from backtestInstrumentation import Instrumentation, instrumented, instrumentedStage
+
+
+class Pipeline:
+
+    '''A minimal stand-in for BacktestDriver, whose instrumented methods call one another.'''
+
+    def __init__(self,
+                 instrumentation: Instrumentation) -> None:
+
+        self._instrumentation = instrumentation
+
+
+    @instrumented
+    def run(self) -> int:
+
+        return (self.load() + self.load() + self.compute())
+
+
+    @instrumented
+    def load(self) -> int:
+
+        return (1)
+
+
+    @instrumented
+    def compute(self) -> int:
+
+        return (self.load())
+
+
+    @instrumented
+    def fail(self) -> None:
+
+        with self._instrumentation.stage('inner'):
+            raise RuntimeError('stage failed')
+
+
+def test_instrumented_recordsNestedPathsAndCalls():
+
+    instrumentation = Instrumentation()
+    pipeline = Pipeline(instrumentation)
+    assert pipeline.run() == 3
+    assert pipeline.run() == 3
+    report = instrumentation.report()
+
+    assert report.index.tolist() == ['run', 'run/load', 'run/compute', 'run/compute/load']
+    assert report['calls'].tolist() == [2, 4, 2, 2]
+    assert report['peakMemory'].isna().all()
+    assert report.loc['run', 'wallShare'] == pytest.approx(1.0)
+    assert report.loc['run', 'wallTime'] >= report.loc['run/compute', 'wallTime']
+
+
+def test_stage_countsRepeatedStages():
+
+    instrumentation = Instrumentation()
+    with instrumentation.stage('fetch'):
+        with instrumentedStage(instrumentation, 'parse'):
+            pass
+    with instrumentation.stage('fetch'):
+        pass
+
+    assert [(i['stage'], i['calls']) for i in instrumentation.records()] == [('fetch', 2), ('fetch/parse', 1)]
+
+
+def test_instrumentedStage_withoutInstrumentation():
+
+    with instrumentedStage(None, 'fetch'):
+        pass
+
+    assert Pipeline(None).run() == 3
+
+
+def test_trackMemory_recordsPeaks():
+
+    instrumentation = Instrumentation(trackMemory = True)
+    with instrumentation.stage('outer'):
+        allocation = bytearray(8_000_000)
+        del allocation
+        with instrumentation.stage('allocate'):
+            allocation = bytearray(2_000_000)
+            del allocation
+        with instrumentation.stage('idle'):
+            pass
+    report = instrumentation.report()
+
+    # The peak of the outer stage came before its nested stages reset tracemalloc's peak
+    assert report.loc['outer', 'peakMemory'] >= 8_000_000
+    assert 2_000_000 <= report.loc['outer/allocate', 'peakMemory'] < 4_000_000
+    assert report.loc['outer/idle', 'peakMemory'] < 1_000_000
+    assert not tracemalloc.is_tracing()
+
+
+def test_trackMemory_stopsTracingWhenStageRaises():
+
+    instrumentation = Instrumentation(trackMemory = True)
+    with pytest.raises(RuntimeError):
+        Pipeline(instrumentation).fail()
+
+    assert not tracemalloc.is_tracing()
+    assert instrumentation._openStages == []
+    assert [(i['stage'], i['calls']) for i in instrumentation.records()] == [('fail', 1), ('fail/inner', 1)]
+
+
+def test_trackMemory_leavesTracingStartedElsewhere():
+
+    tracemalloc.start()
+    try:
+        instrumentation = Instrumentation(trackMemory = True)
+        with pytest.raises(RuntimeError):
+            Pipeline(instrumentation).fail()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+matplotlib = pytest.importorskip('matplotlib')
+matplotlib.use('Agg')
+from backtestPlotter import envelopeIndices, largestTriangleThreeBucketsIndices, positionIntervals
+
+
+def spikyWalk(numberOfValues: int,
+              seed: int) -> np.ndarray:
+
+    '''Returns a random walk with a few isolated spikes in both directions, the points that downsampling most easily drops.'''
+
+    rng = np.random.default_rng(seed)
+    values = np.cumsum(rng.standard_normal(numberOfValues))
+    spikes = rng.integers(0, numberOfValues, 6)
+    values[spikes] += rng.choice([-50.0, 50.0], 6)
+
+    return (values)
+
+
+def assertKeepsExtremesAndEnds(values: np.ndarray,
+                               keptIndices: np.ndarray) -> None:
+
+    assert np.all(np.diff(keptIndices) > 0)
+    assert keptIndices[0] == 0
+    assert keptIndices[-1] == len(values) - 1
+    assert np.nanargmin(values) in keptIndices
+    assert np.nanargmax(values) in keptIndices
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_envelopeIndices_keepsExtremesAndEnds(seed):
+
+    rng = np.random.default_rng(seed)
+    values = spikyWalk(int(rng.integers(500, 50_000)), seed)
+    maximumPoints = int(rng.integers(4, 2_000))
+    keptIndices = envelopeIndices(values, maximumPoints)
+
+    assertKeepsExtremesAndEnds(values, keptIndices)
+    assert len(keptIndices) <= maximumPoints + 2
+
+
+def test_envelopeIndices_keepsEveryBucketsEnvelope():
+
+    values = spikyWalk(10_000, 0)
+    keptIndices = envelopeIndices(values, 200)
+    for i in range(0, len(values), 100):
+        assert (i + np.argmin(values[i:i + 100])) in keptIndices
+        assert (i + np.argmax(values[i:i + 100])) in keptIndices
+
+
+def test_envelopeIndices_skipsNaN():
+
+    values = spikyWalk(5_000, 1)
+    values[::7] = np.nan
+    keptIndices = envelopeIndices(values, 100)
+
+    assertKeepsExtremesAndEnds(values, keptIndices)
+    assert not np.any(np.isnan(values[keptIndices[1:-1]]))
+
+
+def test_envelopeIndices_shortSeriesInFull():
+
+    assert np.array_equal(envelopeIndices(np.arange(10.0), 10), np.arange(10))
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_largestTriangleThreeBucketsIndices_keepsExtremesAndEnds(seed):
+
+    rng = np.random.default_rng(seed)
+    values = spikyWalk(int(rng.integers(500, 50_000)), seed)
+    maximumPoints = int(rng.integers(3, 2_000))
+    keptIndices = largestTriangleThreeBucketsIndices(values, maximumPoints)
+
+    assertKeepsExtremesAndEnds(values, keptIndices)
+    assert maximumPoints <= len(keptIndices) <= maximumPoints + 1
+
+
+def test_largestTriangleThreeBucketsIndices_extremesInOneBucket():
+
+    values = np.zeros(1_000)
+    values[500], values[501] = -1.0, 1.0
+    keptIndices = largestTriangleThreeBucketsIndices(values, 10)
+
+    assertKeepsExtremesAndEnds(values, keptIndices)
+    assert len(keptIndices) == 11
+
+
+@pytest.mark.parametrize('minimumGap', [0, 1, 3, 10])
+@pytest.mark.parametrize('seed', range(10))
+def test_positionIntervals_coverEveryHeldBar(seed, minimumGap):
+
+    positionOpen = np.random.default_rng(seed).random(2_000) < 0.6
+    starts, stops = positionIntervals(positionOpen, minimumGap)
+    covered = np.zeros(len(positionOpen), dtype = bool)
+    for i, j in zip(starts, stops):
+        covered[i:j + 1] = True
+
+    assert np.all(covered[positionOpen])
+    assert np.all(positionOpen[starts]) and np.all(positionOpen[stops])
+    assert np.all(starts <= stops)
+    # Intervals are in order, and only gaps wider than minimumGap are left between them
+    assert np.all((starts[1:] - stops[:-1]) > max(minimumGap, 1))
+    if (minimumGap == 0):
+        assert np.array_equal(covered, positionOpen)
+
+
+def test_positionIntervals_edges():
+
+    starts, stops = positionIntervals(np.array([True, True, False, False, True]))
+    assert starts.tolist() == [0, 4] and stops.tolist() == [1, 4]
+
+    starts, stops = positionIntervals(np.zeros(5, dtype = bool))
+    assert len(starts) == 0 and len(stops) == 0
@@ -0,0 +1,73 @@
+import asyncio
+import numpy as np
+import pytest
+from backtestDriver import BacktestDriver
+from backtestPrefetch import AsyncPrefetcher
+from twelveDataStub import StubTwelveDataServer
+
+numberOfUnits = 500
+
+
+def test_prefetch_seriesArriveIntactWithinConcurrency(twelveDataStub):
+
+    tickerSymbols = ['T' + str(i) for i in range(20)] + ['EUR/USD']
+    requests = [(i, j, numberOfUnits) for i in tickerSymbols for j in ('1min', '5min')]
+    server = twelveDataStub(latency = 0.02, failures = {'T0': [429], 'T1': [503, 503]})
+    prefetcher = AsyncPrefetcher(apiKey = 'stub', baseUrl = server.url, maxConcurrency = 4, requestsPerMinute = 60_000, retryDelay = 0.01)
+    prefetched = prefetcher.prefetch(requests)
+
+    for (tickerSymbol, _, _), bars in prefetched.items():
+        assert np.array_equal(bars, StubTwelveDataServer.expectedBars(tickerSymbol, numberOfUnits), equal_nan = True)
+    assert server.maximumInFlight() <= 4
+    assert prefetcher.requestCount() == len(requests) + 3 # One retry for T0 and two for T1
+
+
+def test_prefetch_servesDriver(twelveDataStub):
+
+    server = twelveDataStub(latency = 0.0)
+    prefetcher = AsyncPrefetcher(apiKey = 'stub', baseUrl = server.url, requestsPerMinute = 60_000)
+    prefetcher.prefetch([(i, '5min', numberOfUnits) for i in ('T2', 'T3')])
+    backtest = BacktestDriver(['T2', 'T3'], '5min', numberOfUnits, dataSource = prefetcher)
+    reference = BacktestDriver(['T2', 'T3'], '5min', numberOfUnits, assetTimeSeries = [StubTwelveDataServer.expectedBars(i, numberOfUnits) for i in ('T2', 'T3')])
+
+    assert np.array_equal(backtest.tradeRecords(), reference.tradeRecords())
+    assert prefetcher.requestCount() == 2
+
+
+def test_prefetch_failures(twelveDataStub):
+
+    server = twelveDataStub(latency = 0.0, failures = {'MISSING': [404], 'DOWN': [503] * 3})
+    with pytest.raises(LookupError):
+        AsyncPrefetcher(apiKey = 'stub', baseUrl = server.url, retryDelay = 0.01).prefetch([('MISSING', '1min', 10)])
+    with pytest.raises(ConnectionError):
+        AsyncPrefetcher(apiKey = 'stub', baseUrl = server.url, maxRetries = 2, retryDelay = 0.01).prefetch([('DOWN', '1min', 10)])
+
+
+def test_prefetch_tokenBucketPacesRequests(twelveDataStub):
+
+    server = twelveDataStub(latency = 0.0)
+    AsyncPrefetcher(apiKey = 'stub', baseUrl = server.url, maxConcurrency = 8, requestsPerMinute = 1200, burst = 5).prefetch([('P' + str(i), '1min', 10) for i in range(25)])
+    requestTimes = np.sort(server.requestTimes())
+
+    # 20 requests per second after a burst of 5
+    assert (requestTimes[-1] - requestTimes[0]) >= 0.9 * 20 / 20
+    assert np.all((requestTimes[10:] - requestTimes[:-10]) >= 0.9 * (10 - 5) / 20)
+
+
+def test_fetch_matchesDates(twelveDataStub):
+
+    server = twelveDataStub(latency = 0.0)
+    matchedBars = AsyncPrefetcher(apiKey = 'stub', baseUrl = server.url, requestsPerMinute = 60_000).fetch(['T2', 'GAP'], '5min', numberOfUnits)
+
+    assert np.array_equal(matchedBars[0], StubTwelveDataServer.expectedBars('T2', numberOfUnits)[(np.arange(numberOfUnits) % 7) != 3])
+    assert np.array_equal(matchedBars[1], StubTwelveDataServer.expectedBars('GAP', numberOfUnits))
+
+
+def test_prefetch_insideRunningEventLoop(twelveDataStub):
+
+    server = twelveDataStub(latency = 0.0)
+
+    async def prefetchInRunningLoop() -> dict:
+        return (AsyncPrefetcher(apiKey = 'stub', baseUrl = server.url).prefetch([('T4', '1min', numberOfUnits)]))
+
+    assert np.array_equal(asyncio.run(prefetchInRunningLoop())[('T4', '1min', numberOfUnits)], StubTwelveDataServer.expectedBars('T4', numberOfUnits))
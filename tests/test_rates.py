@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtestRates import ConstantRateProvider, TableRateProvider, annualRiskFreeRate, periodRiskFreeReturn
+
+
+class PublishingFetcher:
+
+    '''Stands in for TreasuryRateFetcher. Publishes a fixed rate for every business day up to publishedThrough, and records each request.'''
+
+    def __init__(self,
+                 publishedThrough: str) -> None:
+
+        self.publishedThrough = pd.Timestamp(publishedThrough)
+        self.rate = 4.0
+        self.requests = []
+
+
+    def fetchMonth(self,
+                   month: pd.Period) -> pd.DataFrame:
+
+        self.requests.append(month)
+        dates = pd.bdate_range(month.start_time, min(month.end_time, self.publishedThrough))
+
+        return (pd.DataFrame({'Date': dates, 'Rate': self.rate}))
+
+
+def tableProvider(tmp_path,
+                  fetcher: PublishingFetcher,
+                  today: str) -> TableRateProvider:
+
+    '''Returns a TableRateProvider on a fresh table in tmp_path, whose clock is fixed at today.'''
+
+    provider = TableRateProvider(str(tmp_path / 'rates.csv'), fetcher = fetcher)
+    provider.today = lambda: pd.Timestamp(today)
+
+    return (provider)
+
+
+def test_periodRiskFreeReturn_constantRateOverOneYear():
+
+    dates = np.array(['2020-01-01', '2021-01-01'], dtype = 'datetime64[ns]')
+    dates[1] = dates[0] + np.timedelta64(int(365.25 * 86400), 's')
+
+    assert periodRiskFreeReturn(dates, np.array([0.04, 0.04])) == pytest.approx(0.04)
+
+
+def test_periodRiskFreeReturn_eachGapAccruesAtItsOpeningRate():
+
+    dates = np.array(['2020-01-01', '2020-01-11', '2020-01-12', '2020-03-01'], dtype = 'datetime64[ns]')
+    rates = np.array([0.02, 0.05, 0.03, 0.50])
+    expected = (1.02 ** (10 / 365.25)) * (1.05 ** (1 / 365.25)) * (1.03 ** (49 / 365.25)) - 1
+
+    assert periodRiskFreeReturn(dates, rates) == pytest.approx(expected)
+
+
+def test_periodRiskFreeReturn_singleDateEarnsNothing():
+
+    assert periodRiskFreeReturn(np.array(['2020-01-01'], dtype = 'datetime64[ns]'), np.array([0.04])) == 0.0
+
+
+def test_annualRiskFreeRate_constantRate():
+
+    dates = pd.date_range('2020-01-01', periods = 500, freq = 'B').values
+
+    assert annualRiskFreeRate(dates, ConstantRateProvider(0.03)) == pytest.approx(0.03)
+
+
+def test_annualRiskFreeRate_compoundsToPeriodReturn(tmp_path):
+
+    pd.DataFrame({'Date': pd.to_datetime(['2020-01-01', '2020-07-01']), 'Rate': [2.0, 6.0]}).to_csv(tmp_path / 'rates.csv', index = False)
+    provider = TableRateProvider(str(tmp_path / 'rates.csv'))
+    dates = pd.date_range('2020-01-01', '2021-06-30', freq = 'D').values
+    years = (dates[-1] - dates[0]) / np.timedelta64(1, 'D') / 365.25
+    rate = annualRiskFreeRate(dates, provider)
+
+    assert 0.02 < rate < 0.06
+    assert (1 + rate) ** years - 1 == pytest.approx(periodRiskFreeReturn(dates, provider.alignedRates(dates)))
+
+
+def test_annualRiskFreeRate_zeroSpanTakesRateOnFirstDate(tmp_path):
+
+    pd.DataFrame({'Date': pd.to_datetime(['2020-01-01', '2020-07-01']), 'Rate': [2.0, 6.0]}).to_csv(tmp_path / 'rates.csv', index = False)
+    dates = np.array(['2020-08-03', '2020-08-03'], dtype = 'datetime64[ns]')
+
+    assert annualRiskFreeRate(dates, TableRateProvider(str(tmp_path / 'rates.csv'))) == pytest.approx(0.06)
+
+
+def test_tableRateProvider_topsUpPartlyPublishedMonth(tmp_path):
+
+    fetcher = PublishingFetcher('2024-03-08')
+    provider = tableProvider(tmp_path, fetcher, '2024-03-08')
+    assert provider.rateOn(np.datetime64('2024-03-08')) == pytest.approx(0.04)
+    assert provider.rateOn(np.datetime64('2024-03-20')) == pytest.approx(0.04)
+    assert fetcher.requests == [pd.Period('2024-03', 'M')]
+
+    # On a later day, the rest of March has been published at a different rate
+    fetcher.publishedThrough = pd.Timestamp('2024-03-22')
+    fetcher.rate = 5.0
+    provider.today = lambda: pd.Timestamp('2024-03-22')
+
+    assert provider.rateOn(np.datetime64('2024-03-20')) == pytest.approx(0.05)
+    assert fetcher.requests == [pd.Period('2024-03', 'M')] * 2
+    assert pd.read_csv(tmp_path / 'rates.csv', parse_dates = ['Date'])['Date'].max() == pd.Timestamp('2024-03-22')
+
+
+def test_tableRateProvider_fetchesCompleteMonthsOnce(tmp_path):
+
+    fetcher = PublishingFetcher('2024-03-08')
+    provider = tableProvider(tmp_path, fetcher, '2024-03-08')
+    dates = pd.date_range('2024-01-02', '2024-03-08', freq = 'B').values
+    provider.alignedRates(dates)
+    assert fetcher.requests == [pd.Period(i, 'M') for i in ('2024-01', '2024-02', '2024-03')]
+
+    # A new provider reading the stored table only needs the running month, and only on a later day
+    provider = tableProvider(tmp_path, fetcher, '2024-03-08')
+    provider.alignedRates(dates)
+    provider.today = lambda: pd.Timestamp('2024-03-11')
+    provider.alignedRates(pd.date_range('2024-01-02', '2024-03-11', freq = 'B').values)
+    provider.alignedRates(pd.date_range('2024-01-02', '2024-03-11', freq = 'B').values)
+
+    assert fetcher.requests[3:] == [pd.Period('2024-03', 'M')]
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+import backtestStatistics
+from backtestBenchmarks import syntheticAssetTimeSeries
+from backtestMetrics import BacktestMetrics
+from backtestRates import ConstantRateProvider
+from backtestStatistics import asReturnMatrix, returnStatistics, statisticNames, statisticsLoop, statisticsNumpy
+
+implementations = [statisticsLoop, statisticsNumpy] + ([backtestStatistics.statisticsCompiled] if (backtestStatistics.statisticsCompiled is not None) else [])
+
+
+def pandasStatistics(returns: np.ndarray,
+                     riskFreeReturn: float) -> list[float]:
+
+    '''The statistics of one return series computed with pandas, the way they were computed in notebooks before the vectorized engine.'''
+
+    returns = pd.Series(returns).dropna()
+    if (len(returns) == 0):
+        return ([0.0, 0.0, np.nan, np.nan, np.nan, np.nan, np.nan, 0.0])
+    equity = (1 + returns).cumprod()
+    peaks = equity.cummax().clip(lower = 1.0)
+    grossLoss = -returns[returns <= 0].sum()
+
+    return ([float(len(returns)),
+             equity.iloc[-1] - 1,
+             returns.mean(),
+             returns.std(ddof = 1),
+             np.sqrt(((returns - riskFreeReturn).clip(upper = 0.0) ** 2).mean()),
+             (returns > 0).mean(),
+             (returns[returns > 0].sum() / grossLoss) if (grossLoss > 0) else np.inf,
+             min(((equity - peaks) / peaks).min(), 0.0)])
+
+
+def returnSeriesCases() -> dict[str, np.ndarray | list[np.ndarray]]:
+
+    generator = np.random.default_rng(0)
+
+    return ({'1-D': generator.normal(0.001, 0.02, 500),
+             '2-D': generator.normal(0.0, 0.01, (6, 300)),
+             'ragged': [generator.normal(0.0, 0.01, i) for i in (300, 1, 0, 57)],
+             'empty': np.empty(0),
+             'all NaN': np.full((2, 40), np.nan),
+             'single return': np.array([0.05]),
+             'no losses': np.array([0.01, 0.02, 0.03])})
+
+
+@pytest.mark.parametrize('implementation', implementations, ids = lambda i: i.__name__ if hasattr(i, '__name__') else 'statisticsCompiled')
+@pytest.mark.parametrize('caseName', list(returnSeriesCases()))
+def test_statistics_matchPandas(implementation, caseName):
+
+    returnMatrix = asReturnMatrix(returnSeriesCases()[caseName])
+    riskFreeReturns = np.full(returnMatrix.shape[0], 0.0002)
+    statistics = implementation(np.ascontiguousarray(returnMatrix), riskFreeReturns)
+
+    assert statistics.shape == (returnMatrix.shape[0], len(statisticNames))
+    for i in range(returnMatrix.shape[0]):
+        assert np.allclose(statistics[i], pandasStatistics(returnMatrix[i], 0.0002), rtol = 1e-9, atol = 1e-12, equal_nan = True)
+
+
+@pytest.mark.parametrize('caseName', list(returnSeriesCases()))
+def test_statistics_loopAndNumpyAgree(caseName):
+
+    returnMatrix = asReturnMatrix(returnSeriesCases()[caseName])
+    riskFreeReturns = np.full(returnMatrix.shape[0], 0.0001)
+
+    assert np.allclose(statisticsLoop(returnMatrix, riskFreeReturns), statisticsNumpy(returnMatrix, riskFreeReturns), equal_nan = True)
+
+
+def test_returnStatistics_ratios():
+
+    returns = returnSeriesCases()['1-D']
+    statistics = returnStatistics(returns, 2.0, 0.04)
+    periodsPerYear = len(returns) / 2.0
+    riskFreeReturn = 1.04 ** (1 / periodsPerYear) - 1
+
+    assert statistics['periodsPerYear'][0] == pytest.approx(periodsPerYear)
+    assert statistics['sharpeRatio'][0] == pytest.approx((returns.mean() - riskFreeReturn) / returns.std(ddof = 1) * np.sqrt(periodsPerYear))
+    assert statistics['compoundAnnualGrowthRate'][0] == pytest.approx(np.prod(1 + returns) ** 0.5 - 1)
+    assert np.isnan(returnStatistics(np.empty(0), 2.0)['sharpeRatio'][0])
+
+
+def test_composeLog_matchesPandas():
+
+    backtest = BacktestMetrics(['SYNTHETIC'], '1min', 20_000, assetTimeSeries = syntheticAssetTimeSeries(20_000), rateProvider = ConstantRateProvider(0.03))
+    log = dict(backtest.composeLog())
+    tradeReturns = pd.Series(backtest._tradesPercentageChangeSeries)
+    periodsPerYear = len(tradeReturns) / backtest.backtestYears()
+    riskFreeReturn = (1 + log['riskFreeRate']) ** (1 / periodsPerYear) - 1
+    expected = dict(zip(statisticNames, pandasStatistics(tradeReturns.to_numpy(), riskFreeReturn)))
+
+    assert log['tradeCount'] == expected['count']
+    assert log['totalReturn'] == pytest.approx(expected['totalReturn'])
+    assert log['maximumDrawdown'] == pytest.approx(expected['maximumDrawdown'])
+    assert log['winRate'] == pytest.approx(expected['winRate'])
+    assert log['profitFactor'] == pytest.approx(expected['profitFactor'])
+    assert log['sharpeRatio'] == pytest.approx((expected['meanReturn'] - riskFreeReturn) / expected['standardDeviation'] * np.sqrt(periodsPerYear))
+    assert log['sortinoRatio'] == pytest.approx((expected['meanReturn'] - riskFreeReturn) / expected['downsideDeviation'] * np.sqrt(periodsPerYear))
+    assert log['exposure'] == pytest.approx(np.sum(backtest._holdingPeriods) / 20_000)
+    assert log['underlyingTotalReturn'] == pytest.approx(pd.Series(backtest._underlyingPercentageChangeSeries).add(1).prod() - 1)
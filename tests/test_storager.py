@@ -0,0 +1,82 @@
+import sqlite3
+import numpy as np
+import pytest
+from backtestBenchmarks import syntheticAssetTimeSeries
+from backtestDriver import BacktestDriver
+from backtestExecution import ExecutionModel
+from backtestRates import ConstantRateProvider
+
+matplotlib = pytest.importorskip('matplotlib')
+matplotlib.use('Agg')
+from backtestStorager import BacktestStorager, loadMetrics
+
+
+def storedRun(storageDirectory: str,
+              tickerSymbols: list[str],
+              seed: int = 0,
+              **storagerOptions) -> BacktestStorager:
+
+    '''Stores a run over one synthetic series per ticker symbol, without touching the network.'''
+
+    allAssetTimeSeries = [syntheticAssetTimeSeries(2_000, seed = seed + i) for i in range(len(tickerSymbols))]
+
+    return (BacktestStorager(tickerSymbols, '1min', 2_000, assetTimeSeries = allAssetTimeSeries, rateProvider = ConstantRateProvider(0.0),
+                             storageDirectory = storageDirectory, **storagerOptions))
+
+
+def test_storeTradeSeries_oneSetOfArraysPerTicker(tmp_path):
+
+    executionModel = ExecutionModel(commissionRate = 0.001, positionSize = 0.5)
+    run = storedRun(str(tmp_path), ['A', 'EUR/USD'], executionModel = executionModel)
+    tradeSeries = np.load(tmp_path / 'runs' / run._backtestID / 'tradeSeries.npz')
+
+    assert sorted(tradeSeries.files) == sorted(i + '/' + j for i in ['A', 'EUR/USD'] for j in ['openIndex', 'closeIndex', 'tradeReturn', 'equityReturn', 'holdingPeriod'])
+    for i, j in enumerate(['A', 'EUR/USD']):
+        single = BacktestDriver([j], '1min', 2_000, assetTimeSeries = run._allAssetTimeSeries[i], executionModel = executionModel)
+        tradeResults = single.tradeResults()
+        assert np.array_equal(tradeSeries[j + '/openIndex'], tradeResults['orderIndices'][0::2])
+        assert np.array_equal(tradeSeries[j + '/closeIndex'], tradeResults['orderIndices'][1::2])
+        assert np.array_equal(tradeSeries[j + '/tradeReturn'], tradeResults['profitLossForTrades'])
+        assert np.array_equal(tradeSeries[j + '/equityReturn'], tradeResults['equityReturns'])
+        assert np.array_equal(tradeSeries[j + '/holdingPeriod'], tradeResults['holdingPeriods'])
+        # Half of the equity goes into each trade, so the equity moves by about half of the trade return
+        assert np.allclose(tradeSeries[j + '/equityReturn'], 0.5 * tradeSeries[j + '/tradeReturn'], atol = 1e-6)
+    assert not np.array_equal(tradeSeries['A/openIndex'], tradeSeries['EUR/USD/openIndex'])
+
+
+def test_storeMetrics_indexesRunsBySeriesAndTicker(tmp_path):
+
+    run = storedRun(str(tmp_path), ['A'])
+    with sqlite3.connect(tmp_path / 'runs.sqlite') as connection:
+        indexes = {i[1] for i in connection.execute('PRAGMA index_list(metrics)')}
+        queryPlan = ' '.join(str(i[-1]) for i in connection.execute('EXPLAIN QUERY PLAN SELECT * FROM metrics WHERE seriesHash = ?', (run.seriesHash(),)))
+
+    assert {'metricsBySeries', 'metricsByTicker'} <= indexes
+    assert 'metricsBySeries' in queryPlan
+
+
+def test_storeMetrics_addsMissingColumnsToOlderTable(tmp_path):
+
+    with sqlite3.connect(tmp_path / 'runs.sqlite') as connection:
+        connection.execute('CREATE TABLE metrics (backtestID TEXT PRIMARY KEY, tickerSymbols TEXT)')
+        connection.execute('INSERT INTO metrics VALUES (?, ?)', ('older', 'OLD'))
+    run = storedRun(str(tmp_path), ['A'])
+    metrics = loadMetrics(str(tmp_path))
+    assert set(dict(run.composeLog())) <= set(metrics.columns)
+
+    metrics = metrics.set_index('backtestID')
+    assert metrics.loc['older', 'tickerSymbols'] == 'OLD'
+    assert metrics.loc['older', ['seriesHash', 'strategy']].isna().all()
+    assert metrics.loc[run._backtestID, 'seriesHash'] == run.seriesHash()
+
+
+def test_loadMetrics_filtersWithCondition(tmp_path):
+
+    firstRun = storedRun(str(tmp_path), ['A'])
+    secondRun = storedRun(str(tmp_path), ['B'], seed = 1)
+    storedRun(str(tmp_path), ['B'], seed = 1)
+
+    assert len(loadMetrics(str(tmp_path))) == 3
+    assert loadMetrics(str(tmp_path), 'tickerSymbols = ?', ('A',))['backtestID'].tolist() == [firstRun._backtestID]
+    assert len(loadMetrics(str(tmp_path), 'seriesHash = ?', (secondRun.seriesHash(),))) == 2
+    assert len(list((tmp_path / 'series').iterdir())) == 2
@@ -0,0 +1,156 @@
+import numpy as np
+import pytest
+import backtestKernels as kernels
+from backtestBenchmarks import syntheticAssetTimeSeries
+from backtestDriver import BacktestDriver, columnIndices
+from backtestStrategy import RollingMinimumStrategy, PriceColumns, vectorizedStateCodes, referenceStateCodes
+
+originalParameters = {'subframeLength': 5, 'entryCount': 3, 'exitIndex': 2}
+
+
+def originalBacktest(closes: np.ndarray) -> tuple[list[tuple[bool, bool, bool, bool]], list[tuple[int, float]], list[float], list[int]]:
+
+    '''
+    Frozen copy of the original tuple-based batcher(5, 1), positionStates() and computeReturnSeries(), kept unchanged as the reference
+    that the current engine is checked against. Returns the states, the (index, price) orders, the trade returns and the holding periods.
+    Do not optimize or refactor this function. It only reproduces the strategy with its original parameters.
+    '''
+
+    from itertools import chain
+
+    originalData = list(zip(closes))
+    fullSeries = []
+    for t, j in enumerate(originalData):
+        subSeries = []
+        for i in range(0, 5, 1):
+            try:
+                subSeries.append(originalData[t-i])
+            except IndexError:
+                continue
+
+        fullSeries.append(list(chain(*[list(row) for row in subSeries[::-1]])))
+    lastFives = fullSeries[5 : len(fullSeries)]
+
+    minimumSubframeValues = []
+    for i in lastFives:
+        minimumSubframeValues.append(min(i))
+
+    entryCount = 0
+    positionIsOpen = False
+    currentState = (False, False, False, True)
+    states = []
+    for i, j in enumerate(lastFives):
+
+        if (j[0] == minimumSubframeValues[i]):
+            entryCount += 1
+        else:
+            entryCount = 0
+
+        if (entryCount == 3):
+            currentState = (True, False, False, False)
+            positionIsOpen = True
+        if (positionIsOpen == True) and (entryCount != 3):
+            currentState = (False, True, False, False)
+        if (positionIsOpen == True) and (j[2] == minimumSubframeValues[i]):
+            currentState = (False, False, True, False)
+            positionIsOpen = False
+        if (positionIsOpen == False) and (currentState != (False, False, True, False)):
+            currentState = (False, False, False, True)
+        try:
+            if (states[-1] == (False, True, False, False)) and (currentState == (True, False, False, False)):
+                currentState = (False, True, False, True)
+            if (positionIsOpen == False) and (states[-1] == (False, False, True, False)):
+                currentState = (False, False, False, True)
+        except IndexError:
+            pass
+
+        states.append(currentState)
+
+    openingAndClosingOrders = []
+    for i, j in enumerate(states):
+        if (j[0] == True):
+            openingAndClosingOrders.append((i + 5, closes[i + 5]))
+        if (j[2] == True):
+            openingAndClosingOrders.append((i + 5, closes[i + 5]))
+    if ((len(openingAndClosingOrders) % 2) == 1):
+        openingAndClosingOrders.pop(-1)
+
+    profitLossForTrades = []
+    holdingPeriods = []
+    for i, j in enumerate(openingAndClosingOrders):
+        if ((i % 2) == 1):
+            profitLossForTrades.append(((j[1] - openingAndClosingOrders[i - 1][1]) / openingAndClosingOrders[i - 1][1]))
+            holdingPeriods.append((j[0] - openingAndClosingOrders[i - 1][0]))
+
+    return (states, openingAndClosingOrders, profitLossForTrades, holdingPeriods)
+
+
+def tickedSeries(numberOfBars: int,
+                 seed: int) -> np.ndarray:
+
+    '''Returns a synthetic series with its closes rounded to a coarse tick, so that ties with the rolling minimum are common.'''
+
+    assetTimeSeries = syntheticAssetTimeSeries(numberOfBars, seed)
+    assetTimeSeries[:, 4] = np.round(assetTimeSeries[:, 4], 1)
+
+    return (assetTimeSeries)
+
+
+@pytest.mark.parametrize('strategyParameters', [originalParameters, {'subframeLength': 9, 'entryCount': 2, 'exitIndex': 4}], ids = str)
+@pytest.mark.parametrize('seed', range(3))
+def test_positionStateCodes_executionModesAgree(strategyParameters, seed):
+
+    # The 'python' mode asks the strategy for its signals one bar at a time, and the kernels are fed the raw window conditions.
+    assetTimeSeries = tickedSeries(20_000, seed)
+    reference = BacktestDriver(['SYNTHETIC'], '1min', len(assetTimeSeries), assetTimeSeries = assetTimeSeries, executionMode = 'python')
+    compiled = BacktestDriver(['SYNTHETIC'], '1min', len(assetTimeSeries), assetTimeSeries = assetTimeSeries, executionMode = 'compiled')
+    reference.setStrategyParameters(**strategyParameters)
+    compiled.setStrategyParameters(**strategyParameters)
+
+    compiledCodes = compiled.positionStateCodes()
+    subframes = compiled.windowView(strategyParameters['subframeLength'], 1)
+    minimumSubframeValues = subframes.min(axis = 1)
+    numpyCodes = kernels.stateTransitionsNumpy(subframes[:, 0] == minimumSubframeValues, subframes[:, strategyParameters['exitIndex']] == minimumSubframeValues,
+                                               strategyParameters['entryCount'])
+
+    assert kernels.codesToStates(compiledCodes) == reference.positionStates()
+    assert np.array_equal(numpyCodes, compiledCodes)
+    assert reference._openingAndClosingOrders == compiled._openingAndClosingOrders
+    assert np.array_equal(reference._profitLossForTrades, compiled._profitLossForTrades)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_positionStateCodes_matchOriginalCode(seed):
+
+    assetTimeSeries = tickedSeries(20_000, seed)
+    backtest = BacktestDriver(['SYNTHETIC'], '1min', len(assetTimeSeries), assetTimeSeries = assetTimeSeries)
+    backtest.setStrategyParameters(**originalParameters)
+    originalStates, originalOrders, originalReturns, originalHoldingPeriods = originalBacktest(assetTimeSeries[:, 4])
+
+    assert kernels.codesToStates(backtest.positionStateCodes()) == originalStates
+    assert backtest._openingAndClosingOrders == [(i, float(j)) for i, j in originalOrders]
+    assert np.array_equal(backtest._profitLossForTrades, originalReturns)
+    assert np.array_equal(backtest._holdingPeriods, originalHoldingPeriods)
+
+
+@pytest.mark.parametrize('strategy', [RollingMinimumStrategy(), RollingMinimumStrategy(subframeLength = 9, entryCount = 2, exitIndex = 4),
+                                      RollingMinimumStrategy(subframeLength = 3, entryCount = 1, exitIndex = 1)], ids = repr)
+def test_referenceStateCodes_matchVectorized(strategy):
+
+    assetTimeSeries = tickedSeries(10_000, 0)
+    prices = PriceColumns(lambda name: assetTimeSeries[:, columnIndices[name]])
+
+    assert np.array_equal(referenceStateCodes(strategy, prices), vectorizedStateCodes(strategy, prices))
+
+
+@pytest.mark.parametrize('strategyParameters', [{'entryCount': 0}, {'entryCount': -1}, {'exitIndex': 0}, {'exitIndex': 5}, {'subframeLength': 2, 'exitIndex': 2}], ids = str)
+def test_rollingMinimumStrategy_rejectsInvalidParameters(strategyParameters):
+
+    with pytest.raises(ValueError):
+        RollingMinimumStrategy(**strategyParameters)
+    with pytest.raises(ValueError):
+        RollingMinimumStrategy().withParameters(**strategyParameters)
+    backtest = BacktestDriver(['SYNTHETIC'], '1min', 100, assetTimeSeries = tickedSeries(100, 0))
+    with pytest.raises(ValueError):
+        backtest.setStrategyParameters(**strategyParameters)
+    assert backtest._strategyParameters == RollingMinimumStrategy.defaultParameters
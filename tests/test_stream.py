@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+import backtestKernels as kernels
+from backtestBenchmarks import syntheticAssetTimeSeries
+from backtestDriver import BacktestDriver
+from backtestStream import StreamingBacktest
+from backtestStrategy import RollingMinimumStrategy, Strategy
+
+
+@pytest.mark.parametrize('strategyParameters', [{'subframeLength': 5, 'entryCount': 3, 'exitIndex': 2}, {'subframeLength': 9, 'entryCount': 2, 'exitIndex': 4}], ids = str)
+@pytest.mark.parametrize('seed', range(3))
+def test_replay_matchesBatch(strategyParameters, seed):
+
+    assetTimeSeries = syntheticAssetTimeSeries(20_000, seed)
+    assetTimeSeries[:, 4] = np.round(assetTimeSeries[:, 4], 1)
+    backtest = BacktestDriver(['SYNTHETIC'], '1min', len(assetTimeSeries), assetTimeSeries = assetTimeSeries)
+    backtest.setStrategyParameters(**strategyParameters)
+    stream = StreamingBacktest(strategyParameters)
+
+    assert np.array_equal(stream.replay(assetTimeSeries), backtest.positionStateCodes())
+    assert np.array_equal([i['return'] for i in stream._trades], backtest._profitLossForTrades)
+
+
+@pytest.mark.parametrize('strategyParameters', [{'subframeLength': 5, 'entryCount': 3, 'exitIndex': 2}, {'subframeLength': 9, 'entryCount': 2, 'exitIndex': 4}], ids = str)
+@pytest.mark.parametrize('seed', range(3))
+def test_replay_matchesBatchWithNaNCloses(strategyParameters, seed):
+
+    rng = np.random.default_rng(seed)
+    assetTimeSeries = syntheticAssetTimeSeries(20_000, seed)
+    assetTimeSeries[:, 4] = np.round(assetTimeSeries[:, 4], 1)
+    assetTimeSeries[rng.integers(0, len(assetTimeSeries), 200), 4] = np.nan
+    assetTimeSeries[1_000:1_020, 4] = np.nan
+    backtest = BacktestDriver(['SYNTHETIC'], '1min', len(assetTimeSeries), assetTimeSeries = assetTimeSeries)
+    backtest.setStrategyParameters(**strategyParameters)
+    stream = StreamingBacktest(strategyParameters)
+
+    assert np.array_equal(stream.replay(assetTimeSeries), backtest.positionStateCodes())
+    assert np.array_equal([i['return'] for i in stream._trades], backtest._profitLossForTrades)
+
+
+def test_onBar_nanDoesNotHideLaterMinimum():
+
+    # The NaN used to stay at the front of the queue, so the minimum after it was never seen and the stale 1.0 was kept.
+    stream = StreamingBacktest({'subframeLength': 3, 'entryCount': 1, 'exitIndex': 1})
+    states = [stream.onBar(i) for i in [5.0, 1.0, np.nan, 4.0, 3.0, 4.0, 5.0]]
+
+    assert states == [None, None, None, kernels.NO_POSITION, kernels.NO_POSITION, kernels.NO_POSITION, kernels.OPENED]
+
+
+def test_strategy_onlyRollingMinimumStrategy():
+
+    stream = StreamingBacktest({'entryCount': 2}, strategy = RollingMinimumStrategy(subframeLength = 9))
+    assert stream._strategyParameters == {'subframeLength': 9, 'entryCount': 2, 'exitIndex': 2}
+
+    class RollingMaximumStrategy(RollingMinimumStrategy):
+        pass
+
+    with pytest.raises(ValueError):
+        StreamingBacktest(strategy = RollingMaximumStrategy())
+    with pytest.raises(ValueError):
+        StreamingBacktest(strategy = Strategy())
+    with pytest.raises(ValueError):
+        StreamingBacktest({'exitIndex': 0})
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+import backtestSweep
+from backtestBenchmarks import syntheticAssetTimeSeries
+from backtestDriver import BacktestDriver
+from backtestRates import ConstantRateProvider
+from backtestSweep import parameterSweep, sortedSweepResults, summarizeBacktest
+
+strategyParameterGrid = {'subframeLength': [5, 8, 12], 'entryCount': [2, 3], 'exitIndex': [1, 2]}
+
+
+@pytest.fixture(scope = 'module')
+def assetTimeSeries():
+
+    return (syntheticAssetTimeSeries(20_000))
+
+
+def test_parameterSweep_workersMatchSingleProcess(assetTimeSeries):
+
+    singleProcess = parameterSweep(assetTimeSeries, strategyParameterGrid, maxWorkers = 1, rateProvider = ConstantRateProvider(0.04))
+    pooled = parameterSweep(assetTimeSeries, strategyParameterGrid, maxWorkers = 3, chunksPerWorker = 2, rateProvider = ConstantRateProvider(0.04))
+
+    assert len(singleProcess) == 12
+    pd.testing.assert_frame_equal(pooled, singleProcess)
+
+
+def test_parameterSweep_rowsMatchStandaloneBacktests(assetTimeSeries):
+
+    results = parameterSweep(assetTimeSeries, strategyParameterGrid, maxWorkers = 1, rateProvider = ConstantRateProvider(0.04))
+    backtest = BacktestDriver(['SWEEP'], '1min', len(assetTimeSeries), assetTimeSeries = assetTimeSeries)
+    backtest.setStrategyParameters(subframeLength = 8, entryCount = 3, exitIndex = 1)
+    row = results[(results['subframeLength'] == 8) & (results['entryCount'] == 3) & (results['exitIndex'] == 1)].iloc[0]
+
+    for i, j in summarizeBacktest(backtest, 0.04).items():
+        assert row[i] == pytest.approx(j, nan_ok = True)
+
+
+def test_parameterSweep_unlinksSharedMemoryWhenWorkerRaises(assetTimeSeries, monkeypatch):
+
+    createdNames = []
+
+    class RecordedSharedMemory(backtestSweep.shared_memory.SharedMemory):
+        def __init__(self, *arguments, **keywordArguments):
+            super().__init__(*arguments, **keywordArguments)
+            if keywordArguments.get('create'):
+                createdNames.append(self.name)
+
+    monkeypatch.setattr(backtestSweep.shared_memory, 'SharedMemory', RecordedSharedMemory)
+    with pytest.raises(ValueError):
+        parameterSweep(assetTimeSeries, {'subframeLength': [5, 8], 'unknownParameter': [1]}, maxWorkers = 2, rateProvider = ConstantRateProvider(0.0))
+
+    assert len(createdNames) == 1
+    with pytest.raises(FileNotFoundError):
+        backtestSweep.shared_memory.SharedMemory(name = createdNames[0])
+
+
+def test_sortedSweepResults_orderWithNaNObjectives():
+
+    rows = [{'subframeLength': i, 'entryCount': j, 'sharpeRatio': np.nan if ((i + j) % 3 == 0) else float(i - j)} for i in (5, 8, 12) for j in (1, 2, 3)]
+    expected = sortedSweepResults(rows, {'subframeLength': [], 'entryCount': []})
+
+    for seed in range(5):
+        shuffled = [rows[i] for i in np.random.default_rng(seed).permutation(len(rows))]
+        pd.testing.assert_frame_equal(sortedSweepResults(shuffled, {'subframeLength': [], 'entryCount': []}), expected)
+    assert list(zip(expected['subframeLength'], expected['entryCount'])) == [(i, j) for i in (5, 8, 12) for j in (1, 2, 3)]
+    assert expected['sharpeRatio'].isna().sum() == 3
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtestBenchmarks import syntheticAssetTimeSeries
+from backtestDriver import BacktestDriver, columnIndices
+from backtestRates import ConstantRateProvider
+from backtestStrategy import RollingMinimumStrategy, PriceColumns
+from backtestWalkForward import FoldBacktest, walkForward, walkForwardFolds
+
+strategyParameterGrid = {'subframeLength': [5, 9], 'entryCount': [2, 3], 'exitIndex': [1, 2]}
+
+
+@pytest.fixture(scope = 'module')
+def assetTimeSeries():
+
+    assetTimeSeries = syntheticAssetTimeSeries(6_000, 2)
+    assetTimeSeries[:, 4] = np.round(assetTimeSeries[:, 4], 1)
+
+    return (assetTimeSeries)
+
+
+def test_walkForwardFolds_rolling():
+
+    assert walkForwardFolds(100, 40, 20) == [(0, 40, 40, 60), (20, 60, 60, 80), (40, 80, 80, 100)]
+    assert walkForwardFolds(100, 40, 20, step = 15) == [(0, 40, 40, 60), (15, 55, 55, 75), (30, 70, 70, 90)]
+    assert walkForwardFolds(100, 40, 20, step = 25) == [(0, 40, 40, 60), (25, 65, 65, 85)]
+
+
+def test_walkForwardFolds_anchored():
+
+    assert walkForwardFolds(100, 40, 20, anchored = True) == [(0, 40, 40, 60), (0, 60, 60, 80), (0, 80, 80, 100)]
+    assert walkForwardFolds(100, 40, 20, step = 30, anchored = True) == [(0, 40, 40, 60), (0, 70, 70, 90)]
+
+
+def test_walkForwardFolds_tooShort():
+
+    assert walkForwardFolds(59, 40, 20) == []
+    assert walkForwardFolds(60, 40, 20) == [(0, 40, 40, 60)]
+
+
+def test_walkForward_tooShortRaises(assetTimeSeries):
+
+    with pytest.raises(ValueError, match = 'too short'):
+        walkForward(assetTimeSeries[:100], strategyParameterGrid, 80, 30, maxWorkers = 1, rateProvider = ConstantRateProvider(0.0))
+
+
+@pytest.mark.parametrize('start, stop', [(0, 2_000), (500, 2_500), (1_750, 6_000)])
+def test_foldBacktest_matchesStandaloneBacktest(assetTimeSeries, start, stop):
+
+    # The folds share one PriceColumns, so rolling values computed for an earlier, overlapping fold are reused
+    prices = PriceColumns(lambda name: assetTimeSeries[:, columnIndices[name]])
+    strategy = RollingMinimumStrategy(subframeLength = 9, entryCount = 2, exitIndex = 4)
+    FoldBacktest(assetTimeSeries, prices, 0, len(assetTimeSeries), ['SYNTHETIC'], '1min', 'compiled', strategy, None).positionStateCodes()
+    fold = FoldBacktest(assetTimeSeries, prices, start, stop, ['SYNTHETIC'], '1min', 'compiled', strategy, None)
+    standalone = BacktestDriver(['SYNTHETIC'], '1min', stop - start, assetTimeSeries = assetTimeSeries[start:stop].copy(), strategy = strategy)
+
+    assert np.array_equal(fold.positionStateCodes(), standalone.positionStateCodes())
+    assert np.array_equal(fold.tradeRecords(), standalone.tradeRecords())
+
+
+def test_walkForward_workersMatchSingleProcess(assetTimeSeries):
+
+    singleProcess = walkForward(assetTimeSeries, strategyParameterGrid, 2_000, 1_000, step = 750, maxWorkers = 1, rateProvider = ConstantRateProvider(0.02))
+    pooled = walkForward(assetTimeSeries, strategyParameterGrid, 2_000, 1_000, step = 750, maxWorkers = 2, rateProvider = ConstantRateProvider(0.02))
+
+    assert singleProcess[['trainStart', 'trainStop', 'testStart', 'testStop']].to_numpy().tolist() == [list(i) for i in walkForwardFolds(6_000, 2_000, 1_000, 750)]
+    pd.testing.assert_frame_equal(pooled, singleProcess)
@@ -0,0 +1,159 @@
+import json
+import time
+import numpy as np
+import pandas as pd
+from backtestBenchmarks import syntheticAssetTimeSeries
+from backtestDriver import columnIndices
+
+
+class StubTwelveDataServer:
+
+    '''
+    A local HTTP server that answers /time_series requests the way the Twelve Data API does, for testing backtestPrefetch without a network
+    connection or an API key. Each symbol gets its own syntheticAssetTimeSeries(), newest bar first, after a fixed latency. Symbols with a '/',
+    such as currency pairs, have no volume, and symbols starting with 'GAP' miss every seventh bar. Use it as a context manager, and point
+    AsyncPrefetcher at its url.
+
+    Parameters
+    ----------
+    latency : float
+        the number of seconds each response is held back, standing in for the round trip to the API.
+    failures : dict[str, list[int]], optional
+        the HTTP statuses to answer the first requests for a symbol with, in order, before it is served. A status of 429 is sent in the
+        body with status 200, as Twelve Data reports its rate limit, and 503 as the HTTP status with a Retry-After header of 0.
+    '''
+
+    def __init__(self,
+                 latency: float = 0.05,
+                 failures: dict[str, list[int]] = None) -> None:
+
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        self._latency = latency
+        self._failures = {i: list(j) for i, j in (failures or {}).items()}
+        self._lock = threading.Lock()
+        self._inFlight = 0
+        self._maximumInFlight = 0
+        self._requestTimes = []
+        self._bodies = {}
+        stub = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+
+            def do_GET(self) -> None:
+                stub.handle(self)
+
+            def log_message(self, *arguments) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), RequestHandler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target = self._server.serve_forever, daemon = True)
+
+
+    def __enter__(self) -> 'StubTwelveDataServer':
+
+        self._thread.start()
+
+        return (self)
+
+
+    def __exit__(self, *exceptionInformation) -> bool:
+
+        self._server.shutdown()
+        self._server.server_close()
+
+        return (False)
+
+
+    @property
+    def url(self) -> str:
+
+        return ('http://127.0.0.1:' + str(self._server.server_address[1]))
+
+
+    @staticmethod
+    def expectedBars(tickerSymbol: str,
+                     numberOfUnits: int) -> np.ndarray:
+
+        '''Returns the bars served for a symbol, as AsyncPrefetcher.fetch() should return them when the symbol is fetched alone.'''
+
+        bars = syntheticAssetTimeSeries(numberOfUnits, seed = sum(tickerSymbol.encode()))
+        if ('/' in tickerSymbol):
+            bars[:, 5] = np.nan
+        if tickerSymbol.startswith('GAP'):
+            bars = bars[(np.arange(numberOfUnits) % 7) != 3]
+
+        return (bars)
+
+
+    def handle(self,
+               request) -> None:
+
+        from urllib.parse import urlparse, parse_qs
+
+        with self._lock:
+            self._inFlight += 1
+            self._maximumInFlight = max(self._maximumInFlight, self._inFlight)
+            self._requestTimes.append(time.perf_counter())
+        try:
+            time.sleep(self._latency)
+            query = {i: j[0] for i, j in parse_qs(urlparse(request.path).query).items()}
+            tickerSymbol = query['symbol']
+            with self._lock:
+                failure = self._failures[tickerSymbol].pop(0) if self._failures.get(tickerSymbol) else None
+            if (failure == 429):
+                response = (200, {'code': 429, 'message': 'You have run out of API credits for the current minute.', 'status': 'error'}, None)
+            elif (failure is not None) and (failure >= 500):
+                response = (failure, {'code': failure, 'message': 'Service unavailable', 'status': 'error'}, {'Retry-After': '0'})
+            elif (failure is not None):
+                response = (200, {'code': failure, 'message': '**symbol** not found: ' + tickerSymbol, 'status': 'error'}, None)
+            else:
+                response = (200, self.timeSeriesBody(tickerSymbol, int(query['outputsize'])), None)
+        finally:
+            with self._lock:
+                self._inFlight -= 1 # Before the response is sent, as the client may send its next request as soon as it arrives
+        self.respond(request, *response)
+
+
+    def timeSeriesBody(self,
+                       tickerSymbol: str,
+                       numberOfUnits: int) -> bytes:
+
+        '''Returns the response body for a symbol. Bodies are rendered once and reused, so that rendering them does not count towards the latency.'''
+
+        if ((tickerSymbol, numberOfUnits) not in self._bodies):
+            bars = self.expectedBars(tickerSymbol, numberOfUnits)
+            dates = pd.to_datetime(bars[:, 0], unit = 's').strftime('%Y-%m-%d %H:%M:%S')
+            values = [{'datetime': dates[i], **{j: repr(float(bars[i, k])) for j, k in columnIndices.items() if (k > 0) and not np.isnan(bars[i, k])}}
+                      for i in range(len(bars) - 1, -1, -1)]
+            self._bodies[(tickerSymbol, numberOfUnits)] = json.dumps({'meta': {'symbol': tickerSymbol}, 'values': values, 'status': 'ok'}).encode()
+
+        return (self._bodies[(tickerSymbol, numberOfUnits)])
+
+
+    @staticmethod
+    def respond(request,
+                status: int,
+                payload: dict | bytes,
+                headers: dict = None) -> None:
+
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(body)))
+        for i, j in (headers or {}).items():
+            request.send_header(i, j)
+        request.end_headers()
+        request.wfile.write(body)
+
+
+    def maximumInFlight(self) -> int:
+
+        return (self._maximumInFlight)
+
+
+    def requestTimes(self) -> list[float]:
+
+        return (list(self._requestTimes))